@@ -0,0 +1,307 @@
+import re
+import math
+
+import pandas as pd
+
+import schema
+import taxonomy
+
+_PAREN_RE = re.compile(r'\([^)]*\)')
+_PERIOD_RE = re.compile(r'((?:19|20)\d{2})\s*(?:년|년도|FY)?\s*(?:([1-4])\s*(?:Q|분기)|(상반기|반기))?', re.IGNORECASE)
+
+# 지표 계산에 쓰는 기본 계정 (재무제표, 계정명 후보). 이름은 정규화(공백/괄호 제거) 후 비교
+ACCOUNTS = {
+    'revenue': ('IS', ['매출액', '매출', '영업수익', '수익']),
+    'cogs': ('IS', ['매출원가']),
+    'gross_profit': ('IS', ['매출총이익', '매출총손실']),
+    'operating_income': ('IS', ['영업이익', '영업손실']),
+    'net_income': ('IS', ['당기순이익', '당기순손실', '분기순이익', '반기순이익']),
+    'total_assets': ('BS', ['자산총계']),
+    'current_assets': ('BS', ['유동자산']),
+    'current_liabilities': ('BS', ['유동부채']),
+    'total_liabilities': ('BS', ['부채총계']),
+    'total_equity': ('BS', ['자본총계']),
+    'materials': ('COGM', ['재료비', '원재료비']),
+    'labor': ('COGM', ['노무비']),
+    'overhead': ('COGM', ['경비', '제조경비']),
+    'manufacturing_cost': ('COGM', ['당기총제조비용', '당기총제조원가']),
+}
+
+# 이름: (표시명, 질문 키워드, 계산식(계정값 조회 함수 -> %))
+METRICS = {
+    'gross_margin': ('매출총이익률', ['매출총이익률', '총이익률', 'gross margin'],
+                     lambda a: _ratio(_first(a('gross_profit'), _diff(a('revenue'), a('cogs'))), a('revenue'))),
+    'operating_margin': ('영업이익률', ['영업이익률', '영업마진', 'operating margin'],
+                         lambda a: _ratio(a('operating_income'), a('revenue'))),
+    'net_margin': ('순이익률', ['순이익률', '당기순이익률', 'net margin'],
+                   lambda a: _ratio(a('net_income'), a('revenue'))),
+    'current_ratio': ('유동비율', ['유동비율', 'current ratio'],
+                      lambda a: _ratio(a('current_assets'), a('current_liabilities'))),
+    'debt_ratio': ('부채비율', ['부채비율', 'debt ratio'],
+                   lambda a: _ratio(a('total_liabilities'), a('total_equity'))),
+    'roe': ('ROE', ['roe', '자기자본이익률'],
+            lambda a: _ratio(a('net_income'), a('total_equity'))),
+    'materials_share': ('재료비 비중', ['재료비 비중', '재료비 비율'],
+                        lambda a: _ratio(a('materials'), _cost_base(a))),
+    'labor_share': ('노무비 비중', ['노무비 비중', '노무비 비율'],
+                    lambda a: _ratio(a('labor'), _cost_base(a))),
+    'overhead_share': ('경비 비중', ['경비 비중', '경비 비율'],
+                       lambda a: _ratio(a('overhead'), _cost_base(a))),
+}
+COST_MIX = ['materials_share', 'labor_share', 'overhead_share']
+# 지표 표에 전년 대비 증감률을 함께 넣는 계정
+GROWTH_ACCOUNTS = {'revenue': '매출액', 'operating_income': '영업이익', 'net_income': '당기순이익'}
+COST_MIX_KEYWORDS = ['원가 구성', '원가구성', '제조원가 구성', 'cost mix']
+
+GROWTH_KEYWORDS = ['성장률', '증가율', '증감률', '성장', 'yoy', '전년 대비', '전년대비']
+QOQ_KEYWORDS = ['qoq', '전분기 대비', '전분기대비', '직전 분기']
+# 계산한 지표만으로는 답하기 어려운 질문 (모델로 넘김) - 비교/추이처럼 값 하나로 답할 수 없는 질문 포함
+OPEN_ENDED_KEYWORDS = ['왜', '이유', '원인', '평가', '전망', '분석', '설명해', '어떻게', '의견', '추천',
+                       '비교', '추이', '차이', '추세', 'vs']
+
+def _first(*values):
+    return next((v for v in values if v is not None), None)
+
+def _diff(a, b):
+    return None if a is None or b is None else a - b
+
+def _ratio(numerator, denominator):
+    if numerator is None or not denominator:
+        return None
+    return numerator / denominator * 100
+
+def _cost_base(a):
+    total = a('manufacturing_cost')
+    if total:
+        return total
+    parts = [a(k) for k in ('materials', 'labor', 'overhead')]
+    return sum(p for p in parts if p is not None) if any(parts) else None
+
+def name_key(name):
+    """
+    계정명 비교용 키 (번호/공백/괄호 안 내용 제거)
+    """
+    return _PAREN_RE.sub('', taxonomy.normalize_name(name))
+
+def sorted_periods(df):
+    return [c for c in schema.sort_columns_chronologically(schema.period_columns(df)) if c != 'Account_Name']
+
+def previous_period(period, quarterly=False):
+    """
+    비교 기간: 기본은 전년 같은 기간, quarterly=True면 직전 분기 (3M/Cum 구분 유지)
+    """
+    match = re.match(r'^(\d{4})(?:\.([1-4])Q(\(.*\))?)?$', str(period))
+    if not match:
+        return None
+    year, quarter, suffix = int(match.group(1)), match.group(2), match.group(3) or ''
+    if quarter is None:
+        return str(year - 1)
+    quarter = int(quarter)
+    if quarterly:
+        year, quarter = (year, quarter - 1) if quarter > 1 else (year - 1, 4)
+    else:
+        year -= 1
+    return f"{year}.{quarter}Q{suffix}"
+
+class FinancialData:
+    """
+    통합 결과 DataFrame 위의 계정/기간 조회와 지표 계산
+    """
+
+    def __init__(self, df, unit="원"):
+        self.df = df
+        self.unit = unit
+        self.periods = sorted_periods(df)
+        self.values = df[self.periods].to_numpy(dtype='float64', na_value=0.0) if self.periods else None
+        # (재무제표, 이름 키) -> 행 번호, 이름 키 -> 행 번호 (처음 나온 행 우선)
+        self.by_statement, self.by_name = {}, {}
+        statements = df['Statement'].astype(str).tolist() if 'Statement' in df.columns else [''] * len(df)
+        for i, (statement, name) in enumerate(zip(statements, df['Account_Name'].astype(str).tolist())):
+            key = name_key(name)
+            if not key:
+                continue
+            self.by_statement.setdefault((statement, key), i)
+            self.by_name.setdefault(key, i)
+
+    def row_of(self, names, statement=None):
+        for name in names:
+            key = name_key(name)
+            if statement and (statement, key) in self.by_statement:
+                return self.by_statement[(statement, key)]
+        for name in names:
+            key = name_key(name)
+            if key in self.by_name:
+                return self.by_name[key]
+        return None
+
+    def value(self, row, period):
+        if row is None or period not in self.periods:
+            return None
+        value = self.values[row, self.periods.index(period)]
+        # 결과 표에서 0은 값 없음과 같음
+        return None if math.isnan(value) or value == 0 else float(value)
+
+    def account(self, key, period):
+        statement, names = ACCOUNTS[key]
+        return self.value(self.row_of(names, statement), period)
+
+    def metric(self, name, period):
+        return METRICS[name][2](lambda key: self.account(key, period))
+
+    def growth(self, row, period, quarterly=False):
+        """
+        (현재 값, 비교 기간, 비교 값, 증감률 %). 비교할 값이 없으면 None
+        """
+        previous = previous_period(period, quarterly)
+        current, before = self.value(row, period), self.value(row, previous)
+        if current is None or before is None:
+            return None
+        return current, previous, before, (current - before) / abs(before) * 100
+
+    def metrics_table(self):
+        """
+        기간별 주요 지표 표 (지표 x 기간), 계산할 수 없는 값은 빈칸
+        """
+        data = {
+            METRICS[name][0]: [self.metric(name, period) for period in self.periods]
+            for name in METRICS
+        }
+        for key, title in GROWTH_ACCOUNTS.items():
+            statement, names = ACCOUNTS[key]
+            row = self.row_of(names, statement)
+            growths = [self.growth(row, period) for period in self.periods] if row is not None else []
+            data[f"{title} 증감률(YoY)"] = [g[3] if g else None for g in growths] or [None] * len(self.periods)
+        table = pd.DataFrame(data, index=self.periods).T
+        return table.dropna(how='all')
+
+    def resolve_periods(self, question):
+        """
+        질문에서 기간을 찾아 결과 컬럼명 후보로 변환
+        기간이 없으면 최근 기간부터 전체 (값이 있는 첫 기간으로 답함)
+        """
+        match = _PERIOD_RE.search(question)
+        if not match:
+            return list(reversed(self.periods))
+        year, quarter, half = match.group(1), match.group(2), match.group(3)
+        if half:
+            quarter = '2'
+        if quarter is None:
+            candidates = [year] + [p for p in reversed(self.periods) if p.startswith(f"{year}.")]
+        else:
+            base = f"{year}.{quarter}Q"
+            cum = '누적' in question or 'cum' in question.lower()
+            three = '3개월' in question or '3m' in question.lower()
+            order = ['(Cum)', '', '(3M)'] if cum else (['(3M)', '', '(Cum)'] if three else ['', '(3M)', '(Cum)'])
+            candidates = [base + suffix for suffix in order]
+        return [p for p in candidates if p in self.periods][:1]
+
+    def find_account(self, question):
+        """
+        질문에 나온 계정 (결과에 있는 계정명 또는 기본 계정 별칭)
+        반환값: 행 번호. 못 찾았거나 서로 다른 계정이 둘 이상 나오면 None
+        """
+        text = name_key(question)
+        found = [(key, self.by_name[key]) for key in self.by_name if len(key) >= 2 and key in text]
+        for statement, names in ACCOUNTS.values():
+            for alias in names:
+                key = name_key(alias)
+                if len(key) >= 2 and key in text:
+                    row = self.row_of(names, statement)
+                    if row is not None:
+                        found.append((key, row))
+        # 더 긴 계정명의 일부로만 나온 이름은 제외 ("매출원가" 안의 "매출")
+        found = [(key, row) for key, row in found if not any(key != other and key in other for other, _ in found)]
+        rows = {row for _, row in found}
+        # 계정이 둘 이상이면 값 하나로 답할 수 없으므로 None (모델로 넘김)
+        return rows.pop() if len(rows) == 1 else None
+
+    def format_amount(self, value):
+        return f"{value:,.0f} {self.unit}"
+
+def _format_percent(value):
+    return f"{value:,.2f}%"
+
+def _period_label(period):
+    return f"{period}년" if re.fullmatch(r'\d{4}', str(period)) else str(period)
+
+def _matches(question, keywords):
+    lower = question.lower()
+    return any(k in lower for k in keywords)
+
+def answer(df, question, unit="원"):
+    """
+    자주 묻는 질문(지표/계정 값/증감률)은 로컬에서 정확한 값으로 답함
+    답할 수 없거나 열린 질문이면 None (모델로 넘김)
+    """
+    if df is None or df.empty or _matches(question, OPEN_ENDED_KEYWORDS):
+        return None
+    data = FinancialData(df, unit)
+    periods = data.resolve_periods(question)
+    if not periods:
+        return None
+
+    def first_period(compute):
+        # 값을 구할 수 있는 첫 기간과 그 값
+        for period in periods:
+            value = compute(period)
+            if value is not None:
+                return _period_label(period), value
+        return None, None
+
+    if _matches(question, COST_MIX_KEYWORDS):
+        label, parts = first_period(lambda p: [
+            (METRICS[name][0], data.metric(name, p)) for name in COST_MIX if data.metric(name, p) is not None
+        ] or None)
+        if parts is None:
+            return None
+        return f"{label} 제조원가 구성: " + ", ".join(f"{title} {_format_percent(v)}" for title, v in parts)
+
+    # 지표 키워드는 긴 것부터 비교 ("매출총이익률"이 "이익률"보다 먼저)
+    metric_keywords = sorted(
+        ((k, name) for name, (_, keywords, _) in METRICS.items() for k in keywords),
+        key=lambda item: -len(item[0]),
+    )
+    lower = question.lower()
+    matched = [(k, name) for k, name in metric_keywords if k in lower]
+    metrics = {name for k, name in matched if not any(k != other and k in other for other, _ in matched)}
+    if len(metrics) > 1:
+        # 지표가 둘 이상 나온 질문은 모델로 넘김
+        return None
+    metric = metrics.pop() if metrics else None
+    if metric:
+        label, value = first_period(lambda p: data.metric(metric, p))
+        if value is None:
+            return None
+        return f"{label} {METRICS[metric][0]}은(는) {_format_percent(value)}입니다."
+
+    row = data.find_account(question)
+    if row is None:
+        return None
+    name = str(df['Account_Name'].iat[row]).strip()
+
+    quarterly = _matches(question, QOQ_KEYWORDS)
+    if quarterly or _matches(question, GROWTH_KEYWORDS):
+        label, growth = first_period(lambda p: data.growth(row, p, quarterly=quarterly))
+        if growth is None:
+            return None
+        current, previous, before, rate = growth
+        return (
+            f"{label} {name}은(는) {data.format_amount(current)}으로 "
+            f"{_period_label(previous)}({data.format_amount(before)}) 대비 {_format_percent(rate)} 변동했습니다."
+        )
+
+    label, value = first_period(lambda p: data.value(row, p))
+    if value is None:
+        return None
+    return f"{label} {name}은(는) {data.format_amount(value)}입니다."
+
+def grounding_text(df, unit="원"):
+    """
+    모델에 함께 보낼 계산된 지표 (CSV, 비율은 %)
+    """
+    if df is None or df.empty:
+        return ""
+    table = FinancialData(df, unit).metrics_table()
+    if table.empty:
+        return ""
+    return table.round(2).to_csv()
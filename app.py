@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
-import logic 
 import ui_results  # [UI 모듈 임포트]
+import result_cache
+import jobs
 
 # 페이지 설정
 st.set_page_config(page_title="Financial Report AI", layout="wide")
@@ -39,6 +39,13 @@ def inject_security_code():
 
 inject_security_code()
 
+@st.cache_resource
+def start_job_workers():
+    # 서버 프로세스당 한 번: 작업 프로세스 관리자가 없으면 띄움 (FSMERGER_JOB_WORKERS=0이면 jobs.py를 따로 실행)
+    return jobs.ensure_workers()
+
+start_job_workers()
+
 # --- CSS: 스타일링 ---
 st.markdown("""
     <style>
@@ -89,40 +96,47 @@ if uploaded_files:
     file_list_html += '</div>'
     st.markdown(file_list_html, unsafe_allow_html=True)
 
+    # 같은 파일은 추출 결과/모델 응답을 캐시에서 재사용함
+    if st.button("🗑️ 분석 캐시 비우기"):
+        result_cache.clear()
+        st.session_state.pop('reuse_job', None)
+        st.toast("캐시를 비웠습니다. 다음 분석은 모든 파일을 새로 처리합니다.")
+    # 파일별 결과를 보관해 두고 추가/교체된 파일만 분석해서 기존 표에 합침
+    reuse = st.checkbox("이전 분석 결과 재사용 (추가·변경된 파일만 분석)", value=True)
+
     if st.session_state.api_key:
         if st.button("🚀 보고서 생성 시작", type="primary", use_container_width=True):
-            status = st.status("AI가 분석 중입니다...", expanded=True)
+            # 분석은 작업 프로세스에서 실행하고 화면은 진행 상황만 주기적으로 확인
+            # 작업 id를 주소에 남겨 새로고침 후에도 같은 작업에 다시 연결
+            previous = st.session_state.get('reuse_job') if reuse else None
             try:
-                # 1. 로직 실행 (logic.py)
-                raw_df = logic.process_smart_merge(st.session_state.api_key, uploaded_files)
-                
-                # 숫자 변환
-                for col in raw_df.columns:
-                    if col not in ['Statement', 'Level', 'Account_Name']:
-                        raw_df[col] = pd.to_numeric(raw_df[col], errors='coerce').fillna(0)
-                
-                # 빈 열 삭제
-                numeric_cols = [c for c in raw_df.columns if c not in ['Statement', 'Level', 'Account_Name']]
-                zero_cols = [c for c in numeric_cols if raw_df[c].abs().sum() == 0]
-                if zero_cols:
-                    raw_df = raw_df.drop(columns=zero_cols)
-                
-                st.session_state['raw_data'] = raw_df
-                
-                # 분석 새로 하면 채팅 기록도 리셋
-                if 'messages' in st.session_state:
-                    del st.session_state['messages']
-                    
-                status.update(label="✅ 분석 완료!", state="complete", expanded=False)
-            except Exception as e:
-                status.update(label="❌ 오류 발생", state="error")
-                st.error(f"에러 내용: {e}")
+                job_id = jobs.submit(
+                    jobs.user_id(st.session_state.api_key), st.session_state.api_key, uploaded_files,
+                    previous_job=previous,
+                )
+            except jobs.JobLimitError as e:
+                st.warning(f"⚠️ {e}")
+            else:
+                st.session_state['job_id'] = job_id
+                st.query_params['job'] = job_id
     else:
         st.warning("👆 상단에 API Key를 먼저 입력해주세요.")
 
+# 진행 중이거나 아직 불러오지 않은 작업 (새로고침 후에는 주소의 job 값으로 다시 연결)
+job_id = st.session_state.get('job_id') or st.query_params.get('job')
+if job_id and st.session_state.get('loaded_job') != job_id:
+    if st.session_state.api_key:
+        ui_results.render_job(job_id, jobs.user_id(st.session_state.api_key))
+    else:
+        st.info("API Key를 입력하면 진행 중인 분석 작업에 다시 연결합니다.")
+ui_results.render_run_summary()
+
 # ==========================================
 # [UI 3] 분석 결과 및 채팅 (모듈 호출)
 # ==========================================
 if 'raw_data' in st.session_state:
     # ui_results.py에 있는 함수 호출
-    ui_results.render_analysis_result(st.session_state.api_key)
\ No newline at end of file
+    ui_results.render_validation(st.session_state.api_key)
+    ui_results.render_provenance()
+    ui_results.render_analysis_result(st.session_state.api_key)
+    ui_results.render_diagnostics()
\ No newline at end of file
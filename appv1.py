@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
-from google import genai
+import gemini_client
 import io
 import json
-import openpyxl
+import numpy as np
+import workbook_reader
+import logic
+import compaction
+import schema
+import table_output
+import taxonomy
+import validation
 
 # 페이지 설정
 st.set_page_config(page_title="Excel Merger AI (Expert)", layout="wide")
@@ -34,22 +41,10 @@ with st.sidebar:
 
 # --- 정밀 파싱 함수 ---
 def load_excel_visible_only(file):
-    wb = openpyxl.load_workbook(file, data_only=True)
+    # 숨김 시트/행/열은 제외하고 병합된 머리글은 채워서 스트리밍으로 읽음
     all_dfs = []
 
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        if ws.sheet_state == 'hidden' or ws.sheet_state == 'veryHidden':
-            continue
-        
-        visible_data = []
-        for row_idx, row_cells in enumerate(ws.iter_rows(values_only=True), 1):
-            if ws.row_dimensions[row_idx].hidden:
-                continue
-            if not any(row_cells):
-                continue
-            visible_data.append(row_cells)
-        
+    for sheet_name, visible_data in workbook_reader.iter_visible_sheets(file.getvalue()):
         if visible_data:
             headers = visible_data[0]
             clean_headers = [str(h) if h is not None else f"Unnamed_{i}" for i, h in enumerate(headers)]
@@ -59,6 +54,24 @@ def load_excel_visible_only(file):
             
     return all_dfs
 
+def build_hierarchy(df):
+    # 모델이 준 Statement/Level과 합계 구조로 대/중/소 계정을 로컬에서 만듦 (합계가 세부 계정 뒤에 오는 표 포함)
+    periods = schema.period_columns(df)
+    statements = df['Statement'].astype(str).to_numpy()
+    levels = pd.to_numeric(df['Level'], errors='coerce').fillna(3).to_numpy(dtype=np.int64)
+    parents = validation.parent_tree(statements, levels, df[periods].to_numpy(dtype=np.float64))
+    names = df['Account_Name'].astype(str).tolist()
+    major, medium = [], []
+    for row in range(len(df)):
+        chain, parent = [], parents[row]
+        while parent >= 0:
+            chain.insert(0, names[parent])
+            parent = parents[parent]
+        major.append(chain[0] if chain else schema.STATEMENT_NAMES.get(statements[row], ''))
+        medium.append(chain[-1] if len(chain) > 1 else '')
+    return pd.DataFrame({'Major_Category': major, 'Medium_Category': medium, 'Minor_Category': names,
+                         **{period: df[period].to_numpy() for period in periods}})
+
 # --- 메인 로직 ---
 uploaded_files = st.file_uploader("엑셀 파일을 드래그하거나 선택하세요", accept_multiple_files=True, type=['xlsx', 'xls'])
 
@@ -87,72 +100,80 @@ if uploaded_files and st.session_state.api_key:
                 # 2. Gemini AI 분석
                 progress_text.text("🤖 AI가 데이터 순서를 유지하며 계정 구조를 생성 중입니다...")
                 
-                csv_data = merged_df.to_csv(index=False)
-                if len(csv_data) > 150000:
-                    csv_data = csv_data[:150000] + "\n...(생략됨)"
+                # 잘라내는 대신 압축 후 토큰 예산 단위로 나눠서 모두 보냄
+                raw_csv = merged_df.to_csv(index=False)
+                csv_data = compaction.compact_table(raw_csv)
+                csv_chunks = logic.split_into_chunks(
+                    [("Merged Data", csv_data)],
+                    limit=logic.CHUNK_TOKEN_BUDGET,
+                    measure=compaction.estimate_tokens
+                )
+                st.caption(
+                    f"추정 토큰 {compaction.estimate_tokens(raw_csv):,} → "
+                    f"{compaction.estimate_tokens(csv_data):,} (요청 {len(csv_chunks)}회)"
+                )
 
-                client = genai.Client(api_key=st.session_state.api_key)
+                client = gemini_client.get_client(st.session_state.api_key)
                 
                 # --- [핵심 수정] 프롬프트: 정렬 금지 및 순서 보존 명령 ---
-                prompt = f"""
+                # 분류(대/중/소)는 Level과 합계 구조로 로컬에서 만들고, 택사노미로 확신하는 계정은 Statement도 묻지 않음
+                def build_prompt(csv_data, unmapped):
+                    statement_rule = ""
+                    if unmapped is not None:
+                        statement_rule = f"""
+                [Statement 코드]
+                아래 [Unmapped Accounts] 계정의 행에만 "s"를 쓰고, 나머지 행은 "s"를 생략하십시오.
+                [Unmapped Accounts]
+                {json.dumps(unmapped, ensure_ascii=False)}
+                """
+                    return f"""
                 당신은 재무 회계 감사인(Financial Auditor)입니다. 
                 제공된 원본 데이터를 분석하여 계층 구조(Hierarchy)를 가진 재무제표를 작성하십시오.
 
                 [작업 순서]
-                1. **분류 (Classification):** 각 계정을 [대계정(Major) - 중계정(Medium) - 소계정(Minor)]으로 분류하십시오.
-                2. **매핑 (Mapping):** 분류된 소계정을 기준으로 연도별 금액을 매핑하십시오.
-                3. **순서 보존 (Order Preservation):** - **절대 계정명(Minor_Category)을 가나다순(Alphabetical)으로 정렬하지 마십시오.**
-                   - 가능한 한 입력 데이터(Input Data)의 행 순서를 유지하거나, 표준 재무제표 순서(자산 유동성 배열법 -> 부채 -> 자본 -> 매출 -> 비용)를 따르십시오.
+                1. **계층 (Level):** 각 계정의 Level을 표시하십시오. (1: 대계정/총계, 2: 중계정/소계, 3: 소계정)
+                2. **매핑 (Mapping):** 계정별 연도 금액을 매핑하십시오.
+                3. **순서 보존 (Order Preservation):** - **절대 계정명을 가나다순(Alphabetical)으로 정렬하지 마십시오.**
+                   - 입력 데이터(Input Data)의 행 순서를 그대로 유지하십시오.
 
                 [강력한 제약사항]
                 1. 원본 계정을 생략하거나 통합(Summarize)하지 마십시오.
-                2. 금액은 정확히 집계하고, 값이 없으면 0으로 표기하십시오.
-
-                [출력 포맷]
-                결과는 오직 **JSON 배열** 형태여야 합니다.
-                JSON 구조:
-                [
-                  {{
-                    "Major_Category": "자산",
-                    "Medium_Category": "유동자산",
-                    "Minor_Category": "현금및현금성자산",
-                    "2022": 50000,
-                    "2023": 52000,
-                    "2024": 55000
-                  }},
-                  ...
-                ]
-
+                2. 금액은 정확히 집계하고, 값이 없으면 null로 표기하십시오.
+                {statement_rule}
                 [분석할 데이터]:
                 {csv_data}
-                """
-                
-                response = client.models.generate_content(
-                    model="gemini-3-flash-preview", 
-                    contents=prompt
-                )
-                
-                # 3. 결과 처리
+                {table_output.OUTPUT_FORMAT}"""
+
+                # 3. 결과 처리 (표 형식(table_output) 스키마로 받아 검사를 통과한 행만 사용)
+                tables, responses, invalid = [], [], 0
                 try:
-                    cleaned_text = response.text.replace("```json", "").replace("```", "").strip()
-                    if "[" in cleaned_text and "]" in cleaned_text:
-                        start_idx = cleaned_text.find("[")
-                        end_idx = cleaned_text.rfind("]") + 1
-                        cleaned_text = cleaned_text[start_idx:end_idx]
-
-                    ai_result_json = json.loads(cleaned_text)
-                    ai_df = pd.DataFrame(ai_result_json)
-                    
-                    # [수정] 강제 정렬 코드(sort_values)를 삭제했습니다.
-                    # AI가 뱉어준 순서(JSON 리스트 순서) 그대로 출력합니다.
-                    
-                    # 컬럼 순서만 정리 (대-중-소, 그 뒤에 연도)
-                    fixed_cols = ['Major_Category', 'Medium_Category', 'Minor_Category']
-                    year_cols = sorted([c for c in ai_df.columns if c not in fixed_cols])
-                    final_cols = fixed_cols + year_cols
-                    final_cols = [c for c in final_cols if c in ai_df.columns]
-                    
-                    ai_df = ai_df[final_cols]
+                    for chunk in csv_chunks:
+                        statements, unmapped = logic.local_statements(chunk)
+                        pieces, state = [], {}
+                        responses.append(pieces)
+                        stream = gemini_client.generate_stream(
+                            client, build_prompt(chunk, unmapped), fallback_model=None, config=table_output.CONFIG
+                        )
+                        rows = list(table_output.iter_rows((pieces.append(p) or p for p in stream), state))
+                        for row in rows:
+                            if row[0] is None:
+                                row[0] = statements.get(taxonomy.normalize_name(row[2]))
+                        invalid += state['invalid'] + (0 if state['complete'] else 1)
+                        tables.append(schema.from_table(state['periods'] or [], rows))
+
+                    merged = schema.concat_results(tables)
+                    if merged.empty:
+                        raise table_output.MalformedOutputError("no rows")
+                    # Statement를 못 정한 행만 택사노미/모델로 채움
+                    merged = taxonomy.map_accounts(
+                        merged, client,
+                        lambda c, prompt, config: gemini_client.generate(c, prompt, fallback_model=None, config=config).text
+                    )
+                    if invalid:
+                        st.warning(f"⚠️ 형식이 틀리거나 잘린 응답이 있어 일부 행을 제외했습니다. ({invalid}건)")
+
+                    # AI가 준 행 순서 그대로 출력 (정렬하지 않음)
+                    ai_df = build_hierarchy(merged)
 
                     st.subheader("🏆 계층형 상세 재무제표 (순서 보존)")
                     st.dataframe(ai_df, use_container_width=True)
@@ -170,9 +191,9 @@ if uploaded_files and st.session_state.api_key:
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
                     
-                except json.JSONDecodeError:
+                except table_output.MalformedOutputError:
                     st.error("결과 변환 중 오류가 발생했습니다. AI 응답 원본을 확인해주세요.")
-                    st.text_area("AI Raw Response", response.text, height=300)
+                    st.text_area("AI Raw Response", "\n\n".join("".join(pieces) for pieces in responses), height=300)
                     
         except Exception as e:
             st.error(f"오류가 발생했습니다: {e}")
@@ -0,0 +1,266 @@
+"""
+Streamlit 없이 여러 법인의 재무제표를 한 번에 통합하는 배치 실행기
+
+    python batch.py 입력폴더 --out 결과폴더 --workers 4
+    python batch.py --manifest manifest.json --out 결과폴더 --unit 백만원
+    python batch.py 입력폴더 --out 결과폴더 --consolidate mapping.xlsx   (법인별 처리 후 연결까지)
+
+입력폴더: 하위 폴더 하나가 법인 하나 (폴더 바로 아래 파일들은 폴더 이름의 법인 하나로 처리)
+manifest: {"법인명": ["파일 경로", ...]} 형태의 JSON, 또는 "법인명,파일 경로" 줄로 된 CSV
+결과폴더에 법인별 엑셀(서식 적용)/Parquet와 checkpoint.json을 남기고,
+다시 실행하면 입력 파일이 바뀌지 않은 완료 법인은 건너뜀
+"""
+import io
+import os
+import csv
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import logic
+import schema
+import excel_export
+import result_cache
+import tracing
+import incremental
+import consolidation
+
+logger = logging.getLogger("fsmerger.batch")
+
+SUPPORTED_EXTENSIONS = {'xlsx', 'xls', 'csv', 'pdf', 'docx', 'doc', 'txt'}
+CHECKPOINT_NAME = "checkpoint.json"
+
+class NamedBytes(io.BytesIO):
+    """
+    파일 경로를 Streamlit 업로드 객체처럼 쓰기 위한 래퍼 (.name, .getvalue())
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+        self.size = len(self.getvalue())
+
+def _supported(path):
+    return os.path.isfile(path) and path.rsplit('.', 1)[-1].lower() in SUPPORTED_EXTENSIONS
+
+def entities_from_directory(root):
+    """
+    하위 폴더별로 법인 구성. 반환값: {법인명: [파일 경로, ...]}
+    """
+    entities = {}
+    loose = sorted(os.path.join(root, n) for n in os.listdir(root) if _supported(os.path.join(root, n)))
+    if loose:
+        entities[os.path.basename(os.path.abspath(root))] = loose
+    for name in sorted(os.listdir(root)):
+        folder = os.path.join(root, name)
+        if not os.path.isdir(folder):
+            continue
+        files = sorted(
+            os.path.join(dirpath, n)
+            for dirpath, _, names in os.walk(folder) for n in names
+            if _supported(os.path.join(dirpath, n))
+        )
+        if files:
+            entities[name] = files
+    return entities
+
+def entities_from_manifest(path):
+    """
+    manifest(JSON 또는 CSV)에서 법인별 파일 목록 읽기. 상대 경로는 manifest 위치 기준
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    entities = {}
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            items = [(entity, p) for entity, paths in json.load(f).items() for p in paths]
+        else:
+            items = [(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2 and row[0].strip()]
+    for entity, p in items:
+        entities.setdefault(entity, []).append(p if os.path.isabs(p) else os.path.join(base, p))
+    return entities
+
+def _safe_name(name):
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name).strip("._") or "entity"
+
+def _fingerprint(paths):
+    # 입력 파일 내용이 같으면 같은 값 (파일 순서 무관)
+    digests = []
+    for p in paths:
+        with open(p, 'rb') as f:
+            digests.append(f"{os.path.basename(p)}:{result_cache.file_hash(f)}")
+    digests.sort()
+    return result_cache.sha256_bytes("\n".join(digests).encode("utf-8"))
+
+class Checkpoint:
+    """
+    법인별 처리 결과를 JSON 파일에 기록 (법인 하나가 끝날 때마다 원자적으로 저장)
+    """
+
+    def __init__(self, path, reset=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if not reset and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def is_done(self, entity, fingerprint):
+        entry = self.entries.get(entity)
+        return bool(
+            entry and entry.get('status') == 'done' and entry.get('fingerprint') == fingerprint
+            and all(os.path.exists(p) for p in entry.get('outputs', []))
+        )
+
+    def record(self, entity, entry):
+        with self.lock:
+            self.entries[entity] = entry
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+def _parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def consolidate_entity(entity, paths, out_dir, api_key, unit="원", parquet=True, correct=False, **merge_options):
+    """
+    법인 하나의 파일들을 통합해서 엑셀(+Parquet)로 저장
+    correct=True이면 검증에 실패한 시트/청크만 한 번 다시 추출
+    merge_options는 logic.process_smart_merge에 그대로 전달
+    반환값: 체크포인트에 기록할 dict
+    """
+    started = time.perf_counter()
+    files = [NamedBytes(p) for p in paths]
+    base = os.path.join(out_dir, _safe_name(entity))
+    outputs = [f"{base}.xlsx"]
+    with tracing.trace(entity) as trace:
+        # 앱과 같은 방식으로 파일별 결과를 합침 (같은 계정/기간은 최신 파일 우선)
+        raw_df, file_results, run_df = incremental.analyze(api_key, files, **merge_options)
+        corrected = []
+        if correct and raw_df.attrs.get('validation'):
+            raw_df, corrected = incremental.reextract(
+                api_key, file_results, raw_df.attrs['file_keys'], raw_df.attrs['validation'],
+                max_workers=merge_options.get('max_workers', logic.MAX_WORKERS),
+                use_cache=merge_options.get('use_cache', True),
+            )
+        attrs = dict(run_df.attrs, validation=raw_df.attrs.get('validation', []))
+        display_df = schema.scale_rows(raw_df, schema.UNIT_DIVISORS[unit])
+
+        with tracing.span("excel_export", rows=len(display_df)):
+            excel_export.write_styled_excel(display_df, schema.STATEMENT_NAMES, unit, target=outputs[0])
+        if parquet:
+            # Parquet에는 단위 변환 전 원 단위 값을 저장
+            raw_df.attrs = {}
+            with tracing.span("parquet_export", rows=len(raw_df)):
+                raw_df.to_parquet(f"{base}.parquet", index=False)
+            outputs.append(f"{base}.parquet")
+
+    # 단계별 시간/토큰 기록 (모니터링 수집용)
+    if trace is not None:
+        with open(f"{base}.trace.json", "w", encoding="utf-8") as f:
+            f.write(trace.to_json(indent=2))
+
+    return {
+        'status': 'done',
+        'outputs': outputs,
+        'rows': len(raw_df),
+        'seconds': round(time.perf_counter() - started, 3),
+        'failed_chunks': attrs.get('failed_chunks', []),
+        'truncated_chunks': attrs.get('truncated_chunks', []),
+        'validation_issues': len(attrs.get('validation', [])),
+        'corrected_sources': corrected,
+    }
+
+def run_batch(entities, out_dir, api_key, workers=2, unit="원", parquet=True, resume=True, correct=False,
+              **merge_options):
+    """
+    여러 법인을 workers개씩 동시에 처리. 실패한 법인은 기록만 하고 나머지는 계속 진행
+    반환값: {법인명: 체크포인트 항목}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(out_dir, CHECKPOINT_NAME), reset=not resume)
+    if parquet and not _parquet_available():
+        logger.warning("pyarrow가 없어 Parquet 저장을 건너뜁니다")
+        parquet = False
+
+    def run(entity, paths, fingerprint):
+        try:
+            entry = consolidate_entity(
+                entity, paths, out_dir, api_key, unit=unit, parquet=parquet, correct=correct, **merge_options
+            )
+        except Exception as e:
+            logger.exception("%s 처리 실패", entity)
+            entry = {'status': 'failed', 'error': str(e)}
+        entry['fingerprint'] = fingerprint
+        entry['files'] = paths
+        checkpoint.record(entity, entry)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {}
+        for entity, paths in entities.items():
+            fingerprint = _fingerprint(paths)
+            if resume and checkpoint.is_done(entity, fingerprint):
+                logger.info("%s: 이전 실행에서 완료됨, 건너뜀", entity)
+                continue
+            futures[pool.submit(run, entity, paths, fingerprint)] = entity
+        for future in as_completed(futures):
+            entry = future.result()
+            logger.info("%s: %s (%s행, %ss)", futures[future], entry['status'],
+                        entry.get('rows', '-'), entry.get('seconds', '-'))
+
+    return {entity: checkpoint.entries.get(entity) for entity in entities}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="여러 법인 재무제표 일괄 통합 (Streamlit 없이 실행)")
+    parser.add_argument("input", nargs="?", help="법인별 하위 폴더가 있는 입력 폴더")
+    parser.add_argument("--manifest", help="법인별 파일 목록 (JSON 또는 CSV)")
+    parser.add_argument("--out", required=True, help="결과 폴더")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY"),
+                        help="Gemini API Key (기본값: GEMINI_API_KEY / GOOGLE_API_KEY 환경변수)")
+    parser.add_argument("--workers", type=int, default=2, help="동시에 처리할 법인 수")
+    parser.add_argument("--chunk-workers", type=int, default=logic.MAX_WORKERS, help="법인별 동시 모델 호출 수")
+    parser.add_argument("--unit", choices=list(schema.UNIT_DIVISORS), default="원", help="엑셀 표시 단위")
+    parser.add_argument("--no-parquet", action="store_true", help="Parquet 저장 안 함")
+    parser.add_argument("--restart", action="store_true", help="체크포인트를 무시하고 처음부터 다시 처리")
+    parser.add_argument("--no-cache", action="store_true", help="추출/응답 캐시 사용 안 함")
+    parser.add_argument("--no-dedup", action="store_true", help="파일 간 중복 표/기간 열을 빼지 않고 모두 모델에 보냄")
+    parser.add_argument("--correct", action="store_true", help="검증에 실패한 시트/청크만 한 번 다시 추출")
+    parser.add_argument("--consolidate", nargs="?", const="", metavar="MAPPING",
+                        help="법인별 처리 후 연결 재무제표 작성 (지분율/내부거래/계정매핑 파일, 생략 가능)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.input and not args.manifest:
+        parser.error("입력 폴더 또는 --manifest 중 하나는 필요합니다")
+    if not args.api_key:
+        parser.error("--api-key 또는 GEMINI_API_KEY 환경변수가 필요합니다")
+
+    entities = entities_from_manifest(args.manifest) if args.manifest else entities_from_directory(args.input)
+    if not entities:
+        parser.error("처리할 파일이 없습니다")
+    if args.consolidate is not None and (args.no_parquet or not _parquet_available()):
+        parser.error("--consolidate에는 법인별 Parquet 결과가 필요합니다 (pyarrow 설치, --no-parquet 제외)")
+
+    results = run_batch(
+        entities, args.out, args.api_key, workers=args.workers, unit=args.unit,
+        parquet=not args.no_parquet, resume=not args.restart, correct=args.correct,
+        max_workers=args.chunk_workers, use_cache=not args.no_cache, deduplicate=not args.no_dedup,
+    )
+    failed = [entity for entity, entry in results.items() if not entry or entry.get('status') != 'done']
+    logger.info("완료 %d / 실패 %d", len(results) - len(failed), len(failed))
+    if args.consolidate is not None:
+        # 실패한 법인은 빼고 연결 (로그에 남김)
+        consolidation.run(args.out, args.consolidate or None, unit=args.unit, entities=list(entities))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""
+연결(consolidation) 벤치마크 (가짜 법인 결과, API Key 불필요)
+
+    python benchmarks/bench_consolidation.py --entities 120 --rows 400 --periods 16 --rules 200
+    python benchmarks/bench_consolidation.py --excel --no-entity-sheets
+
+단계: 법인 쌓기+합산+내부거래 제거(consolidate) / 엑셀 저장(--excel)
+결과는 --output 파일에 JSON 한 줄씩 추가 (버전 간 비교용)
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import schema  # noqa: E402
+import consolidation  # noqa: E402
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def make_entities(args):
+    """
+    법인마다 같은 계정 목록(일부 이름 표기만 다르게)과 무작위 금액을 가진 결과 DataFrame
+    """
+    rng = np.random.default_rng(0)
+    periods = [str(2025 - args.periods + 1 + j) for j in range(args.periods)]
+    statements = rng.choice(['BS', 'IS', 'COGM', 'CF'], args.rows)
+    levels = rng.integers(1, 4, args.rows)
+    frames = {}
+    for e in range(args.entities):
+        # 법인마다 띄어쓰기/번호 표기가 달라도 같은 계정 키로 맞춰져야 함
+        names = [f"{i % 9 + 1}. 계정 {i}" if e % 2 else f"계정{i}" for i in range(args.rows)]
+        frame = pd.DataFrame({
+            'Statement': statements, 'Level': levels, 'Account_Name': names,
+            **{p: rng.random(args.rows) * 1e9 for p in periods},
+        })
+        frames[f"법인{e:03d}"] = schema.concat_results([frame])
+    ownership = [{'entity': f"법인{e:03d}", 'ownership': 60 + e % 40, 'method': 'full' if e % 5 else 'proportional'}
+                 for e in range(args.entities)]
+    eliminations = [{'entity': f"법인{e % args.entities:03d}", 'counterparty': f"법인{(e + 1) % args.entities:03d}",
+                     'account': f"계정{e % args.rows}"} for e in range(args.rules)]
+    return frames, consolidation.parse_mapping(ownership, eliminations)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entities', type=int, default=120, help='법인 수')
+    parser.add_argument('--rows', type=int, default=400, help='법인당 계정 행 수')
+    parser.add_argument('--periods', type=int, default=16, help='기간 컬럼 수')
+    parser.add_argument('--rules', type=int, default=200, help='내부거래 제거 규칙 수')
+    parser.add_argument('--excel', action='store_true', help='엑셀 저장 시간도 측정')
+    parser.add_argument('--no-entity-sheets', action='store_true', help='엑셀에 법인별 시트를 넣지 않음')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'consolidation.jsonl'),
+                        help='결과 파일 (.jsonl이면 한 줄 추가, 그 외에는 덮어씀)')
+    args = parser.parse_args()
+
+    frames, mapping = make_entities(args)
+    runs, counts = [], {}
+    for _ in range(args.repeat):
+        seconds = {}
+        started = time.perf_counter()
+        result = consolidation.consolidate(frames, mapping)
+        seconds['consolidate'] = time.perf_counter() - started
+        if args.excel:
+            started = time.perf_counter()
+            consolidation.write_excel(result, entity_sheets=not args.no_entity_sheets)
+            seconds['save_excel'] = time.perf_counter() - started
+        runs.append(seconds)
+        counts = {
+            'input_rows': len(result['stacked']),
+            'accounts': len(result['consolidated']),
+            'eliminations': len(result['eliminations']),
+            'skipped_rules': len(result['skipped']),
+        }
+
+    record = {
+        'benchmark': 'consolidation',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'params': vars(args),
+        'counts': counts,
+        'stages': {
+            stage: {
+                'min': round(min(r[stage] for r in runs), 6),
+                'median': round(statistics.median(r[stage] for r in runs), 6),
+            }
+            for stage in runs[0]
+        },
+    }
+
+    print(f"entities={args.entities} repeat={args.repeat} {counts}")
+    for stage, stats in record['stages'].items():
+        print(f"{stage:12s}: min {stats['min']:8.3f}s  median {stats['median']:8.3f}s")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        mode = 'a' if args.output.endswith('.jsonl') else 'w'
+        with open(args.output, mode, encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + ('\n' if mode == 'a' else ''))
+        print(f"결과 저장: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+엑셀 내보내기 벤치마크: 기존 save_styled_excel(셀 단위 서식) vs excel_export(write-only + 공용 스타일)
+
+    python benchmarks/bench_excel_export.py --rows 5000 --periods 12 --repeat 3
+"""
+import os
+import io
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from openpyxl.styles import PatternFill, Font
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import excel_export  # noqa: E402
+
+TYPE_MAP = {'BS': '재무상태표', 'IS': '손익계산서', 'COGM': '제조원가명세서'}
+
+# 비교 기준: 변경 전 ui_results.save_styled_excel 그대로
+def legacy_save_styled_excel(df, sheet_name_map, unit_text):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        if 'Statement' in df.columns: statements = df['Statement'].unique()
+        else: statements = ['Result']
+            
+        for stmt in statements:
+            if 'Statement' in df.columns: sub_df = df[df['Statement'] == stmt].copy()
+            else: sub_df = df.copy()
+            
+            all_cols = sub_df.columns.tolist()
+            sorted_cols = excel_export.sort_columns_chronologically(all_cols)
+            final_cols = [c for c in sorted_cols if c in sub_df.columns]
+            
+            sheet_title = sheet_name_map.get(stmt, stmt)[:30]
+            sub_df[final_cols].to_excel(writer, sheet_name=sheet_title, index=False, startrow=1)
+            
+            ws = writer.sheets[sheet_title]
+            ws['A1'] = f"(단위: {unit_text})"
+            ws['A1'].font = Font(bold=True, italic=True)
+            
+            fill_lv1 = PatternFill(start_color="1F77B4", end_color="1F77B4", fill_type="solid")
+            font_lv1 = Font(color="FFFFFF", bold=True)
+            fill_lv2 = PatternFill(start_color="AEC7E8", end_color="AEC7E8", fill_type="solid")
+            font_lv2 = Font(color="000000", bold=True)
+            
+            numeric_col_indices = [i+1 for i, c in enumerate(final_cols) if c != 'Account_Name']
+            
+            sub_df = sub_df.reset_index(drop=True)
+            for idx, row in sub_df.iterrows():
+                excel_row = idx + 3
+                level = row.get('Level', 3)
+                for col_idx in range(1, len(final_cols) + 1):
+                    cell = ws.cell(row=excel_row, column=col_idx)
+                    if level == 1:
+                        cell.fill = fill_lv1
+                        cell.font = font_lv1
+                    elif level == 2:
+                        cell.fill = fill_lv2
+                        cell.font = font_lv2
+                    if col_idx - 1 in numeric_col_indices:
+                        cell.number_format = '#,##0'
+            ws.column_dimensions['A'].width = 30
+    return buffer
+
+
+def make_report(rows, periods, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Statement': rng.choice(list(TYPE_MAP), rows),
+        'Level': rng.choice([1, 2, 3], rows, p=[0.1, 0.2, 0.7]),
+        'Account_Name': [f"계정_{i}" for i in range(rows)],
+    })
+    for year in range(2025 - periods + 1, 2026):
+        df[str(year)] = rng.integers(-10**9, 10**10, rows).astype(np.float64)
+    return df
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--periods', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_report(args.rows, args.periods)
+    legacy = best_of(lambda: legacy_save_styled_excel(df, TYPE_MAP, "원"), args.repeat)
+    current = best_of(lambda: excel_export.write_styled_excel(df, TYPE_MAP, "원"), args.repeat)
+    print(f"rows={args.rows} periods={args.periods} repeat={args.repeat}")
+    print(f"legacy save_styled_excel : {legacy:8.3f}s")
+    print(f"excel_export (write-only): {current:8.3f}s  ({legacy / current:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+전체 파이프라인 단계별 벤치마크 (가짜 파일 + 가짜 모델, API Key 불필요)
+
+    python benchmarks/bench_pipeline.py --xlsx 2 --sheets 4 --rows 200 --periods 3 --pdf 1 --docx 1
+    python benchmarks/bench_pipeline.py --latency 0.5 --output benchmarks/results/pipeline.jsonl
+    python benchmarks/bench_pipeline.py --xlsx 2 --prior-reports 2 --pdf 0 --docx 0   (작년 보고서를 같이 올린 경우)
+    python benchmarks/bench_pipeline.py --pdf 1 --pdf-pages 8 --pdf-filler-pages 140   (감사보고서처럼 재무제표가 일부인 PDF)
+
+단계: 파일 추출 / 프롬프트 조립 / 모델 호출 / JSON 파싱 / 숫자 변환 / 화면용 준비 / 엑셀 저장 / 전체(process_smart_merge)
+결과는 --output 파일에 JSON 한 줄씩 추가 (버전 간 비교용)
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# 실제 사용 중인 결과 캐시를 지우지 않도록 임시 캐시 폴더 사용
+os.environ['FSMERGER_CACHE_DIR'] = tempfile.mkdtemp(prefix='fsmerger-bench-')
+import logic  # noqa: E402
+import schema  # noqa: E402
+import table_output  # noqa: E402
+import compaction  # noqa: E402
+import dedup  # noqa: E402
+import excel_export  # noqa: E402
+import result_cache  # noqa: E402
+import gemini_client  # noqa: E402
+import ui_results  # noqa: E402
+
+import synthetic  # noqa: E402
+from fake_gemini import FakeClient  # noqa: E402
+
+STAGES = [
+    'extract_file_content', 'prompt_assembly', 'model_call', 'json_parsing',
+    'numeric_coercion', 'render_preparation', 'save_styled_excel', 'end_to_end',
+]
+
+class NamedBytes(io.BytesIO):
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+def make_inputs(args):
+    files = []
+    for i in range(args.xlsx):
+        files.append(NamedBytes(f"법인{i}.xlsx", synthetic.make_xlsx(
+            args.sheets, args.rows, args.periods, quarterly=args.quarterly, seed=i)))
+        for shift in range(1, args.prior_reports + 1):
+            files.append(NamedBytes(f"법인{i}_{shift}년전.xlsx", synthetic.make_xlsx(
+                args.sheets, args.rows, args.periods, quarterly=args.quarterly, seed=i, shift=shift)))
+    for i in range(args.pdf):
+        files.append(NamedBytes(f"report{i}.pdf", synthetic.make_pdf(
+            args.pdf_pages, args.rows, args.periods, seed=i, filler_pages=args.pdf_filler_pages)))
+    for i in range(args.docx):
+        files.append(NamedBytes(f"주석{i}.docx", synthetic.make_docx(args.rows, args.periods, seed=i)))
+    return files
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_once(files, client, args):
+    """
+    각 단계를 한 번씩 실행. 반환값: ({단계: 초}, {개수 정보})
+    """
+    seconds, counts = {}, {}
+
+    def timed(stage, func):
+        started = time.perf_counter()
+        result = func()
+        seconds[stage] = time.perf_counter() - started
+        return result
+
+    result_cache.clear()
+    timed('extract_file_content', lambda: [logic.extract_file_content(f) for f in files])
+    file_sections, _ = logic.extract_all_sections(files, use_cache=True)
+
+    def assemble():
+        sections, _ = compaction.compact_sections(file_sections, names=[f.name for f in files])
+        if not args.no_dedup:
+            sections, _ = dedup.dedup_sections(sections, names=[f.name for f in files])
+        chunks = [
+            chunk for per_file in sections
+            for chunk in logic.split_into_chunks(per_file, limit=args.token_budget, measure=compaction.estimate_tokens)
+        ]
+        return [logic.build_prompt(chunk, logic.local_statements(chunk)[1]) for chunk in chunks]
+    prompts = timed('prompt_assembly', assemble)
+    counts['prompts'] = len(prompts)
+    counts['prompt_tokens'] = sum(compaction.estimate_tokens(p) for p in prompts)
+
+    def call_model():
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            return list(pool.map(
+                lambda p: "".join(gemini_client.generate_stream(client, p, config=table_output.CONFIG)), prompts
+            ))
+    texts = timed('model_call', call_model)
+
+    def parse():
+        tables = []
+        for text in texts:
+            state = {}
+            rows = list(table_output.iter_rows([text], state))
+            tables.append((state['periods'] or [], rows))
+        return tables
+    tables = timed('json_parsing', parse)
+    counts['model_rows'] = sum(len(rows) for _, rows in tables)
+    counts['output_tokens'] = sum(compaction.estimate_tokens(text) for text in texts)
+
+    def coerce():
+        df = schema.concat_results([schema.from_table(periods, rows) for periods, rows in tables])
+        return schema.drop_empty_periods(df)
+    df = timed('numeric_coercion', coerce)
+
+    def prepare():
+        ui_results.prepare_views.clear()
+        return ui_results.prepare_views(df, ui_results.dataset_key(df), schema.UNIT_DIVISORS[args.unit])
+    display_df, _, _ = timed('render_preparation', prepare)
+
+    timed('save_styled_excel', lambda: excel_export.write_styled_excel(display_df, schema.STATEMENT_NAMES, args.unit))
+
+    result_cache.clear()
+    merged = timed('end_to_end', lambda: logic.process_smart_merge(
+        "benchmark", files, use_cache=False, rule_based=not args.no_rule_based, max_workers=args.workers,
+        token_budget=args.token_budget, deduplicate=not args.no_dedup,
+    ))
+    counts['result_rows'] = len(merged)
+    counts['parsed_sections'] = merged.attrs.get('parsed_sections', 0)
+    counts['dedup_tokens_saved'] = sum(r['tokens_saved'] for r in merged.attrs.get('dedup_report', []))
+    return seconds, counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--xlsx', type=int, default=2, help='엑셀 파일 수')
+    parser.add_argument('--sheets', type=int, default=4, help='엑셀 파일당 시트 수')
+    parser.add_argument('--rows', type=int, default=200, help='시트/페이지당 행 수')
+    parser.add_argument('--periods', type=int, default=3, help='기간 컬럼 수')
+    parser.add_argument('--quarterly', action='store_true', help='기간을 분기(누적)로 생성')
+    parser.add_argument('--prior-reports', type=int, default=0,
+                        help='엑셀 파일마다 비교 기간이 겹치는 이전 보고서 수 (중복 제거 측정용)')
+    parser.add_argument('--pdf', type=int, default=1, help='PDF 파일 수')
+    parser.add_argument('--pdf-pages', type=int, default=5, help='PDF 파일당 페이지 수')
+    parser.add_argument('--pdf-filler-pages', type=int, default=0, help='PDF 파일당 재무제표가 아닌 페이지 수')
+    parser.add_argument('--docx', type=int, default=1, help='Word 파일 수')
+    parser.add_argument('--latency', type=float, default=0.0, help='가짜 모델 호출당 지연(초)')
+    parser.add_argument('--seconds-per-1k-tokens', type=float, default=0.0, help='출력 1k 토큰당 추가 지연(초)')
+    parser.add_argument('--output-rows', default='echo', help="가짜 모델 출력: 'echo' 또는 고정 행 수")
+    parser.add_argument('--workers', type=int, default=logic.MAX_WORKERS, help='동시 모델 호출 수')
+    parser.add_argument('--token-budget', type=int, default=logic.CHUNK_TOKEN_BUDGET)
+    parser.add_argument('--no-rule-based', action='store_true', help='전체 실행에서 table_parser 사용 안 함')
+    parser.add_argument('--no-dedup', action='store_true', help='파일 간 중복 표 제거 안 함')
+    parser.add_argument('--unit', choices=list(schema.UNIT_DIVISORS), default='원')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'pipeline.jsonl'),
+                        help='결과 파일 (.jsonl이면 한 줄 추가, 그 외에는 덮어씀)')
+    args = parser.parse_args()
+
+    # 가짜 모델에는 호출 한도를 두지 않음
+    gemini_client.REQUESTS_PER_MINUTE = 10**9
+    gemini_client.TOKENS_PER_MINUTE = 10**12
+    gemini_client.set_client_factory(FakeClient.factory(
+        latency=args.latency, seconds_per_1k_tokens=args.seconds_per_1k_tokens, output=args.output_rows,
+    ))
+    client = gemini_client.get_client("benchmark")
+
+    files = make_inputs(args)
+    runs, counts = [], {}
+    for _ in range(args.repeat):
+        seconds, counts = run_once(files, client, args)
+        runs.append(seconds)
+    gemini_client.set_client_factory(None)
+
+    record = {
+        'benchmark': 'pipeline',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'params': vars(args),
+        'inputs': {'files': len(files), 'bytes': sum(f.size for f in files)},
+        'counts': counts,
+        'stages': {
+            stage: {
+                'min': round(min(r[stage] for r in runs), 6),
+                'median': round(statistics.median(r[stage] for r in runs), 6),
+            }
+            for stage in STAGES
+        },
+    }
+
+    print(f"files={record['inputs']['files']} bytes={record['inputs']['bytes']:,} repeat={args.repeat} {counts}")
+    for stage in STAGES:
+        print(f"{stage:22s}: min {record['stages'][stage]['min']:8.3f}s  median {record['stages'][stage]['median']:8.3f}s")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        mode = 'a' if args.output.endswith('.jsonl') else 'w'
+        with open(args.output, mode, encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + ('\n' if mode == 'a' else ''))
+        print(f"결과 저장: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+보이는 셀만 읽는 엑셀 리더 벤치마크: 기존 appv1.load_excel_visible_only(일반 모드) vs workbook_reader
+
+    python benchmarks/bench_workbook_reader.py --sheets 50 --rows 2000 --cols 14 --repeat 3
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import tracemalloc
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import workbook_reader  # noqa: E402
+
+# 비교 기준: 변경 전 appv1.load_excel_visible_only의 읽기 부분 그대로 (DataFrame 변환 제외)
+def legacy_visible_rows(data):
+    wb = openpyxl.load_workbook(io.BytesIO(data), data_only=True)
+    sheets = []
+
+    for sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+        if ws.sheet_state == 'hidden' or ws.sheet_state == 'veryHidden':
+            continue
+
+        visible_data = []
+        for row_idx, row_cells in enumerate(ws.iter_rows(values_only=True), 1):
+            if ws.row_dimensions[row_idx].hidden:
+                continue
+            if not any(row_cells):
+                continue
+            visible_data.append(row_cells)
+        sheets.append((sheet_name, visible_data))
+    return sheets
+
+def make_workbook(sheets, rows, cols):
+    # 시트마다 병합된 2줄 머리글 + 숨김 열 1개 + 10행마다 숨김 행, 마지막 시트는 숨김
+    wb = openpyxl.Workbook(write_only=True)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Sheet{s}")
+        ws.column_dimensions['C'].hidden = True
+        for r in range(0, rows, 10):
+            ws.row_dimensions[r + 3].hidden = True
+        ws.append(["계정과목"] + [f"{2010 + c // 2}년" for c in range(cols - 1)])
+        ws.append([None] + ["금액" if c % 2 == 0 else "비고" for c in range(cols - 1)])
+        for r in range(rows):
+            ws.append([f"계정_{r}"] + [r * 1000 + c for c in range(cols - 1)])
+        ws.merged_cells.ranges.add(openpyxl.worksheet.cell_range.CellRange("B1:C1"))
+        if s == sheets - 1:
+            ws.sheet_state = 'hidden'
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sheets', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--cols', type=int, default=14)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_workbook(args.sheets, args.rows, args.cols)
+    legacy, legacy_mem = measure(lambda: legacy_visible_rows(data), args.repeat)
+    current, current_mem = measure(lambda: list(workbook_reader.iter_visible_sheets(data)), args.repeat)
+    print(f"sheets={args.sheets} rows={args.rows} cols={args.cols} size={len(data) / 1024 / 1024:.1f}MB")
+    print(f"legacy load_workbook     : {legacy:8.3f}s  peak {legacy_mem:8.1f}MB")
+    print(f"workbook_reader          : {current:8.3f}s  peak {current_mem:8.1f}MB  ({legacy / current:.1f}x)")
+
+if __name__ == '__main__':
+    main()
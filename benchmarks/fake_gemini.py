@@ -0,0 +1,142 @@
+"""
+벤치마크용 가짜 genai.Client (네트워크/API Key 없이 응답 지연과 출력 크기를 흉내냄)
+
+    import gemini_client
+    from fake_gemini import FakeClient
+    gemini_client.set_client_factory(FakeClient.factory(latency=0.5))
+"""
+import os
+import re
+import sys
+import json
+import time
+import functools
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compaction  # noqa: E402
+import table_parser  # noqa: E402
+
+_NUMBER_RE = re.compile(r'^(\(-?[\d,]+(\.\d+)?\)|-?[\d,]+(\.\d+)?)$')
+
+def echo_rows(prompt):
+    """
+    프롬프트의 [Input Data]에서 계정명 + 금액 행을 찾아 추출 결과처럼 되돌려줌
+    """
+    body = prompt.split('[Input Data]', 1)[-1].split('[Output Format]', 1)[0]
+    unmapped = _unmapped(prompt)
+    statement, period_names, rows = 'IS', [], []
+    for line in body.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('File:'):
+            statement = table_parser.detect_statement([line.split('| Sheet:', 1)[-1]]) or statement
+            continue
+        cells = [c.strip() for c in line.split(',')] if ',' in line and not re.search(r'\d,\d{3}(?!\d)', line) \
+            else line.split()
+        labels = [c for c in cells if not _NUMBER_RE.match(c)]
+        numbers = [c for c in cells if _NUMBER_RE.match(c)]
+        normalized = [table_parser.normalize_period(c) for c in cells[1:]]
+        if normalized and all(normalized):
+            period_names = normalized
+            continue
+        if not numbers or not labels or not period_names:
+            continue
+        row = {'Statement': statement, 'Level': 3, 'Account_Name': ' '.join(labels)}
+        if unmapped is not None and row['Account_Name'] not in unmapped:
+            # 로컬에서 분류한 계정은 "s"를 생략 (logic.build_prompt의 [Unmapped Accounts])
+            row['Statement'] = None
+        for period, value in zip(period_names, numbers[-len(period_names):]):
+            row[period] = table_parser.parse_amount(value)
+        rows.append(row)
+    return rows
+
+def _unmapped(prompt):
+    match = re.search(r'\[Unmapped Accounts\]\s*(\[.*?\])\n', prompt, re.S)
+    return set(json.loads(match.group(1))) if match else None
+
+def classify_rows(prompt):
+    # taxonomy._classify_with_model 질의에는 계정마다 IS / Level 3으로 답함
+    match = re.search(r'\[Account Names\]\s*(\[.*?\])', prompt, re.S)
+    names = json.loads(match.group(1)) if match else []
+    return [{'n': name, 's': 'IS', 'l': 3} for name in names]
+
+def table_answer(rows):
+    """
+    dict 행 목록을 표 형식(table_output) 응답으로 변환 (response_schema를 준 호출용)
+    """
+    periods = list(dict.fromkeys(k for row in rows for k in row if k not in ('Statement', 'Level', 'Account_Name')))
+    return {'periods': periods, 'rows': [
+        {**({'s': row['Statement']} if row['Statement'] is not None else {}),
+         'l': row['Level'], 'n': row['Account_Name'], 'v': [row.get(p) for p in periods]}
+        for row in rows
+    ]}
+
+class FakeModels:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def _answer(self, contents, config=None):
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        if '[Account Names]' in prompt:
+            rows = classify_rows(prompt)
+        elif self.owner.output == 'echo':
+            rows = echo_rows(prompt)
+        else:
+            rows = [
+                {'Statement': 'IS', 'Level': 3, 'Account_Name': f'계정_{i}', '2024': i * 1000}
+                for i in range(int(self.owner.output))
+            ]
+        if getattr(config, 'response_schema', None) is not None and '[Account Names]' not in prompt:
+            rows = table_answer(rows)
+        text = json.dumps(rows, ensure_ascii=False)
+        usage = SimpleNamespace(
+            prompt_token_count=compaction.estimate_tokens(prompt),
+            candidates_token_count=compaction.estimate_tokens(text),
+        )
+        self.owner.calls += 1
+        time.sleep(self.owner.latency + usage.candidates_token_count / 1000 * self.owner.seconds_per_1k_tokens)
+        return text, usage
+
+    def generate_content(self, model, contents, config=None):
+        text, usage = self._answer(contents, config)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content_stream(self, model, contents, config=None):
+        text, usage = self._answer(contents, config)
+        size = max(1, self.owner.stream_chunk_chars)
+        for i in range(0, len(text), size):
+            last = i + size >= len(text)
+            yield SimpleNamespace(text=text[i:i + size], usage_metadata=usage if last else None)
+
+class FakeCaches:
+    def __init__(self):
+        self.created, self.deleted = [], []
+
+    def create(self, model, config=None):
+        self.created.append(config)
+        return SimpleNamespace(name=f"cachedContents/fake-{model}-{len(self.created)}")
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+class FakeClient:
+    """
+    latency: 호출마다 기본 지연(초), seconds_per_1k_tokens: 출력 1k 토큰당 추가 지연
+    output: 'echo'(입력 표를 그대로 추출한 것처럼 응답) 또는 고정 행 수
+    """
+
+    def __init__(self, api_key=None, latency=0.0, seconds_per_1k_tokens=0.0, output='echo', stream_chunk_chars=200):
+        self.api_key = api_key
+        self.latency = latency
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.output = output
+        self.stream_chunk_chars = stream_chunk_chars
+        self.calls = 0
+        self.models = FakeModels(self)
+        self.caches = FakeCaches()
+
+    @classmethod
+    def factory(cls, **options):
+        return functools.partial(cls, **options)
@@ -0,0 +1,165 @@
+"""
+벤치마크용 가짜 재무제표 파일 생성 (xlsx / pdf / docx)
+
+    from synthetic import make_xlsx, make_pdf, make_docx
+"""
+import io
+
+import numpy as np
+import openpyxl
+import docx
+
+# (시트명, 계정 목록 [(계정명, Level)])
+STATEMENTS = [
+    ('재무상태표', [
+        ('자산총계', 1), ('유동자산', 1), ('현금및현금성자산', 2), ('매출채권', 2), ('재고자산', 2),
+        ('비유동자산', 1), ('유형자산', 2), ('무형자산', 2), ('부채총계', 1), ('유동부채', 1),
+        ('매입채무', 2), ('단기차입금', 2), ('비유동부채', 1), ('장기차입금', 2), ('자본총계', 1),
+        ('자본금', 2), ('이익잉여금', 2),
+    ]),
+    ('손익계산서', [
+        ('매출액', 1), ('매출원가', 1), ('매출총이익', 1), ('판매비와관리비', 1), ('급여', 2),
+        ('감가상각비', 2), ('지급수수료', 2), ('광고선전비', 2), ('영업이익', 1), ('영업외수익', 1),
+        ('이자수익', 2), ('영업외비용', 1), ('이자비용', 2), ('법인세비용차감전순이익', 1),
+        ('법인세비용', 1), ('당기순이익', 1),
+    ]),
+    ('제조원가명세서', [
+        ('재료비', 1), ('원재료비', 2), ('노무비', 1), ('급여', 2), ('퇴직급여', 2), ('경비', 1),
+        ('전력비', 2), ('수선비', 2), ('외주가공비', 2), ('당기총제조비용', 1), ('당기제품제조원가', 1),
+    ]),
+    ('현금흐름표', [
+        ('영업활동현금흐름', 1), ('당기순이익', 2), ('감가상각비', 2), ('투자활동현금흐름', 1),
+        ('유형자산의취득', 2), ('재무활동현금흐름', 1), ('차입금의증가', 2), ('현금의증가', 1),
+    ]),
+]
+
+# PDF는 기본 글꼴(Helvetica)만 쓰므로 영문 계정명 사용
+PDF_ACCOUNTS = [
+    'Revenue', 'Cost of sales', 'Gross profit', 'Selling and admin expenses', 'Salaries', 'Depreciation',
+    'Operating income', 'Finance income', 'Finance costs', 'Profit before tax', 'Income tax', 'Net income',
+]
+
+def periods(count, quarterly=False):
+    """
+    최근 기간부터 count개 기간명 (연도 또는 분기 누적)
+    """
+    if not quarterly:
+        return [str(2025 - count + 1 + i) for i in range(count)]
+    names = []
+    for i in range(count):
+        year, quarter = 2025 - (count - 1 - i) // 4, 4 - (count - 1 - i) % 4
+        names.append(f"{year}.{quarter}Q(Cum)")
+    return names
+
+def account_rows(accounts, rows):
+    """
+    기본 계정 뒤에 세부 계정을 붙여 rows개로 맞춤 (세부 계정은 들여쓰기로 Level 3 표현)
+    """
+    out = []
+    i = 0
+    while len(out) < rows:
+        for name, level in accounts:
+            if len(out) >= rows:
+                break
+            out.append(("  " * (level - 1) + name if i == 0 else f"    {name}_세부{i}", level if i == 0 else 3))
+        i += 1
+    return out
+
+def make_xlsx(sheets=4, rows=40, period_count=3, quarterly=False, seed=0, shift=0):
+    """
+    shift를 주면 그만큼 이전 기간까지의 보고서 (같은 seed면 겹치는 기간 값이 같음: 작년 보고서의 비교 기간)
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    names = periods(period_count + shift, quarterly)[:period_count]
+    for s in range(sheets):
+        title, accounts = STATEMENTS[s % len(STATEMENTS)]
+        ws = wb.create_sheet(title if s < len(STATEMENTS) else f"{title}_{s}")
+        ws.append([title])
+        ws.append(['과목'] + names)
+        # 최근 기간부터 기간별로 값을 뽑아 shift가 달라도 같은 기간은 같은 값
+        rng = np.random.default_rng([seed, s])
+        values = rng.integers(1_000, 10**10, (period_count + shift, rows))[shift:][::-1]
+        for r, (name, _) in enumerate(account_rows(accounts, rows)):
+            ws.append([name] + [int(v) for v in values[:, r]])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _filler_page(p, rng):
+    # 감사보고서의 재무제표 외 페이지 (감사의견/목차 문장, 숫자가 드문드문 있는 주석)
+    if p % 3 == 0:
+        return [f"Independent Auditor's Report (page {p + 1})"] + [
+            "We have audited the statement of financial position, the income statement and the statement of "
+            "cash flows for the year then ended, and notes comprising significant accounting policies."
+        ] * 30
+    if p % 3 == 1:
+        return ["Contents"] + [f"{title} .......... {i + 3}" for i, title in enumerate(
+            ["Auditor's report", "Statement of financial position", "Income statement", "Statement of cash flows",
+             "Notes to the financial statements"] * 4)]
+    return [f"Notes to the financial statements - {p + 1}. Leases"] + [
+        f"Lease contract {r} for the office in {2000 + r} is measured at {int(v):,} on the balance date."
+        for r, v in enumerate(rng.integers(1_000, 10**6, 30))
+    ]
+
+def make_pdf(pages=5, rows=40, period_count=3, seed=0, filler_pages=0):
+    """
+    글자 추출이 가능한 최소 PDF (페이지마다 손익계산서 형태의 표)
+    filler_pages를 주면 재무제표 앞뒤에 감사의견/목차/주석 페이지를 절반씩 끼워 넣음 (페이지 분류 측정용)
+    """
+    rng = np.random.default_rng(seed)
+    names = periods(period_count)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_lines = []
+    for p in range(pages):
+        lines = [f"Income Statement (page {p + 1})", "Account " + " ".join(names)]
+        for r in range(rows):
+            name = PDF_ACCOUNTS[r % len(PDF_ACCOUNTS)] + (f" {r // len(PDF_ACCOUNTS)}" if r >= len(PDF_ACCOUNTS) else "")
+            lines.append(name + " " + " ".join(f"{int(v):,}" for v in rng.integers(1_000, 10**9, period_count)))
+        page_lines.append(lines)
+    fillers = [_filler_page(p, rng) for p in range(filler_pages)]
+    page_lines = fillers[:filler_pages // 2] + page_lines + fillers[filler_pages // 2:]
+
+    page_ids = []
+    for lines in page_lines:
+        text = "".join(f"({_pdf_escape(line)}) Tj T* " for line in lines)
+        stream = f"BT /F1 8 Tf 10 TL 40 800 Td {text}ET".encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def make_docx(paragraphs=40, period_count=3, seed=0):
+    rng = np.random.default_rng(seed)
+    names = periods(period_count)
+    document = docx.Document()
+    document.add_paragraph("손익계산서")
+    document.add_paragraph("과목 " + " ".join(names))
+    _, accounts = STATEMENTS[1]
+    for name, _ in account_rows(accounts, paragraphs):
+        document.add_paragraph(
+            name.strip() + " " + " ".join(f"{int(v):,}" for v in rng.integers(1_000, 10**9, period_count))
+        )
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
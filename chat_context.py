@@ -0,0 +1,223 @@
+import re
+import time
+
+import analytics
+import compaction
+import schema
+import table_parser
+import gemini_client
+
+# 질문 하나에 보내는 최대 행/기간 수와 함께 보내는 최근 대화 수
+MAX_CONTEXT_ROWS = 60
+MAX_CONTEXT_PERIODS = 8
+HISTORY_MESSAGES = 6
+
+# 계정명 동의어 (질문에 쓰는 말 -> 결과 표의 계정명). 이름은 analytics.name_key로 비교
+SYNONYMS = {
+    '매출액': ['매출', '수익', '영업수익', '판매', 'revenue', 'sales'],
+    '매출원가': ['원가', 'cogs', 'costofsales'],
+    '매출총이익': ['총이익', 'grossprofit'],
+    '판매비와관리비': ['판관비', '판매관리비', 'sg&a'],
+    '영업이익': ['영업손익', 'operatingincome', 'ebit'],
+    '당기순이익': ['순이익', '순손익', 'netincome'],
+    '이자비용': ['이자', 'interest'],
+    '감가상각비': ['감가상각', 'depreciation'],
+    '급여': ['인건비', '임금', 'salary'],
+    '현금및현금성자산': ['현금', 'cash'],
+    '매출채권': ['외상매출금', '채권', 'receivable'],
+    '재고자산': ['재고', 'inventory'],
+    '유형자산': ['설비', '토지', '건물', 'ppe'],
+    '단기차입금': ['차입금', '대출', 'borrowing'],
+    '장기차입금': ['차입금', '대출', 'borrowing'],
+    '자산총계': ['자산', 'assets'],
+    '부채총계': ['부채', 'liabilities', 'debt'],
+    '자본총계': ['자본', 'equity'],
+    '재료비': ['원재료', 'material'],
+    '노무비': ['인건비', 'labor'],
+    '영업활동현금흐름': ['영업현금흐름', '영업활동'],
+}
+
+_WORD_RE = re.compile(r'[가-힣A-Za-z&]{2,}')
+_PARTICLE_RE = re.compile(r'(은|는|이|가|을|를|의|에|와|과|도|만|로|으로|에서|대비|기준)$')
+
+class RowIndex:
+    """
+    결과 표의 행을 (재무제표, 계정명 키, 동의어)로 찾기 위한 색인 (데이터셋마다 한 번 생성)
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.periods = analytics.sorted_periods(df)
+        self.statements = df['Statement'].astype(str).tolist() if 'Statement' in df.columns else [''] * len(df)
+        self.levels = df['Level'].tolist() if 'Level' in df.columns else [schema.DEFAULT_LEVEL] * len(df)
+        self.keys = [analytics.name_key(name) for name in df['Account_Name'].astype(str).tolist()]
+        # 검색어 -> 행 번호 목록 (계정명 키와 동의어 모두)
+        self.terms = {}
+        for i, key in enumerate(self.keys):
+            if not key:
+                continue
+            self.terms.setdefault(key, []).append(i)
+            for synonym in SYNONYMS.get(key, []):
+                self.terms.setdefault(synonym.lower(), []).append(i)
+
+    def statements_in(self, question):
+        upper = question.upper()
+        found = []
+        for statement, keywords in table_parser.STATEMENT_KEYWORDS:
+            for keyword in keywords:
+                hit = re.search(rf'(?<![A-Z]){re.escape(keyword)}(?![A-Z])', upper) if keyword.isascii() \
+                    else keyword in question
+                if hit:
+                    found.append(statement)
+                    break
+        return found
+
+    def periods_in(self, question):
+        """
+        질문에 나온 연도의 기간 + 비교용 전년 기간. 연도가 없으면 최근 기간들
+        """
+        years = set(re.findall(r'(?:19|20)\d{2}', question))
+        if not years:
+            return self.periods[-MAX_CONTEXT_PERIODS:]
+        years |= {str(int(y) - 1) for y in years}
+        return [p for p in self.periods if str(p)[:4] in years][-MAX_CONTEXT_PERIODS:]
+
+    def score_rows(self, question):
+        """
+        행 번호 -> 관련도 (계정명이 질문에 그대로 나오면 3, 동의어 2, 질문 단어가 계정명 일부면 1)
+        """
+        text = analytics.name_key(question).lower()
+        words = {_PARTICLE_RE.sub('', w.lower()) for w in _WORD_RE.findall(question)}
+        words = {w for w in words if len(w) >= 2}
+        scores = {}
+        for term, rows in self.terms.items():
+            if len(term) < 2:
+                continue
+            if term in text:
+                score = 3 if rows and self.keys[rows[0]] == term else 2
+            elif any(w in term for w in words):
+                score = 1
+            else:
+                continue
+            for i in rows:
+                scores[i] = max(scores.get(i, 0), score)
+        return scores
+
+    def select(self, question, limit=MAX_CONTEXT_ROWS):
+        """
+        질문과 관련된 행/기간만 고른 DataFrame (원래 행 순서 유지)
+        남는 자리는 관련 재무제표의 Level 1 합계 행으로 채움
+        """
+        statements = self.statements_in(question)
+        scores = self.score_rows(question)
+        if statements:
+            scores = {i: s + 0.5 for i, s in scores.items() if self.statements[i] in statements} or scores
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))[:limit]
+        # 합계 행은 질문에 나온 재무제표 (없으면 찾은 행이 속한 재무제표, 그것도 없으면 전체)에서 채움
+        scope = set(statements) or {self.statements[i] for i in ranked}
+        in_scope = [i for i in range(len(self.keys)) if not scope or self.statements[i] in scope]
+        totals = [i for i in in_scope if self.levels[i] == 1 and i not in scores]
+        rows = sorted(ranked + totals[:max(0, limit - len(ranked))])
+
+        columns = [c for c in ['Statement', 'Account_Name'] if c in self.df.columns] + self.periods_in(question)
+        return self.df.iloc[rows][columns]
+
+def build_prefix(df, unit, include_rows=False):
+    """
+    대화 내내 바뀌지 않는 앞부분 (역할 안내 + 표 구성 + 계산된 지표)
+    include_rows=True이면 전체 행도 넣음 (컨텍스트 캐시로 만들 때만 사용, 질문마다 관련 행을 보낼 필요가 없어짐)
+    """
+    periods = analytics.sorted_periods(df)
+    statements = [schema.STATEMENT_NAMES.get(s, s) for s in df['Statement'].astype(str).unique()] \
+        if 'Statement' in df.columns else []
+    rows_text = "질문마다 관련된 행만 CSV로 함께 전달됩니다."
+    data_text = ""
+    if include_rows:
+        columns = [c for c in ['Statement', 'Account_Name'] if c in df.columns] + periods
+        rows_text = "전체 행은 아래 [전체 데이터]에 CSV로 있습니다."
+        data_text = f"""
+    [전체 데이터]
+    {df[columns].to_csv(index=False)}"""
+    return f"""
+    당신은 유능한 재무 분석가입니다.
+    사용자는 통합 재무제표(단위: {unit})를 보고 있습니다. {rows_text}
+    사용자의 질문에 대해 데이터를 기반으로 명확하고 통찰력 있게 답변하세요.
+
+    [표 구성]
+    재무제표: {", ".join(statements)}
+    기간: {", ".join(map(str, periods))}
+    전체 계정 수: {len(df)}
+{data_text}
+    [계산된 주요 지표 (%)]
+    {analytics.grounding_text(df, unit)}
+
+    [답변 가이드]
+    - 구체적인 수치를 인용하세요.
+    - 비율/증감률은 위의 계산된 지표 값을 그대로 사용하세요.
+    - 데이터에 없는 계정은 추측하지 말고 없다고 답하세요.
+    - 추세나 특이사항이 있다면 언급하세요.
+    """
+
+def build_turn(index, question, history=(), rows=True):
+    """
+    이번 질문에만 보내는 부분 (관련 행 + 최근 대화 + 질문). 전체 행이 캐시에 있으면 rows=False
+    """
+    recent = [m for m in history if m.get("role") in ("user", "assistant")][-HISTORY_MESSAGES:]
+    dialogue = "\n".join(
+        f"{'사용자' if m['role'] == 'user' else '비서'}: {m['content']}" for m in recent
+    )
+    data = f"""
+    [관련 데이터]
+    {index.select(question).to_csv(index=False)}
+""" if rows else ""
+    return f"""{data}
+    [이전 대화]
+    {dialogue or '(없음)'}
+
+    [사용자 질문]: {question}
+    """
+
+def _delete_cache(client, state):
+    if state.get('cache'):
+        gemini_client.delete_cache(client, state['cache'])
+        state['cache'] = None
+
+def ask(client, df, question, unit, state, dataset_key, history=()):
+    """
+    관련 행만 골라 모델에 질문
+    전체 행을 넣은 앞부분이 컨텍스트 캐시 최소 크기 이상이면 캐시로 만들어 재사용하고,
+    작거나 캐시를 만들 수 없으면 캐시 없이 앞부분 + 관련 행을 매번 보냄
+    state: 세션별로 유지되는 dict (색인/캐시 이름 보관)
+    반환값: 답변 텍스트
+    """
+    key = (dataset_key, unit)
+    if state.get('key') != key:
+        # 데이터가 바뀌면 이전 데이터의 캐시는 만료를 기다리지 않고 지움
+        _delete_cache(client, state)
+        state.clear()
+        state['key'] = key
+        state['index'] = RowIndex(df)
+        state['prefix'] = build_prefix(df, unit, include_rows=True)
+        size = compaction.estimate_tokens(state['prefix'])
+        if not gemini_client.MIN_CACHE_TOKENS <= size <= gemini_client.MAX_CACHE_TOKENS:
+            state['cache'] = None
+            state['prefix'] = build_prefix(df, unit)
+
+    if 'cache' not in state or (state['cache'] and state.get('cache_expires', 0) < time.time()):
+        _delete_cache(client, state)
+        state['cache'] = gemini_client.create_cache(client, [state['prefix']])
+        # 만료 직전 요청이 실패하지 않도록 여유를 두고 다시 만듦
+        state['cache_expires'] = time.time() + gemini_client.CACHE_TTL_SECONDS - 60
+        if state['cache'] is None:
+            state['prefix'] = build_prefix(df, unit)
+
+    if state['cache']:
+        turn = build_turn(state['index'], question, history, rows=False)
+        response = gemini_client.generate(
+            client, turn, fallback_model=None, config=gemini_client.cached_config(state['cache'])
+        )
+    else:
+        turn = build_turn(state['index'], question, history)
+        response = gemini_client.generate(client, f"{state['prefix']}\n{turn}", fallback_model=None)
+    return response.text
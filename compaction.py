@@ -0,0 +1,116 @@
+import re
+import io
+import csv
+import math
+import hashlib
+
+_AMOUNT_RE = re.compile(r'^\(?-?[\d,]+(\.\d+)?\)?$')
+_THOUSANDS_RE = re.compile(r'(?<=\d),(?=\d{3}(?!\d))')
+_SPACES_RE = re.compile(r'[ \t　]+')
+_ZERO_CELLS = {'0', '-', '—', '–', '0.0'}
+
+def estimate_tokens(text):
+    """
+    토큰 수 추정 (한글/비ASCII는 글자당 약 1토큰, ASCII는 약 4글자당 1토큰)
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return math.ceil(non_ascii + (len(text) - non_ascii) / 4)
+
+def compact_number(cell):
+    """
+    금액 셀 압축: 천단위 구분기호 제거, (1,234) -> -1234, 1000.0 -> 1000, 0/대시 -> 빈칸
+    """
+    text = cell.strip()
+    if text in _ZERO_CELLS:
+        return ''
+    if not _AMOUNT_RE.match(text):
+        return cell
+    digits = sum(ch.isdigit() for ch in text)
+    # "(1)" 같은 번호 표기는 금액으로 보지 않음
+    if text.startswith('(') and digits < 3 and ',' not in text:
+        return cell
+    negative = text.startswith('(') and text.endswith(')')
+    text = text.strip('()').replace(',', '')
+    if text.endswith('.0'):
+        text = text[:-2]
+    elif '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('', '0', '-0'):
+        return ''
+    return f"-{text.lstrip('-')}" if negative else text
+
+def is_text_section(header):
+    return header.endswith('(PDF)') or header.endswith('(Word)') or header.lower().endswith('.txt')
+
+def compact_table(body):
+    """
+    CSV 본문 압축: 숫자 압축, 반복되는 머리글 행/빈 행/빈 열 제거
+    """
+    rows = []
+    seen_headers = set()
+    for row in csv.reader(body.splitlines()):
+        # 계정명 앞 들여쓰기는 Level 판단에 쓰이므로 유지
+        row = [compact_number(cell) if cell.strip() else '' for cell in row]
+        if not any(row):
+            continue
+        # 숫자 없이 여러 칸이 채워진 행이 앞에서 나온 적 있으면 (페이지마다 반복된 머리글) 제거
+        if sum(1 for cell in row if cell) >= 2 and not any(_AMOUNT_RE.match(cell) for cell in row[1:] if cell):
+            key = tuple(row)
+            if key in seen_headers:
+                continue
+            seen_headers.add(key)
+        rows.append(row)
+    if not rows:
+        return ''
+
+    width = max(len(row) for row in rows)
+    used = [c for c in range(width) if any(c < len(row) and row[c] for row in rows)]
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    for row in rows:
+        cells = [row[c] if c < len(row) else '' for c in used]
+        while cells and not cells[-1]:
+            cells.pop()
+        writer.writerow(cells)
+    return out.getvalue()
+
+def compact_text(body):
+    """
+    PDF/Word 본문 압축: 공백 정리, 빈 줄 제거, 천단위 구분기호 제거
+    """
+    lines = []
+    for line in body.splitlines():
+        line = _SPACES_RE.sub(' ', line).strip()
+        if line:
+            lines.append(_THOUSANDS_RE.sub('', line))
+    return "\n".join(lines)
+
+def compact_sections(file_sections, names=None):
+    """
+    파일별 섹션을 압축하고 같은 파일 안의 중복 시트(압축 후 본문이 같은 시트)는 제거
+    다른 파일과 같은 시트는 남김: 파일별 결과는 그 파일만으로 완전해야 하므로
+    (앞선 파일을 빼고 다시 합쳐도 값이 남도록) 파일 간 중복은 dedup에서 빼고 추출 뒤 되살림
+    반환값: (압축된 파일별 섹션, 파일별 보고 [{'file', 'tokens_before', 'tokens_after', 'duplicates'}])
+    """
+    compacted, report = [], []
+    for i, sections in enumerate(file_sections):
+        seen, kept = set(), []
+        name = names[i] if names else (sections[0][0] if sections else '')
+        before = after = duplicates = 0
+        for header, body in sections:
+            before += estimate_tokens(header) + estimate_tokens(body)
+            body = compact_text(body) if is_text_section(header) else compact_table(body)
+            if not body.strip():
+                continue
+            digest = hashlib.sha1(body.encode('utf-8')).hexdigest()
+            if digest in seen:
+                duplicates += 1
+                continue
+            seen.add(digest)
+            kept.append((header, body))
+            after += estimate_tokens(header) + estimate_tokens(body)
+        compacted.append(kept)
+        report.append({'file': name, 'tokens_before': before, 'tokens_after': after, 'duplicates': duplicates})
+    return compacted, report
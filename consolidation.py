@@ -0,0 +1,499 @@
+"""
+여러 법인 결과를 연결(합산)하는 통합 모드
+
+    python consolidation.py 결과폴더 --mapping mapping.xlsx --unit 백만원
+    python batch.py 입력폴더 --out 결과폴더 --consolidate mapping.xlsx
+
+- 법인 차원(Entity)을 유지한 채 법인별 결과를 한 표로 쌓고, 계정은 정규화한 계정 키로 맞춤
+  (analytics.name_key + 매핑 파일의 계정 매핑, 같은 재무제표 안에서 같은 키가 여러 번 나오면 나온 순번으로 구분)
+- 연결 방법: full(전부 합산, 비지배지분 따로 표시) / proportional(지분율만큼 합산) / exclude(제외, 지분법 등)
+- 내부거래 제거: 매핑 파일의 법인/계정(/기간/금액)을 연결 합계에서 빼고 모든 상위 합계 행에도 반영
+  (상위 행은 validation.parent_tree: 합계 행이 하위 계정 앞에 있든 뒤에 있든 하위 합이 맞는 쪽)
+  금액이 없으면 그 법인 계정 값 전체, 상대법인이 연결 범위 밖이면 제거하지 않음
+- 합산/제거는 범주형 코드 기준 groupby와 numpy 배열 연산으로 처리 (행 단위 파이썬 반복 없음)
+
+매핑 파일: 엑셀(시트 '지분율', '내부거래', '계정매핑') 또는 JSON
+    {"ownership": [{"법인": "A", "지분율": 80, "방법": "full"}],
+     "eliminations": [{"법인": "A", "상대법인": "B", "재무제표": "IS", "계정": "매출액", "기간": "2024", "금액": 1000}],
+     "accounts": {"매출": "매출액"}}
+"""
+import os
+import json
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import schema
+import analytics
+import validation
+import excel_export
+import tracing
+
+logger = logging.getLogger("fsmerger.consolidation")
+
+OWNERSHIP_SHEET = '지분율'
+ELIMINATION_SHEET = '내부거래'
+ACCOUNT_SHEET = '계정매핑'
+OUTPUT_NAME = '연결'
+
+# 매핑 파일 머리글 -> 내부 이름
+_COLUMNS = {
+    '법인': 'entity', '법인명': 'entity', 'entity': 'entity',
+    '지분율': 'ownership', 'ownership': 'ownership',
+    '방법': 'method', '연결방법': 'method', 'method': 'method',
+    '상대법인': 'counterparty', 'counterparty': 'counterparty',
+    '재무제표': 'statement', 'statement': 'statement',
+    '계정': 'account', '계정명': 'account', 'account': 'account',
+    '기간': 'period', 'period': 'period',
+    '금액': 'amount', 'amount': 'amount',
+    '표준계정': 'standard', 'standard': 'standard',
+}
+OWNERSHIP_COLUMNS = ['entity', 'ownership', 'method']
+ELIMINATION_COLUMNS = ['entity', 'counterparty', 'statement', 'account', 'period', 'amount']
+ACCOUNT_COLUMNS = ['account', 'standard']
+
+METHODS = ('full', 'proportional', 'exclude')
+_METHODS = {
+    'full': 'full', '전부': 'full', '연결': 'full', '종속': 'full',
+    'proportional': 'proportional', '비례': 'proportional', '공동': 'proportional',
+    'exclude': 'exclude', '제외': 'exclude', 'equity': 'exclude', '지분법': 'exclude',
+}
+_STATEMENTS = {**{code.upper(): code for code in schema.STATEMENTS},
+               **{name: code for code, name in schema.STATEMENT_NAMES.items()}}
+
+# 비지배지분 표시 행: (재무제표, analytics.ACCOUNTS 기준 계정, 표시 이름) - 기준 계정 바로 아래에 넣음
+MINORITY_ROWS = [
+    ('BS', 'total_equity', '비지배지분'),
+    ('IS', 'net_income', '비지배지분순이익'),
+]
+
+def _blank(value):
+    return value is None or value != value or str(value).strip() == ''
+
+def _table(records, columns):
+    # 머리글을 내부 이름으로 바꾸고 없는 컬럼은 빈 값으로 채움 (모두 빈 행 제거)
+    frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    frame = frame.rename(columns=lambda c: _COLUMNS.get(str(c).strip().lower(), str(c).strip().lower()))
+    frame = frame.reindex(columns=columns).astype(object)
+    return frame.dropna(how='all').reset_index(drop=True)
+
+def _ownership(value):
+    """
+    지분율 표기(0.8, 80, "80%")를 0~1 비율로 변환 (비어 있으면 100%)
+    """
+    if _blank(value):
+        return 1.0
+    text = str(value).strip()
+    ratio = float(text.rstrip('%'))
+    return ratio / 100 if text.endswith('%') or ratio > 1 else ratio
+
+def _text(value):
+    return None if _blank(value) else str(value).strip()
+
+def parse_mapping(ownership=(), eliminations=(), accounts=()):
+    """
+    매핑 표(레코드 목록 또는 DataFrame)를 연결 규칙으로 변환
+    반환값: {'ownership': {법인: (지분율, 방법)}, 'eliminations': DataFrame, 'accounts': {계정 키: 표준 계정 키}}
+    """
+    rules = {}
+    for row in _table(ownership, OWNERSHIP_COLUMNS).itertuples(index=False):
+        if _blank(row.entity):
+            continue
+        method = _METHODS.get(str(row.method).strip().lower(), None) if not _blank(row.method) else 'full'
+        if method is None:
+            raise ValueError(f"{row.entity}: 알 수 없는 연결 방법 '{row.method}' (가능: {', '.join(METHODS)})")
+        rules[str(row.entity).strip()] = (_ownership(row.ownership), method)
+
+    table = _table(eliminations, ELIMINATION_COLUMNS)
+    table = table[table['entity'].map(_text).notna() & table['account'].map(_text).notna()]
+    table = pd.DataFrame({
+        'entity': table['entity'].map(_text),
+        'counterparty': table['counterparty'].map(_text),
+        'statement': table['statement'].map(lambda v: None if _blank(v) else _STATEMENTS.get(str(v).strip().upper(),
+                                                                                             _STATEMENTS.get(str(v).strip()))),
+        'account': table['account'].map(_text),
+        'period': table['period'].map(lambda v: None if _blank(v) else schema.normalize_column(v)),
+        'amount': table['amount'].map(lambda v: np.nan if _blank(v) else schema.to_amount(v)).astype(np.float64),
+    }, columns=ELIMINATION_COLUMNS).reset_index(drop=True)
+
+    aliases = {}
+    for row in _table(accounts, ACCOUNT_COLUMNS).itertuples(index=False):
+        if not _blank(row.account) and not _blank(row.standard):
+            aliases[analytics.name_key(row.account)] = analytics.name_key(row.standard)
+
+    return {'ownership': rules, 'eliminations': table, 'accounts': aliases}
+
+def load_mapping(path):
+    """
+    매핑 파일 읽기 (엑셀: 시트 '지분율'/'내부거래'/'계정매핑', JSON: ownership/eliminations/accounts)
+    """
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            raw = json.load(f)
+        ownership = raw.get('ownership', [])
+        if isinstance(ownership, dict):
+            ownership = [{'entity': k, 'ownership': v} for k, v in ownership.items()]
+        accounts = raw.get('accounts', [])
+        if isinstance(accounts, dict):
+            accounts = [{'account': k, 'standard': v} for k, v in accounts.items()]
+        return parse_mapping(ownership, raw.get('eliminations', []), accounts)
+
+    sheets = pd.read_excel(path, sheet_name=None, dtype=object)
+    empty = pd.DataFrame()
+    return parse_mapping(sheets.get(OWNERSHIP_SHEET, empty), sheets.get(ELIMINATION_SHEET, empty),
+                         sheets.get(ACCOUNT_SHEET, empty))
+
+def account_keys(names, aliases=None):
+    """
+    계정명 -> 정규화한 계정 키 (범주형). 이름 종류마다 한 번만 정규화하고 행에는 코드로 펼침
+    """
+    names = pd.Categorical(pd.Series(names, dtype=object).fillna('').astype(str))
+    keys = [analytics.name_key(name) or name for name in names.categories]
+    if aliases:
+        keys = [aliases.get(key, key) for key in keys]
+    codes, uniques = pd.factorize(pd.Index(keys, dtype=object))
+    return pd.Categorical.from_codes(codes[names.codes], categories=uniques)
+
+def stack_entities(frames):
+    """
+    법인별 결과를 Entity 컬럼이 붙은 한 표로 쌓음 (기간 컬럼은 전체 합집합, 없는 값은 0)
+    메타 컬럼은 컬럼 단위로 이어 붙여 범주형으로 만들고 기간 값은 float64 블록 하나에 채움
+    반환값: (DataFrame, 기간 목록)
+    """
+    names = [name for name, frame in frames.items() if frame is not None and len(frame)]
+    seen = dict.fromkeys(c for name in names for c in schema.period_columns(frames[name]))
+    periods = [c for c in schema.sort_columns_chronologically(list(seen)) if c != 'Account_Name']
+    position = {p: j for j, p in enumerate(periods)}
+
+    lengths = np.array([len(frames[name]) for name in names], dtype=np.int64)
+    block = np.zeros((int(lengths.sum()), len(periods)))
+    offset = 0
+    for name in names:
+        frame = frames[name]
+        cols = schema.period_columns(frame)
+        if cols:
+            block[offset:offset + len(frame), [position[c] for c in cols]] = \
+                frame[cols].to_numpy(dtype=np.float64, na_value=0.0)
+        offset += len(frame)
+
+    def column(col):
+        parts = [frames[name][col].astype(object) if col in frames[name].columns
+                 else pd.Series([None] * len(frames[name]), dtype=object) for name in names]
+        return pd.concat(parts, ignore_index=True) if parts else pd.Series([], dtype=object)
+
+    statements = column('Statement').fillna('').astype(str).str.strip().str.upper().map(_STATEMENTS)
+    stacked = pd.DataFrame({
+        'Entity': pd.Categorical.from_codes(np.repeat(np.arange(len(names)), lengths), categories=pd.Index(names)),
+        'Statement': pd.Categorical(statements.fillna('Other'), dtype=schema.STATEMENT_DTYPE),
+        'Level': pd.to_numeric(column('Level'), errors='coerce').fillna(schema.DEFAULT_LEVEL)
+                   .clip(1, schema.DEFAULT_LEVEL).to_numpy().astype(schema.LEVEL_DTYPE),
+        'Account_Name': pd.Categorical(column('Account_Name').fillna('').astype(str)),
+    })
+    return pd.concat([stacked, pd.DataFrame(block, columns=periods)], axis=1), periods
+
+def _match(rules, table, columns):
+    """
+    규칙마다 table의 'row' 번호 (statement가 빈 규칙은 statement 없이 맞춘 첫 행), 없으면 -1
+    """
+    rows = np.full(len(rules), -1, dtype=np.int64)
+    exact = rules['statement'].notna().to_numpy()
+    for mask, on in ((exact, columns), (~exact, [c for c in columns if c != 'statement'])):
+        if not mask.any():
+            continue
+        found = rules.loc[mask, on].merge(table.drop_duplicates(on)[on + ['row']], on=on, how='left')['row']
+        rows[mask] = found.fillna(-1).to_numpy(dtype=np.int64)
+    return rows
+
+def _eliminate(rules, stacked, values, groups, factors, periods, entity_index, aliases):
+    """
+    내부거래 제거 금액 행렬 (규칙 수 x 기간)과 규칙별 연결 행 번호, 적용하지 못한 규칙 목록
+    """
+    n = len(rules)
+    rules = rules.assign(key=np.asarray(account_keys(rules['account'], aliases), dtype=object))
+
+    # 법인 행: (법인, 재무제표, 계정 키) 중 첫 번째
+    first = (stacked['Occurrence'] == 0).to_numpy()
+    own = pd.DataFrame({
+        'entity': stacked['Entity'].astype(str).to_numpy()[first],
+        'statement': stacked['Statement'].astype(str).to_numpy()[first],
+        'key': stacked['Key'].astype(str).to_numpy()[first],
+        'row': np.flatnonzero(first),
+    })
+    entity_rows = _match(rules, own, ['entity', 'statement', 'key'])
+    target = groups[groups['occurrence'] == 0][['statement', 'key', 'row']]
+    target_rows = _match(rules, target, ['statement', 'key'])
+
+    factor = rules['entity'].map(lambda e: factors[entity_index[e]] if e in entity_index else 0.0).to_numpy(np.float64)
+    counter = rules['counterparty'].map(
+        lambda e: _blank(e) or (e in entity_index and factors[entity_index[e]] > 0)).to_numpy(dtype=bool)
+    position = {p: j for j, p in enumerate(periods)}
+    column = rules['period'].map(lambda p: -1 if _blank(p) else position.get(p, -2)).to_numpy(dtype=np.int64)
+    amounts = rules['amount'].to_numpy(dtype=np.float64)
+    by_amount = ~np.isnan(amounts)
+
+    reasons = np.select(
+        [factor == 0, ~counter, target_rows < 0, column == -2, ~by_amount & (entity_rows < 0)],
+        ['법인이 연결 범위 밖', '상대법인이 연결 범위 밖', '연결 결과에 계정 없음', '기간 없음', '법인 결과에 계정 없음'],
+        default='',
+    )
+    applied = reasons == ''
+
+    # 금액이 있으면 그 금액, 없으면 법인 계정 값(연결 비율 반영), 기간이 없으면 모든 기간
+    base = np.where(by_amount[:, None], np.nan_to_num(amounts)[:, None], values[np.maximum(entity_rows, 0)])
+    columns = np.ones((n, len(periods)), dtype=bool)
+    has_period = column >= 0
+    columns[has_period] = False
+    columns[np.flatnonzero(has_period), column[has_period]] = True
+    matrix = np.where(columns & applied[:, None], base, 0.0)
+
+    skipped = rules.loc[~applied, ['entity', 'counterparty', 'statement', 'account', 'period']]
+    skipped = skipped.astype(object).where(skipped.notna(), None).assign(reason=reasons[~applied]).to_dict('records')
+    return matrix, target_rows, applied, skipped
+
+def consolidate(frames, mapping=None):
+    """
+    법인별 결과를 연결. frames: {법인명: DataFrame} (모회사 먼저, 행 순서는 처음 나온 법인 기준)
+    반환값: {
+        'consolidated': 연결 DataFrame (일반 결과와 같은 구조, attrs에 validation),
+        'stacked': Entity/Key/Factor 컬럼이 붙은 법인별 전체 표,
+        'eliminations': 규칙별 제거 금액 (Entity/Counterparty/Statement/Account_Name + 기간),
+        'minority': 법인별 비지배지분, 'skipped': 적용하지 못한 제거 규칙, 'entities': frames
+    }
+    """
+    mapping = mapping or parse_mapping()
+    with tracing.span("consolidation", entities=len(frames)) as s:
+        stacked, periods = stack_entities(frames)
+        stacked.insert(4, 'Key', account_keys(stacked['Account_Name'], mapping['accounts']))
+        stacked.insert(5, 'Occurrence', stacked.groupby(
+            ['Entity', 'Statement', 'Key'], observed=True, sort=False).cumcount().to_numpy(dtype=np.int32))
+
+        entities = list(stacked['Entity'].cat.categories)
+        entity_index = {e: i for i, e in enumerate(entities)}
+        rules = [mapping['ownership'].get(e, (1.0, 'full')) for e in entities]
+        ratios = np.array([ratio for ratio, _ in rules], dtype=np.float64)
+        methods = np.array([method for _, method in rules], dtype=object)
+        factors = np.select([methods == 'full', methods == 'proportional'], [1.0, ratios], default=0.0)
+        entity_codes = stacked['Entity'].cat.codes.to_numpy()
+        stacked.insert(6, 'Factor', factors[entity_codes])
+
+        block = stacked[periods].to_numpy(dtype=np.float64)
+        values = block * stacked['Factor'].to_numpy()[:, None]
+
+        # 연결 범위 안의 행을 (재무제표, 계정 키, 순번)으로 묶어 합산 (그룹 번호는 처음 나온 순서)
+        included = np.flatnonzero(stacked['Factor'].to_numpy() > 0)
+        keys = stacked.iloc[included][['Statement', 'Key', 'Occurrence']]
+        group_ids = keys.groupby(['Statement', 'Key', 'Occurrence'], observed=True, sort=False).ngroup().to_numpy()
+        first = included[np.unique(group_ids, return_index=True)[1]]
+        sums = pd.DataFrame(values[included], columns=periods).groupby(group_ids, sort=True).sum().to_numpy()
+
+        # 재무제표 순서로 정렬 (같은 재무제표 안에서는 처음 나온 순서 유지)
+        statement_codes = stacked['Statement'].cat.codes.to_numpy()[first]
+        order = np.argsort(statement_codes, kind='stable')
+        first, sums = first[order], sums[order]
+        groups = pd.DataFrame({
+            'statement': stacked['Statement'].astype(str).to_numpy()[first],
+            'key': stacked['Key'].astype(str).to_numpy()[first],
+            'occurrence': stacked['Occurrence'].to_numpy()[first],
+            'row': np.arange(len(first)),
+        })
+        levels = stacked['Level'].to_numpy()[first]
+
+        # 내부거래 제거: 규칙 행의 금액을 연결 행과 그 상위 합계 행에서 뺌
+        eliminations = mapping['eliminations']
+        matrix, target_rows, applied, skipped = (np.zeros((0, len(periods))), np.zeros(0, dtype=np.int64),
+                                                 np.zeros(0, dtype=bool), [])
+        if len(eliminations) and len(first):
+            matrix, target_rows, applied, skipped = _eliminate(
+                eliminations, stacked, values, groups, factors, periods, entity_index, mapping['accounts'],
+            )
+            delta = np.zeros_like(sums)
+            np.add.at(delta, target_rows[applied], matrix[applied])
+            # 합계 행이 하위 계정 앞/뒤 어디에 있든 모든 상위 합계 행(유동자산, 자산총계 ...)에 반영
+            parents = validation.parent_tree(groups['statement'].to_numpy(), levels.astype(np.int64), sums)
+            depth, ancestor = np.zeros(len(parents), dtype=np.int64), parents.copy()
+            while (ancestor >= 0).any():
+                depth += ancestor >= 0
+                ancestor = np.where(ancestor >= 0, parents[np.maximum(ancestor, 0)], -1)
+            for d in range(int(depth.max(initial=0)), 0, -1):
+                rows = np.flatnonzero(depth == d)
+                np.add.at(delta, parents[rows], delta[rows])
+            sums = sums - delta
+        for rule in skipped:
+            logger.warning("내부거래 제거 규칙 건너뜀: %s", rule)
+
+        consolidated = pd.DataFrame({
+            'Statement': stacked['Statement'].to_numpy()[first],
+            'Level': levels,
+            'Account_Name': stacked['Account_Name'].to_numpy()[first],
+        })
+        consolidated = pd.concat([consolidated, pd.DataFrame(sums, columns=periods)], axis=1)
+        consolidated, minority = _add_minority(consolidated, stacked, block, groups, ratios, methods, periods,
+                                               mapping['accounts'])
+        consolidated = _typed(consolidated, periods)
+        consolidated.attrs['validation'] = validation.validate(consolidated)
+
+        elimination_table = _elimination_table(eliminations, matrix, applied, groups, target_rows, periods)
+        s.set(rows=len(stacked), accounts=len(consolidated), periods=len(periods),
+              eliminations=int(applied.sum()), skipped=len(skipped))
+
+    stacked = stacked.drop(columns='Occurrence')
+    return {
+        'consolidated': consolidated,
+        'stacked': stacked,
+        'eliminations': elimination_table,
+        'minority': minority,
+        'skipped': skipped,
+        'entities': frames,
+    }
+
+def _typed(df, periods):
+    # 일반 결과와 같은 컬럼 구성/형식 (Source/File은 빈 값)
+    empty = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=[''])
+    return pd.DataFrame({
+        'Statement': pd.Categorical(df['Statement'], dtype=schema.STATEMENT_DTYPE),
+        'Level': df['Level'].to_numpy().astype(schema.LEVEL_DTYPE),
+        'Account_Name': pd.Categorical(df['Account_Name'].astype(str)),
+        'Source': empty,
+        'File': empty.copy(),
+        **{p: df[p].to_numpy(dtype=np.float64) for p in periods},
+    })
+
+def _add_minority(consolidated, stacked, block, groups, ratios, methods, periods, aliases):
+    """
+    지분율 100% 미만 전부 연결 법인의 비지배지분(자본총계/당기순이익 x 비지배 비율)을 기준 계정 아래 행으로 추가
+    반환값: (행을 추가한 연결 DataFrame, 법인별 비지배지분 DataFrame)
+    """
+    share = np.where(methods == 'full', 1.0 - ratios, 0.0)
+    entity_codes = stacked['Entity'].cat.codes.to_numpy()
+    entities = stacked['Entity'].cat.categories
+    tables, extra, positions = [], [], []
+    for statement, account, label in MINORITY_ROWS:
+        keys = {aliases.get(k, k) for k in (analytics.name_key(n) for n in analytics.ACCOUNTS[account][1])}
+        mask = ((stacked['Statement'] == statement) & stacked['Key'].isin(keys) & (stacked['Occurrence'] == 0)).to_numpy()
+        mask = mask & (share[entity_codes] > 0)
+        # 법인마다 후보 이름 중 처음 나온 행
+        rows = np.flatnonzero(mask)
+        rows = rows[np.unique(entity_codes[rows], return_index=True)[1]]
+        if not len(rows):
+            continue
+        amounts = block[rows] * share[entity_codes[rows]][:, None]
+        tables.append(pd.DataFrame({
+            'Entity': entities[entity_codes[rows]], 'Statement': statement, 'Account_Name': label,
+            'Ownership': 1.0 - share[entity_codes[rows]], **dict(zip(periods, amounts.T)),
+        }))
+        base = groups.index[(groups['statement'] == statement) & groups['key'].isin(keys)
+                            & (groups['occurrence'] == 0)]
+        if len(base):
+            extra.append({'Statement': statement, 'Level': consolidated['Level'].iat[base[0]], 'Account_Name': label,
+                          **dict(zip(periods, amounts.sum(axis=0)))})
+            positions.append(base[0] + 0.5)
+
+    minority = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(
+        columns=['Entity', 'Statement', 'Account_Name', 'Ownership', *periods])
+    if not extra:
+        return consolidated, minority
+    combined = pd.concat([consolidated, pd.DataFrame(extra)], ignore_index=True)
+    sort_key = np.concatenate([np.arange(len(consolidated), dtype=np.float64), positions])
+    return combined.iloc[np.argsort(sort_key, kind='stable')].reset_index(drop=True), minority
+
+def _elimination_table(rules, matrix, applied, groups, target_rows, periods):
+    columns = ['Entity', 'Counterparty', 'Statement', 'Level', 'Account_Name', *periods]
+    if not applied.any():
+        return pd.DataFrame(columns=columns)
+    rules = rules[applied]
+    return pd.DataFrame({
+        'Entity': rules['entity'].to_numpy(),
+        'Counterparty': rules['counterparty'].fillna('').to_numpy(),
+        'Statement': groups['statement'].to_numpy()[target_rows[applied]],
+        'Level': np.full(len(rules), schema.DEFAULT_LEVEL, dtype=schema.LEVEL_DTYPE),
+        'Account_Name': rules['account'].to_numpy(),
+        **dict(zip(periods, matrix[applied].T)),
+    }, columns=columns)
+
+def _scaled(df, divisor):
+    if divisor <= 1 or not len(df):
+        return df
+    numeric = [c for c in df.columns if c not in schema.META_COLS + ['Entity', 'Counterparty', 'Ownership']]
+    return df.assign(**{c: df[c].to_numpy(dtype=np.float64) / divisor for c in numeric})
+
+def write_excel(result, unit="원", target=None, entity_sheets=True):
+    """
+    연결 결과를 엑셀로 저장 (연결 재무제표별 시트 + 내부거래제거 + 법인별 시트)
+    법인이 아주 많으면 entity_sheets=False로 법인별 시트를 빼고 Parquet(법인 차원 포함)만 쓰는 편이 빠름
+    """
+    divisor = schema.UNIT_DIVISORS[unit]
+    frames = result['entities'] if entity_sheets else {}
+    with tracing.span("excel_export", rows=len(result['consolidated']), entities=len(frames)):
+        entities = {name: schema.scale_rows(frame, divisor) for name, frame in frames.items()}
+        return excel_export.write_consolidation_excel(
+            schema.scale_rows(result['consolidated'], divisor), entities,
+            _scaled(result['eliminations'], divisor), schema.STATEMENT_NAMES, unit, target=target,
+        )
+
+def load_entities(out_dir):
+    """
+    batch.py 결과 폴더의 checkpoint.json에서 완료된 법인의 Parquet(원 단위) 결과를 읽음
+    반환값: {법인명: DataFrame} (체크포인트 순서)
+    """
+    with open(os.path.join(out_dir, 'checkpoint.json'), encoding='utf-8') as f:
+        entries = json.load(f)
+    frames = {}
+    for entity, entry in entries.items():
+        paths = [p for p in entry.get('outputs', []) if p.endswith('.parquet')]
+        if entry.get('status') != 'done':
+            logger.warning("%s: 처리가 완료되지 않아 연결에서 제외", entity)
+            continue
+        if not paths:
+            logger.warning("%s: Parquet 결과가 없어 연결에서 제외 (pyarrow 없이 또는 --no-parquet으로 처리됨)", entity)
+            continue
+        frames[entity] = pd.read_parquet(paths[0])
+    return frames
+
+def run(out_dir, mapping_path=None, unit="원", entities=None, entity_sheets=True):
+    """
+    결과 폴더의 법인별 결과를 연결해서 연결.xlsx / 연결.parquet(법인 차원 포함) 저장
+    entities가 있으면 그 순서대로 그 법인만 사용. 반환값: consolidate 결과
+    """
+    frames = load_entities(out_dir)
+    if entities is not None:
+        frames = {e: frames[e] for e in entities if e in frames}
+    if not frames:
+        # 법인 처리는 끝났는데 Parquet이 없으면 pyarrow 없이 (또는 --no-parquet으로) batch.py를 실행한 경우
+        raise ValueError("연결할 법인 결과가 없습니다 (법인별 Parquet 결과 필요: pyarrow 설치 후 --no-parquet 없이 batch.py 실행)")
+    mapping = load_mapping(mapping_path) if mapping_path else None
+    unknown = sorted(set(mapping['ownership']) - set(frames)) if mapping else []
+    if unknown:
+        logger.warning("매핑 파일의 법인 중 결과가 없는 법인: %s", ", ".join(unknown))
+
+    with tracing.trace(OUTPUT_NAME) as trace:
+        result = consolidate(frames, mapping)
+        base = os.path.join(out_dir, OUTPUT_NAME)
+        write_excel(result, unit, target=f"{base}.xlsx", entity_sheets=entity_sheets)
+        try:
+            with tracing.span("parquet_export", rows=len(result['stacked'])):
+                result['stacked'].to_parquet(f"{base}.parquet", index=False)
+        except ImportError:
+            logger.warning("pyarrow가 없어 Parquet 저장을 건너뜁니다")
+    if trace is not None:
+        with open(f"{base}.trace.json", "w", encoding="utf-8") as f:
+            f.write(trace.to_json(indent=2))
+    logger.info("연결 완료: 법인 %d, 계정 %d행, 내부거래 제거 %d건 (건너뜀 %d건)",
+                len(frames), len(result['consolidated']), len(result['eliminations']), len(result['skipped']))
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="batch.py 결과 폴더의 법인별 결과를 연결 재무제표로 합산")
+    parser.add_argument("out", help="batch.py 결과 폴더 (checkpoint.json과 법인별 Parquet)")
+    parser.add_argument("--mapping", help="지분율/내부거래/계정매핑 파일 (엑셀 또는 JSON)")
+    parser.add_argument("--unit", choices=list(schema.UNIT_DIVISORS), default="원", help="엑셀 표시 단위")
+    parser.add_argument("--no-entity-sheets", action="store_true", help="엑셀에 법인별 시트를 넣지 않음")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    run(args.out, args.mapping, unit=args.unit, entity_sheets=not args.no_entity_sheets)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+"""
+모델에 보내기 전 파일 간 중복 표 제거
+
+올해/작년 보고서를 같이 올리면 비교 기간 열이 두 번 들어가고, 분기 패키지는 같은 재무상태표 시트가 반복됨
+표 섹션마다 계정명 키 집합의 MinHash 서명을 만들고 LSH 밴드가 겹치는 앞선 표만 후보로 비교해서,
+같은 기간 열의 값이 모두 같으면 나중 표에서 그 열을 뺌 (모든 기간 열이 빠지면 섹션 전체를 뺌)
+값이 하나라도 다르면(재작성, 단위 차이) 그대로 보내고 파일 간 차이는 incremental.merge_files에서 맞춤
+
+뺀 값은 추출 뒤 restore_rows로 원래 파일의 행에 되살림 (파일별 결과는 그 파일만으로 완전해야
+나중에 앞선 파일을 빼고 다시 합쳐도 값이 사라지지 않음)
+"""
+import io
+import csv
+import math
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import compaction
+import schema
+import table_parser
+
+# MinHash 서명 길이 = 밴드 수 × 밴드당 행 수 (후보가 되는 유사도 기준은 대략 (1/BANDS)^(1/ROWS) ≈ 0.5)
+BANDS = 16
+BAND_ROWS = 4
+NUM_PERM = BANDS * BAND_ROWS
+# 후보 중 계정명 집합의 추정 유사도가 이 값 이상인 표끼리만 기간 열을 비교
+MIN_SIMILARITY = 0.5
+# 값 비교 허용 오차 (원 단위 반올림 차이)
+VALUE_TOLERANCE = 0.5
+
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+
+def minhash(tokens):
+    """
+    문자열 집합의 MinHash 서명 (NUM_PERM개 uint64). 빈 집합이면 None
+    """
+    if not tokens:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=4).digest(), 'little') for t in tokens),
+        dtype=np.uint64, count=len(tokens),
+    )
+    # (a*h + b) mod p (곱셈은 uint64 범위에서 넘쳐도 무방)
+    with np.errstate(over='ignore'):
+        return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+def similarity(signature, others):
+    # 서명이 같은 자리 비율 = 자카드 유사도 추정값 (others는 서명 하나 또는 서명을 쌓은 2차원 배열)
+    return np.mean(np.asarray(others) == signature, axis=-1)
+
+def _bands(signature):
+    return [(b, signature[b * BAND_ROWS:(b + 1) * BAND_ROWS].tobytes()) for b in range(BANDS)]
+
+def parse_table(body):
+    """
+    CSV 본문을 기간 열 기준 표로 변환. 기간 머리글이 없거나 겹치면 None
+    반환값: {'rows', 'header_row', 'periods': {열 번호: 기간}, 'keys': 계정명 키 집합,
+             'order': [(계정명 키, 순번, 계정명)], 'values': {기간: {(계정명 키, 순번): 값}}}
+    """
+    rows = list(csv.reader(body.splitlines()))
+    header_row, periods = table_parser.find_header(rows)
+    if not periods or len(set(periods.values())) != len(periods):
+        return None
+    values = {period: {} for period in periods.values()}
+    seen, order = {}, []
+    for row in rows[header_row + 1:]:
+        label = row[0].strip() if row else ''
+        if not label:
+            continue
+        key = analytics.name_key(label) or label
+        seen[key] = seen.get(key, 0) + 1
+        order.append((key, seen[key], label))
+        for c, period in periods.items():
+            try:
+                amount = table_parser.parse_amount(row[c]) if c < len(row) else None
+            except ValueError:
+                amount = None
+            if amount is not None:
+                values[period][(key, seen[key])] = amount
+    if len(seen) < table_parser.MIN_DATA_ROWS:
+        return None
+    return {'rows': rows, 'header_row': header_row, 'periods': periods, 'keys': set(seen), 'order': order,
+            'values': values}
+
+def _covered(column, kept_column):
+    # column의 값이 모두 kept_column에 같은 계정으로 들어 있으면 True
+    if not column or len(column) > len(kept_column):
+        return False
+    for key, value in column.items():
+        other = kept_column.get(key)
+        if other is None or not math.isclose(value, other, abs_tol=VALUE_TOLERANCE):
+            return False
+    return True
+
+def _drop_columns(rows, columns):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    for row in rows:
+        writer.writerow([cell for c, cell in enumerate(row) if c not in columns])
+    return out.getvalue()
+
+def dedup_sections(file_sections, names=None):
+    """
+    파일별 섹션에서 앞에 나온 표와 값이 같은 기간 열/섹션을 뺌 (올린 순서대로 앞선 쪽을 남김)
+    PDF/Word 같은 글 섹션은 그대로 둠
+    반환값: (파일별 섹션, 보고 [{'file', 'section', 'action': 'section'/'columns', 'periods',
+             'kept', 'kept_files', 'similarity', 'tokens_saved'}])
+    """
+    tables, buckets = [], {}
+    result, report = [], []
+    for i, sections in enumerate(file_sections):
+        name = names[i] if names else (sections[0][0] if sections else '')
+        kept = []
+        for header, body in sections:
+            table = None if compaction.is_text_section(header) else parse_table(body)
+            signature = minhash(table['keys']) if table else None
+            if signature is None:
+                kept.append((header, body))
+                continue
+
+            candidates = sorted({t for band in _bands(signature) for t in buckets.get(band, ())})
+            scored = []
+            if candidates:
+                scores = similarity(signature, [tables[t][2] for t in candidates])
+                scored = sorted(zip(scores.tolist(), candidates), reverse=True)
+            drop, matched = {}, []
+            for score, t in scored:
+                if score < MIN_SIMILARITY or len(drop) == len(table['periods']):
+                    break
+                kept_values = tables[t][1]['values']
+                for c, period in table['periods'].items():
+                    if c not in drop and period in kept_values and _covered(table['values'][period], kept_values[period]):
+                        drop[c] = period
+                        if t not in matched:
+                            matched.append(t)
+
+            filled = [c for c, period in table['periods'].items() if table['values'][period]]
+            action = 'section' if drop and all(c in drop for c in filled) else 'columns'
+            # 통째로 빠지는 표는 앞선 표에 이미 다 들어 있으므로 후보로 남기지 않음
+            if action != 'section':
+                tables.append((header, table, signature, name))
+                for band in _bands(signature):
+                    buckets.setdefault(band, []).append(len(tables) - 1)
+
+            if not drop:
+                kept.append((header, body))
+                continue
+            new_body = '' if action == 'section' else _drop_columns(table['rows'], set(drop))
+            if action == 'columns':
+                kept.append((header, new_body))
+            report.append({
+                'file': name,
+                'section': header,
+                'action': action,
+                'periods': ", ".join(drop.values()),
+                'kept': ", ".join(tables[t][0] for t in matched),
+                'kept_files': ", ".join(dict.fromkeys(tables[t][3] for t in matched)),
+                'similarity': round(max(score for score, t in scored if t in matched), 2),
+                'tokens_saved': compaction.estimate_tokens(body) - compaction.estimate_tokens(new_body),
+            })
+        result.append(kept)
+    return result, report
+
+def restore_rows(frame, donors, table, periods):
+    """
+    dedup으로 뺀 기간 값을 원래 표(parse_table 결과) 값으로 되살림
+    frame: 그 섹션이 들어간 청크의 추출 행 (섹션을 통째로 뺐으면 빈 DataFrame)
+    donors: 남긴 표의 추출 행 (frame에 없는 계정의 Statement/Level/계정명을 가져옴)
+    반환값: (값을 채운 frame, frame에 없던 계정의 새 행 DataFrame (Source/File은 비어 있음))
+    """
+    frame = frame.copy()
+    for period in periods:
+        if period not in frame.columns:
+            frame[period] = np.nan
+    rows_by_key, found = {}, {}
+    for i, name in enumerate(frame['Account_Name'].astype(str).tolist()):
+        key = analytics.name_key(name) or name
+        found[key] = found.get(key, 0) + 1
+        rows_by_key[(key, found[key])] = i
+    donor_rows = {}
+    for i, name in enumerate(donors['Account_Name'].astype(str).tolist()):
+        donor_rows.setdefault(analytics.name_key(name) or name, []).append(i)
+    donor_values = {p: donors[p].to_numpy(dtype=np.float64, na_value=np.nan)
+                    for p in periods if p in donors.columns}
+
+    missing, statements = [], []
+    for key, n, label in table['order']:
+        values = {p: table['values'][p][(key, n)] for p in periods if (key, n) in table['values'][p]}
+        if not values:
+            continue
+        i = rows_by_key.get((key, n))
+        if i is None:
+            missing.append((key, label, values))
+            continue
+        for period, value in values.items():
+            current = frame[period].iat[i]
+            if current != current or current == 0:
+                frame.iloc[i, frame.columns.get_loc(period)] = value
+    if not missing:
+        return frame, schema.concat_results([])
+
+    extra = []
+    for key, label, values in missing:
+        candidates = donor_rows.get(key, [])
+        # 같은 이름이 여러 번 나오면 값까지 같은 행을 고름
+        match = next((i for i in candidates if any(
+            p in donor_values and math.isclose(donor_values[p][i], v, abs_tol=VALUE_TOLERANCE)
+            for p, v in values.items())), candidates[0] if candidates else None)
+        if match is None:
+            meta = {'Statement': None, 'Level': schema.DEFAULT_LEVEL, 'Account_Name': label}
+        else:
+            meta = {c: donors[c].iat[match] for c in ('Statement', 'Level', 'Account_Name')}
+            statements.append(meta['Statement'])
+        extra.append({**meta, 'Source': None, 'File': None, **values})
+    # 앞선 표에서 찾지 못한 계정은 같은 섹션에서 가장 많이 나온 재무제표로 둠
+    statements.extend(frame['Statement'].astype(str).tolist())
+    fallback = max(set(statements), key=statements.count) if statements else 'Other'
+    for row in extra:
+        row['Statement'] = row['Statement'] or fallback
+    return frame, pd.DataFrame(extra)
@@ -0,0 +1,166 @@
+import io
+import re
+import math
+from copy import copy
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill, Font, Alignment, Border, Side
+
+import schema
+
+NUMBER_FORMAT = '#,##0'
+
+sort_columns_chronologically = schema.sort_columns_chronologically
+
+def _register_styles(wb):
+    """
+    Level별 공용 스타일을 통합문서에 한 번만 등록
+    반환값: {level: (텍스트 스타일명, 숫자 스타일명)}
+    """
+    thin = Side(style='thin')
+    wb.add_named_style(NamedStyle(name='fs_unit', font=Font(bold=True, italic=True)))
+    wb.add_named_style(NamedStyle(
+        name='fs_header', font=Font(bold=True),
+        border=Border(left=thin, right=thin, top=thin, bottom=thin),
+        alignment=Alignment(horizontal='center', vertical='top')
+    ))
+
+    fills = {
+        1: (PatternFill(start_color="1F77B4", end_color="1F77B4", fill_type="solid"), Font(color="FFFFFF", bold=True)),
+        2: (PatternFill(start_color="AEC7E8", end_color="AEC7E8", fill_type="solid"), Font(color="000000", bold=True)),
+        3: (PatternFill(fill_type=None), Font()),
+    }
+    names = {}
+    for level, (fill, font) in fills.items():
+        text_name, num_name = f'fs_lv{level}', f'fs_lv{level}_num'
+        wb.add_named_style(NamedStyle(name=text_name, fill=fill, font=font))
+        wb.add_named_style(NamedStyle(name=num_name, fill=fill, font=font, number_format=NUMBER_FORMAT))
+        names[level] = (text_name, num_name)
+    return names
+
+def _style_templates(ws, names):
+    """
+    스타일 이름별 서식 배열을 한 번만 만들어 둠 (셀마다 cell.style = 이름 으로 조회하지 않도록)
+    """
+    templates = {}
+    for name in names:
+        cell = WriteOnlyCell(ws)
+        cell.style = name
+        templates[name] = cell._style
+    return templates
+
+def _styled_cell(ws, value, style):
+    if isinstance(value, float) and math.isnan(value):
+        value = None
+    if style is None:
+        return value
+    cell = WriteOnlyCell(ws, value=value)
+    cell._style = copy(style)
+    return cell
+
+def _new_sheet(wb, styles, title, unit_text):
+    ws = wb.create_sheet(title=title)
+    ws.column_dimensions['A'].width = 30
+    templates = _style_templates(ws, [name for pair in styles.values() for name in pair] + ['fs_unit', 'fs_header'])
+    ws.append([_styled_cell(ws, f"(단위: {unit_text})", templates['fs_unit'])])
+    return ws, templates
+
+def _append_table(ws, templates, styles, df, columns, numeric):
+    """
+    머리글 한 줄 + Level별 서식을 적용한 값 행들을 시트 끝에 추가
+    """
+    ws.append([_styled_cell(ws, str(c), templates['fs_header']) for c in columns])
+
+    if 'Level' in df.columns:
+        levels = pd.to_numeric(df['Level'], errors='coerce').fillna(3).astype(int).tolist()
+    else:
+        levels = [3] * len(df)
+
+    for level, values in zip(levels, df[columns].itertuples(index=False, name=None)):
+        text_style, num_style = styles.get(level, styles[3])
+        text_style = None if level not in (1, 2) else templates[text_style]
+        num_style = templates[num_style]
+        # 서식 없는 셀(Level 3 계정명)은 값만 넘겨 셀 객체 생성을 생략
+        ws.append([
+            _styled_cell(ws, value, num_style if is_num else text_style)
+            for value, is_num in zip(values, numeric)
+        ])
+
+def _statement_columns(df):
+    sorted_cols = sort_columns_chronologically(df.columns.tolist())
+    final_cols = [c for c in sorted_cols if c in df.columns]
+    return final_cols, [c != 'Account_Name' for c in final_cols]
+
+def write_styled_excel(df, sheet_name_map, unit_text, target=None):
+    """
+    재무제표별 시트를 write-only(스트리밍) 모드로 한 번에 작성
+    Level별로 미리 등록한 스타일을 행 단위로 지정하므로 셀마다 서식 객체를 만들지 않음
+    target이 없으면 BytesIO에 써서 반환
+    """
+    buffer = target if target is not None else io.BytesIO()
+    wb = Workbook(write_only=True)
+    styles = _register_styles(wb)
+
+    if 'Statement' in df.columns: statements = df['Statement'].unique()
+    else: statements = ['Result']
+
+    for stmt in statements:
+        sub_df = df[df['Statement'] == stmt] if 'Statement' in df.columns else df
+        ws, templates = _new_sheet(wb, styles, sheet_name_map.get(stmt, stmt)[:30], unit_text)
+        _append_table(ws, templates, styles, sub_df, *_statement_columns(sub_df))
+
+    wb.save(buffer)
+    return buffer
+
+_INVALID_TITLE_RE = re.compile(r'[\[\]:*?/\\]')
+
+def sheet_title(name, used):
+    """
+    엑셀 시트 이름 (금지 문자 제거, 31자 제한, 이미 쓴 이름이면 번호를 붙임). used에 추가해서 돌려줌
+    """
+    base = _INVALID_TITLE_RE.sub('_', str(name)).strip("'") or 'Sheet'
+    title, n = base[:31], 1
+    while title.lower() in used:
+        n += 1
+        suffix = f"_{n}"
+        title = base[:31 - len(suffix)] + suffix
+    used.add(title.lower())
+    return title
+
+def write_consolidation_excel(consolidated, entities, eliminations, sheet_name_map, unit_text, target=None):
+    """
+    연결 결과 통합문서: 재무제표별 연결 시트 + 내부거래 제거 내역 시트 + 법인별 시트(재무제표를 위아래로 이어 씀)
+    entities: {법인명: DataFrame}, 모든 DataFrame은 단위 변환이 끝난 값
+    """
+    buffer = target if target is not None else io.BytesIO()
+    wb = Workbook(write_only=True)
+    styles = _register_styles(wb)
+    used = set()
+
+    for stmt in consolidated['Statement'].unique():
+        sub_df = consolidated[consolidated['Statement'] == stmt]
+        title = sheet_title(f"연결_{sheet_name_map.get(stmt, stmt)}", used)
+        ws, templates = _new_sheet(wb, styles, title, unit_text)
+        _append_table(ws, templates, styles, sub_df, *_statement_columns(sub_df))
+
+    if eliminations is not None and len(eliminations):
+        ws, templates = _new_sheet(wb, styles, sheet_title("내부거래제거", used), unit_text)
+        labels = [c for c in ('Entity', 'Counterparty', 'Statement') if c in eliminations.columns]
+        columns, numeric = _statement_columns(eliminations.drop(columns=labels))
+        _append_table(ws, templates, styles, eliminations, labels + columns, [False] * len(labels) + numeric)
+
+    for entity, frame in entities.items():
+        ws, templates = _new_sheet(wb, styles, sheet_title(entity, used), unit_text)
+        for stmt in frame['Statement'].unique():
+            sub_df = frame[frame['Statement'] == stmt]
+            ws.append([_styled_cell(ws, sheet_name_map.get(stmt, stmt), templates['fs_unit'])])
+            _append_table(ws, templates, styles, sub_df, *_statement_columns(sub_df))
+            ws.append([])
+
+    wb.save(buffer)
+    return buffer
+
+def to_styled_excel_bytes(df, sheet_name_map, unit_text):
+    return write_styled_excel(df, sheet_name_map, unit_text).getvalue()
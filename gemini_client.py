@@ -0,0 +1,274 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+from google import genai
+from google.genai import types
+
+import compaction
+import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-3-flash-preview"
+FALLBACK_MODEL = "gemini-1.5-flash"
+
+# API Key별 호출 한도 (분당 요청 수 / 분당 토큰 수)
+REQUESTS_PER_MINUTE = int(os.environ.get("FSMERGER_RPM", 60))
+TOKENS_PER_MINUTE = int(os.environ.get("FSMERGER_TPM", 1_000_000))
+
+# 재시도 설정
+MAX_RETRIES = 4
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+# 비용 추정용 단가 (USD / 1M 토큰: 입력, 출력)
+PRICES = {
+    "gemini-3-flash-preview": (0.50, 3.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+
+_client_factory = genai.Client
+_clients = {}
+_limiters = {}
+_lock = threading.Lock()
+
+# 컨텍스트 캐시 유지 시간 (초)
+CACHE_TTL_SECONDS = 3600
+# 컨텍스트 캐시로 만들 앞부분 크기 (추정 토큰). 최소보다 짧으면 API가 거절하므로 요청하지 않음
+MIN_CACHE_TOKENS = int(os.environ.get("FSMERGER_MIN_CACHE_TOKENS", 2048))
+MAX_CACHE_TOKENS = int(os.environ.get("FSMERGER_MAX_CACHE_TOKENS", 200_000))
+
+# 최근 호출 기록 (화면 표시/진단용)
+CALL_LOG = deque(maxlen=500)
+
+class TokenBucket:
+    """
+    분당 요청 수/토큰 수 토큰 버킷. acquire()는 여유가 생길 때까지 대기
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.requests = float(requests_per_minute)
+        self.tokens = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens=0):
+        # 한 번에 한도보다 큰 요청은 한도만큼만 기다림
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.requests >= 1 and self.tokens >= tokens:
+                    self.requests -= 1
+                    self.tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self.requests) * 60 / self.rpm if self.requests < 1 else 0,
+                    (tokens - self.tokens) * 60 / self.tpm if self.tokens < tokens else 0,
+                )
+            time.sleep(min(max(wait, 0.01), 5.0))
+
+    def debit(self, tokens):
+        """
+        실제 사용량이 예상보다 많을 때 차액을 차감 (음수 잔고 허용)
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= tokens
+
+def set_client_factory(factory):
+    """
+    클라이언트 생성 함수 교체 (테스트/벤치마크용 가짜 클라이언트). None이면 기본값으로 복원
+    """
+    global _client_factory
+    with _lock:
+        _client_factory = factory or genai.Client
+        _clients.clear()
+
+def get_client(api_key):
+    """
+    API Key별로 클라이언트 하나를 만들어 재사용 (연결 재사용)
+    """
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _client_factory(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+def _limiter_for(client):
+    with _lock:
+        limiter = _limiters.get(id(client))
+        if limiter is None:
+            limiter = TokenBucket(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+            _limiters[id(client)] = limiter
+        return limiter
+
+def _error_code(error):
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        if isinstance(code, int):
+            return code
+    return None
+
+def is_retryable(error):
+    code = _error_code(error)
+    if code is not None:
+        return code in RETRYABLE_CODES
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in (
+        "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "ReadError",
+    )
+
+def _backoff(attempt):
+    # 지수 백오프 + full jitter
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * (2 ** attempt)))
+
+def _record(model, started, usage, estimated_tokens, retries, fallback, error=None, limiter=None):
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    output_tokens = getattr(usage, "candidates_token_count", None) or 0
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    entry = {
+        "time": time.time(),
+        "model": model,
+        "latency": round(time.perf_counter() - started, 3),
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "cost_usd": round((prompt_tokens * price_in + output_tokens * price_out) / 1_000_000, 6),
+        "retries": retries,
+        "fallback": fallback,
+        "error": str(error) if error else None,
+    }
+    CALL_LOG.append(entry)
+    # 진단 패널용: 호출 구간과 재시도/예비 모델 횟수 (실패한 시도는 오류로만 집계)
+    tracing.record("model_call", entry["latency"], model=model, prompt_tokens=prompt_tokens,
+                   output_tokens=output_tokens, cost_usd=entry["cost_usd"], fallback=fallback,
+                   error=entry["error"])
+    if error:
+        tracing.add("model_errors")
+    else:
+        tracing.add("model_calls")
+        tracing.add("retries", retries)
+        tracing.add("fallbacks", int(fallback))
+        tracing.add("prompt_tokens", prompt_tokens)
+        tracing.add("output_tokens", output_tokens)
+        tracing.add("cost_usd", entry["cost_usd"])
+    if fallback and not error:
+        logger.warning("gemini call fell back to %s after %d retries", model, retries)
+    if limiter is not None and prompt_tokens + output_tokens > estimated_tokens:
+        limiter.debit(prompt_tokens + output_tokens - estimated_tokens)
+    logger.info(
+        "gemini call model=%s latency=%.2fs in=%d out=%d cost=$%.5f retries=%d fallback=%s%s",
+        model, entry["latency"], prompt_tokens, output_tokens, entry["cost_usd"], retries, fallback,
+        f" error={entry['error']}" if error else "",
+    )
+    return entry
+
+def _call_with_retry(client, prompt, models, call):
+    """
+    models 순서대로 시도. 재시도 가능한 오류는 백오프 후 같은 모델로 재시도,
+    그 외 오류이거나 재시도를 다 쓰면 다음(예비) 모델로 넘어감
+    반환값: (call 결과, 사용 모델, 재시도 횟수, 예비 모델 사용 여부, 예상 토큰, 시작 시각)
+    """
+    limiter = _limiter_for(client)
+    estimated = compaction.estimate_tokens(prompt)
+    retries = 0
+    last_error = None
+    for model_index, model in enumerate(models):
+        for attempt in range(MAX_RETRIES + 1):
+            limiter.acquire(estimated)
+            started = time.perf_counter()
+            try:
+                return call(model), model, retries, model_index > 0, estimated, started
+            except Exception as e:
+                last_error = e
+                _record(model, started, None, 0, retries, model_index > 0, error=e)
+                if not is_retryable(e) or attempt == MAX_RETRIES:
+                    break
+                retries += 1
+                time.sleep(_backoff(attempt))
+    raise last_error
+
+def generate(client, prompt, model=DEFAULT_MODEL, fallback_model=FALLBACK_MODEL, config=None):
+    """
+    generate_content 호출 (한도 대기 + 재시도 + 예비 모델). 응답 객체 반환
+    """
+    models = [model] + ([fallback_model] if fallback_model and fallback_model != model else [])
+    response, used, retries, fallback, estimated, started = _call_with_retry(
+        client, prompt, models,
+        lambda m: client.models.generate_content(model=m, contents=prompt, config=config),
+    )
+    _record(used, started, getattr(response, "usage_metadata", None), estimated, retries, fallback,
+            limiter=_limiter_for(client))
+    return response
+
+def generate_stream(client, prompt, model=DEFAULT_MODEL, fallback_model=FALLBACK_MODEL, config=None):
+    """
+    generate_content_stream 호출. 첫 조각을 받을 때까지만 재시도/예비 모델 적용
+    응답 텍스트 조각을 차례로 반환
+    """
+    models = [model] + ([fallback_model] if fallback_model and fallback_model != model else [])
+
+    def open_stream(m):
+        stream = iter(client.models.generate_content_stream(model=m, contents=prompt, config=config))
+        return stream, next(stream, None)
+
+    (stream, first), used, retries, fallback, estimated, started = _call_with_retry(
+        client, prompt, models, open_stream
+    )
+    usage, error = None, None
+    try:
+        if first is None:
+            return
+        usage = getattr(first, "usage_metadata", None) or usage
+        yield first.text or ""
+        for response in stream:
+            usage = getattr(response, "usage_metadata", None) or usage
+            yield response.text or ""
+    except Exception as e:
+        # 중간에 끊긴 스트림은 받은 만큼의 사용량과 함께 실패로 기록 (호출한 쪽이 멈춘 경우는 제외)
+        error = e
+        raise
+    finally:
+        _record(used, started, usage, estimated, retries, fallback, limiter=_limiter_for(client), error=error)
+
+def create_cache(client, contents, model=DEFAULT_MODEL, system_instruction=None, ttl_seconds=CACHE_TTL_SECONDS):
+    """
+    여러 번 반복해서 보내는 프롬프트 앞부분을 컨텍스트 캐시로 등록
+    반환값: generate(config=cached_config(이름))에 쓸 캐시 이름. 너무 짧거나 지원하지 않으면 None
+    """
+    if sum(compaction.estimate_tokens(text) for text in contents) < MIN_CACHE_TOKENS:
+        return None
+    try:
+        cache = client.caches.create(model=model, config=types.CreateCachedContentConfig(
+            contents=contents, system_instruction=system_instruction, ttl=f"{int(ttl_seconds)}s",
+        ))
+    except Exception as e:
+        logger.info("context cache not created model=%s error=%s", model, e)
+        return None
+    return getattr(cache, "name", None)
+
+def delete_cache(client, cache_name):
+    """
+    더 이상 쓰지 않는 컨텍스트 캐시 삭제 (이미 만료됐거나 실패해도 무시, TTL이 지나면 서버에서도 지워짐)
+    """
+    try:
+        client.caches.delete(name=cache_name)
+    except Exception as e:
+        logger.info("context cache not deleted name=%s error=%s", cache_name, e)
+
+def cached_config(cache_name):
+    return types.GenerateContentConfig(cached_content=cache_name)
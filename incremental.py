@@ -0,0 +1,202 @@
+"""
+파일 단위 증분 분석: 파일별 결과를 따로 보관해 두고 새로 올라오거나 바뀐 파일만 처리해서 합침
+
+- 파일 키: 파일명 + 내용 해시 (내용이 바뀌면 다른 파일로 봄, 빠진 파일은 결과에서 제외)
+- 행 맞추기: (Statement, 계정명 키, 같은 재무제표 안에서 같은 이름이 나온 순번)
+- 같은 행/기간 값이 파일마다 다르면: 더 최근 기간까지 담은 파일 > 나중에 올린 파일 순으로 우선
+  (최신 보고서의 비교 기간 값은 재작성된 값이므로 이전 보고서 값보다 우선)
+"""
+import numpy as np
+import pandas as pd
+
+import schema
+import analytics
+import result_cache
+import validation
+import logic
+
+# 기록해 두는 최대 충돌 수 (화면 표시용)
+MAX_CONFLICTS = 500
+
+def file_key(file):
+    return f"{file.name}:{result_cache.file_hash(file)}"
+
+def file_name(key):
+    return key.rsplit(':', 1)[0]
+
+def split_by_file(df, keys):
+    """
+    process_smart_merge 결과를 파일별로 나눔. keys: {파일명: 파일 키}
+    일부 청크가 실패한 파일은 다음 실행에서 다시 처리하도록 제외
+    반환값: {파일 키: DataFrame} (attrs에는 그 파일의 Source 원문만 남김)
+    """
+    sources = df.attrs.get('sources', {})
+    model_sources = set(df.attrs.get('model_sources', []))
+    failed = set(df.attrs.get('failed_files', []))
+    files = df['File'].astype(object).to_numpy() if 'File' in df.columns else np.full(len(df), None)
+
+    results = {}
+    for name, key in keys.items():
+        if name in failed:
+            continue
+        frame = schema.drop_empty_periods(df[files == name].reset_index(drop=True))
+        labels = set(frame['Source'].astype(str)) if len(frame) else set()
+        frame.attrs = {
+            'sources': {label: text for label, text in sources.items() if label in labels},
+            'model_sources': [label for label in labels if label in model_sources],
+        }
+        results[key] = frame
+    return results
+
+def _row_keys(frame):
+    # (Statement, 계정명 키, 순번) - 같은 이름이 여러 번 나오면 나온 순서대로 따로 맞춤
+    seen, keys = {}, []
+    statements = frame['Statement'].astype(str).tolist()
+    names = frame['Account_Name'].astype(str).tolist()
+    for statement, name in zip(statements, names):
+        key = (statement, analytics.name_key(name) or name)
+        seen[key] = seen.get(key, 0) + 1
+        keys.append((*key, seen[key]))
+    return keys
+
+def merge_files(items):
+    """
+    파일별 결과를 하나로 합침. items: [(파일 키, DataFrame)] (올린 순서)
+    행 순서는 처음 나온 순서, 메타(Statement/Level/계정명/Source/File)와 기간 값은 우선순위가 높은 파일 기준
+    attrs: value_files {기간: 값을 가져온 파일 번호 배열}, file_keys, conflicts, validation, sources
+    """
+    items = [(key, frame) for key, frame in items if frame is not None and len(frame)]
+    if not items:
+        empty = schema.concat_results([])
+        empty.attrs.update({'file_keys': [], 'value_files': {}, 'conflicts': [], 'conflict_count': 0,
+                            'sources': {}, 'model_sources': [], 'validation': []})
+        return empty
+
+    all_periods = {c for _, frame in items for c in schema.period_columns(frame)}
+    periods = [c for c in schema.sort_columns_chronologically(list(all_periods)) if c != 'Account_Name']
+    position = {p: j for j, p in enumerate(periods)}
+
+    # 행 번호 매기기 (올린 순서대로 처음 나온 행이 앞)
+    index, codes, blocks, as_of = {}, [], [], []
+    for _, frame in items:
+        file_codes = np.array([index.setdefault(k, len(index)) for k in _row_keys(frame)], dtype=np.int64)
+        block = np.zeros((len(frame), len(periods)))
+        cols = schema.period_columns(frame)
+        if cols:
+            block[:, [position[c] for c in cols]] = frame[cols].to_numpy(dtype=np.float64, na_value=0.0)
+        filled = np.flatnonzero((block != 0).any(axis=0))
+        codes.append(file_codes)
+        blocks.append(block)
+        as_of.append(filled[-1] if len(filled) else -1)
+
+    n = len(index)
+    values = np.zeros((n, len(periods)))
+    value_files = np.full((n, len(periods)), -1, dtype=np.int16)
+    meta = {c: [None] * n for c in schema.META_COLS}
+    conflicts, conflict_count = [], 0
+
+    # 우선순위가 낮은 파일부터 덮어씀
+    for i in sorted(range(len(items)), key=lambda i: (as_of[i], i)):
+        frame, file_codes, block = items[i][1], codes[i], blocks[i]
+        current = values[file_codes]
+        present = block != 0
+        differs = present & (current != 0) & ~np.isclose(current, block)
+        if differs.any():
+            conflict_count += int(differs.sum())
+            for r, j in zip(*np.nonzero(differs)):
+                if len(conflicts) >= MAX_CONFLICTS:
+                    break
+                conflicts.append({
+                    'Statement': str(frame['Statement'].iat[r]), 'Account_Name': str(frame['Account_Name'].iat[r]),
+                    'period': periods[j], 'kept_file': file_name(items[i][0]), 'kept': float(block[r, j]),
+                    'replaced_file': file_name(items[value_files[file_codes[r], j]][0]),
+                    'replaced': float(current[r, j]),
+                })
+        current[present] = block[present]
+        values[file_codes] = current
+        owners = value_files[file_codes]
+        owners[present] = i
+        value_files[file_codes] = owners
+        for col in schema.META_COLS:
+            column = frame[col].tolist() if col in frame.columns else [None] * len(frame)
+            for code, value in zip(file_codes, column):
+                meta[col][code] = value
+
+    merged = schema.concat_results([pd.DataFrame({**meta, **dict(zip(periods, values.T))})])
+    sources, model_sources = {}, []
+    for _, frame in items:
+        sources.update(frame.attrs.get('sources', {}))
+        model_sources.extend(frame.attrs.get('model_sources', []))
+    merged.attrs.update({
+        'file_keys': [key for key, _ in items],
+        'value_files': {p: value_files[:, j] for j, p in enumerate(periods)},
+        'conflicts': conflicts,
+        'conflict_count': conflict_count,
+        'sources': sources,
+        'model_sources': model_sources,
+    })
+    merged = schema.drop_empty_periods(merged)
+    merged.attrs['validation'] = validation.validate(merged)
+    return merged
+
+def analyze(api_key, files, file_results=None, **merge_options):
+    """
+    이전 실행의 파일별 결과(file_results)를 재사용하고 새로 올라왔거나 내용이 바뀐 파일만 처리해서 합침
+    반환값: (합친 DataFrame, 갱신된 파일별 결과, 이번에 처리한 process_smart_merge 결과 또는 None)
+    """
+    if merge_options.get('parallel') is False:
+        raise ValueError("parallel=False이면 여러 파일이 한 요청에 섞여 파일별로 나눌 수 없습니다")
+    keys = [file_key(f) for f in files]
+    previous = file_results or {}
+    results = {key: previous[key] for key in keys if key in previous}
+    pending = [(f, key) for f, key in zip(files, keys) if key not in results]
+
+    run_df = None
+    if pending:
+        run_df = logic.process_smart_merge(api_key, [f for f, _ in pending], **merge_options)
+        results.update(split_by_file(run_df, {f.name: key for f, key in pending}))
+
+    merged = merge_files([(key, results[key]) for key in keys if key in results])
+    merged.attrs['reused_files'] = [file_name(key) for key in keys if key in previous]
+    return merged, results, run_df
+
+def reextract(api_key, file_results, keys, issues, **options):
+    """
+    검증에 실패한 Source가 들어 있는 파일만 골라 logic.reextract_sources로 교정한 뒤 다시 합침
+    반환값: (합친 DataFrame, 바꾼 Source 목록)
+    """
+    by_source = validation.failing_sources(issues)
+    replaced, failed = [], []
+    for key in keys:
+        frame = file_results.get(key)
+        wanted = set(by_source) & set(frame.attrs.get('sources', {})) if frame is not None else set()
+        if not wanted:
+            continue
+        # 파일 안에서 보이는 문제 기준으로 교정 (파일 간 문제만 있으면 합친 결과의 문제를 그대로 사용)
+        own = [i for i in validation.validate(frame) if wanted & set(i['sources'])]
+        own = own or [i for i in issues if wanted & set(i['sources'])]
+        file_results[key], done = logic.reextract_sources(api_key, frame, own, **options)
+        replaced.extend(done)
+        failed.extend(file_results[key].attrs.get('failed_corrections', []))
+
+    merged = merge_files([(key, file_results[key]) for key in keys if key in file_results])
+    merged.attrs['failed_corrections'] = failed
+    return merged, replaced
+
+def provenance_table(df):
+    """
+    파일별 반영 현황 [{'file', 'rows', 'values', 'periods'}] (값을 가져온 칸 수 기준)
+    """
+    keys = df.attrs.get('file_keys', [])
+    value_files = df.attrs.get('value_files', {})
+    files = df['File'].astype(object).to_numpy() if 'File' in df.columns else np.full(len(df), None)
+    rows = []
+    for i, key in enumerate(keys):
+        kept = {p: int((owners == i).sum()) for p, owners in value_files.items() if p in df.columns}
+        rows.append({
+            'file': file_name(key),
+            'rows': int((files == file_name(key)).sum()),
+            'values': sum(kept.values()),
+            'periods': ", ".join(p for p, count in kept.items() if count),
+        })
+    return rows
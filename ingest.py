@@ -0,0 +1,179 @@
+import io
+import os
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pypdf
+import docx
+
+import workbook_reader
+import page_classifier
+
+# 프로세스 풀을 쓸 만한 최소 작업량 (이보다 작으면 현재 프로세스에서 바로 처리)
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+# PDF는 이 페이지 수 단위로 나눠서 동시에 추출
+PDF_PAGES_PER_TASK = 20
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def rows_to_csv(rows):
+    """
+    행 목록을 CSV 텍스트로 변환 (빈 행/빈 열 제거, 정수형 실수는 정수로 표기)
+    """
+    rows = [[_cell_text(v) for v in row] for row in rows]
+    rows = [row for row in rows if any(cell.strip() for cell in row)]
+    if not rows:
+        return ''
+    width = max(len(row) for row in rows)
+    used = [c for c in range(width) if any(c < len(row) and row[c].strip() for row in rows)]
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    for row in rows:
+        writer.writerow([row[c] if c < len(row) else '' for c in used])
+    return out.getvalue()
+
+def _xlsx_sections(name, data):
+    # 보이는 시트/행/열만 스트리밍으로 읽음 (병합된 머리글은 채워짐)
+    return [
+        (f"File: {name} | Sheet: {title}", rows_to_csv(rows))
+        for title, rows in workbook_reader.iter_visible_sheets(data)
+    ]
+
+def _pdf_page_texts(data, start, end):
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or '' for i in range(start, end)]
+
+def _pdf_page_count(data):
+    return len(pypdf.PdfReader(io.BytesIO(data)).pages)
+
+def pdf_sections(name, pages):
+    """
+    PDF 페이지 글자 목록에서 재무제표 페이지만 골라 섹션 하나로 묶음 (page_classifier 참고)
+    반환값: ([(섹션 헤더, 본문 텍스트)], (보낸 페이지 수, 전체 페이지 수))
+    골라낸 경우 헤더에 쓴 페이지 번호를 남김 ("File: a.pdf | Pages: 4-9 (PDF)")
+    """
+    selected = [number for number, _ in page_classifier.select_pages(pages)]
+    header = f"File: {name} (PDF)"
+    if len(selected) < len(pages):
+        header = f"File: {name} | Pages: {page_classifier.format_pages(selected)} (PDF)"
+    body = "\n".join(pages[number - 1] for number in selected) + "\n"
+    return [(header, body)], (len(selected), len(pages))
+
+def read_sections(name, data):
+    """
+    파일 하나(이름, bytes)를 [(섹션 헤더, 본문 텍스트), ...]로 변환
+    프로세스 풀에서 호출되므로 업로드 객체 대신 bytes를 받음
+    """
+    return _read(name, data)[0]
+
+def _read(name, data):
+    # 반환값: (섹션 리스트, PDF이면 (보낸 페이지 수, 전체 페이지 수) 아니면 None)
+    file_ext = name.split('.')[-1].lower()
+
+    if file_ext == 'xlsx':
+        return _xlsx_sections(name, data), None
+
+    if file_ext == 'xls':
+        dfs = pd.read_excel(io.BytesIO(data), sheet_name=None, engine='xlrd', header=None)
+        return [
+            (f"File: {name} | Sheet: {sheet_name}", rows_to_csv(df.itertuples(index=False, name=None)))
+            for sheet_name, df in dfs.items()
+        ], None
+
+    if file_ext == 'csv':
+        df = pd.read_csv(io.BytesIO(data), header=None)
+        return [(f"File: {name}", df.to_csv(index=False, header=False))], None
+
+    if file_ext == 'pdf':
+        return pdf_sections(name, _pdf_page_texts(data, 0, _pdf_page_count(data)))
+
+    if file_ext in ['docx', 'doc']:
+        doc = docx.Document(io.BytesIO(data))
+        return [(f"File: {name} (Word)", "\n".join(para.text for para in doc.paragraphs))], None
+
+    if file_ext == 'txt':
+        return [(f"File: {name}", data.decode("utf-8"))], None
+
+    return [], None
+
+def _timed_read(name, data):
+    start = time.perf_counter()
+    try:
+        sections, pages = _read(name, data)
+    except Exception as e:
+        sections, pages = [(f"File: {name}", f"Error reading {name}: {str(e)}")], None
+    return sections, time.perf_counter() - start, pages
+
+def _timed_pdf_pages(data, start, end):
+    began = time.perf_counter()
+    try:
+        return _pdf_page_texts(data, start, end), time.perf_counter() - began
+    except Exception as e:
+        return e, time.perf_counter() - began
+
+def extract_files(named_data, max_workers=None):
+    """
+    여러 파일을 프로세스 풀에서 동시에 읽음 (큰 PDF는 페이지 구간별로 나눠서 처리)
+    named_data: [(파일명, bytes), ...]
+    반환값: (파일별 섹션 리스트, 파일별 소요시간 [{'file', 'seconds', 'bytes', 'sections', 'pages', 'pages_used'}])
+    PDF는 재무제표 페이지만 보내고 pages(전체)/pages_used(보낸 페이지 수)를 남김 (PDF가 아니면 None)
+    """
+    total_bytes = sum(len(data) for _, data in named_data)
+    if len(named_data) == 0:
+        return [], []
+
+    started = time.perf_counter()
+    if total_bytes < PARALLEL_MIN_BYTES or (max_workers or os.cpu_count() or 1) <= 1:
+        results = [_timed_read(name, data) for name, data in named_data]
+    else:
+        results = [None] * len(named_data)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            file_futures, pdf_futures = {}, {}
+            for i, (name, data) in enumerate(named_data):
+                page_count = None
+                if name.lower().endswith('.pdf'):
+                    try:
+                        page_count = _pdf_page_count(data)
+                    except Exception:
+                        page_count = None
+                if page_count and page_count > PDF_PAGES_PER_TASK:
+                    pdf_futures[i] = [
+                        pool.submit(_timed_pdf_pages, data, s, min(s + PDF_PAGES_PER_TASK, page_count))
+                        for s in range(0, page_count, PDF_PAGES_PER_TASK)
+                    ]
+                else:
+                    file_futures[i] = pool.submit(_timed_read, name, data)
+
+            for i, future in file_futures.items():
+                results[i] = future.result()
+            for i, futures in pdf_futures.items():
+                name = named_data[i][0]
+                parts = [f.result() for f in futures]
+                elapsed = sum(seconds for _, seconds in parts)
+                errors = [texts for texts, _ in parts if isinstance(texts, Exception)]
+                if errors:
+                    results[i] = ([(f"File: {name}", f"Error reading {name}: {str(errors[0])}")], elapsed, None)
+                else:
+                    started_select = time.perf_counter()
+                    sections, pages = pdf_sections(name, [text for texts, _ in parts for text in texts])
+                    results[i] = (sections, elapsed + time.perf_counter() - started_select, pages)
+
+    timings = [
+        {'file': name, 'seconds': round(seconds, 3), 'bytes': len(data), 'sections': len(sections),
+         'pages': pages[1] if pages else None, 'pages_used': pages[0] if pages else None}
+        for (name, data), (sections, seconds, pages) in zip(named_data, results)
+    ]
+    pdf_timings = [t for t in timings if t['pages'] is not None]
+    timings.append({'file': '(전체)', 'seconds': round(time.perf_counter() - started, 3),
+                    'bytes': total_bytes, 'sections': sum(t['sections'] for t in timings),
+                    'pages': sum(t['pages'] for t in pdf_timings) if pdf_timings else None,
+                    'pages_used': sum(t['pages_used'] for t in pdf_timings) if pdf_timings else None})
+    return [sections for sections, _, _ in results], timings
@@ -0,0 +1,545 @@
+"""
+로컬 작업 큐: 긴 분석을 Streamlit 스크립트 밖의 작업 프로세스에서 실행 (외부 브로커 없이 SQLite + 파일)
+
+    job_id = jobs.submit(user, api_key, files)     # 업로드 파일을 작업 폴더에 저장하고 바로 반환
+    jobs.status(job_id) / jobs.cancel(job_id) / jobs.load_result(job_id) / jobs.update_result(job_id, ...)
+    python jobs.py --workers 4                      # 작업 프로세스를 따로 띄울 때 (앱은 없으면 직접 띄움)
+
+- 큐/상태: CACHE_DIR/jobs.sqlite3, 입력 파일/결과: CACHE_DIR/jobs/<작업 id>/
+- 작업 프로세스는 대기 작업을 원자적으로 가져가며 사용자별 동시 실행 수(MAX_RUNNING_PER_USER)를 넘기지 않음
+- 진행률/단계를 기록하고 취소 요청은 다음 진행 보고 때 확인해서 남은 청크를 취소
+- 추출된 행은 rows.jsonl에 이어 써서 화면에서 실시간 미리보기로 읽음
+- 결과(DataFrame, 파일별 결과, 추적)는 pickle로 저장해 새로고침 후에도 다시 불러올 수 있음
+- 하트비트가 끊긴 작업(작업 프로세스 비정상 종료)은 MAX_ATTEMPTS까지 다시 대기 상태로 돌림
+- API Key는 FSMERGER_JOB_SECRET(없으면 앱이 만들어 환경 변수로 작업 관리자에게 물려줌)으로 암호화해서 저장
+  (jobs.py를 따로 띄울 때는 앱과 같은 FSMERGER_JOB_SECRET을 설정해야 함)
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import pickle
+import shutil
+import signal
+import sqlite3
+import logging
+import argparse
+import threading
+import subprocess
+import multiprocessing
+
+from cryptography.fernet import Fernet, InvalidToken
+
+import result_cache
+import tracing
+import incremental
+from batch import NamedBytes
+
+logger = logging.getLogger("fsmerger.jobs")
+
+DB_PATH = os.path.join(result_cache.CACHE_DIR, "jobs.sqlite3")
+JOBS_DIR = os.path.join(result_cache.CACHE_DIR, "jobs")
+SUPERVISOR_PID = os.path.join(JOBS_DIR, "supervisor.pid")
+# API Key 암호화 키를 담는 환경 변수 (디스크에는 저장하지 않음)
+SECRET_ENV = "FSMERGER_JOB_SECRET"
+
+# 작업 프로세스 수 (0이면 앱이 직접 띄우지 않음 - jobs.py를 따로 실행)
+WORKERS = int(os.environ.get("FSMERGER_JOB_WORKERS", 2))
+# 사용자별 동시 실행 작업 수 / 대기+실행 중 작업 수 한도
+MAX_RUNNING_PER_USER = int(os.environ.get("FSMERGER_JOB_USER_LIMIT", 1))
+MAX_PENDING_PER_USER = int(os.environ.get("FSMERGER_JOB_USER_PENDING", 3))
+
+HEARTBEAT_SECONDS = 5
+STALE_SECONDS = 60
+MAX_ATTEMPTS = 2
+POLL_SECONDS = 1.0
+# 끝난 작업(입력 파일/결과)을 보관하는 기간
+KEEP_DAYS = 7
+
+ACTIVE = ('queued', 'running')
+FINISHED = ('done', 'failed', 'cancelled')
+STATUS_NAMES = {'queued': '대기 중', 'running': '실행 중', 'done': '완료', 'failed': '실패', 'cancelled': '취소됨'}
+# 단계별 진행률 구간 (시작, 끝)과 표시 문구
+STAGES = {
+    'read': (0.0, 0.1, "파일 읽는 중"),
+    'model': (0.1, 0.9, "모델 분석 중"),
+    'merge': (0.9, 1.0, "결과 합치는 중"),
+}
+
+class JobLimitError(Exception):
+    pass
+
+class JobCancelled(Exception):
+    pass
+
+def _connect():
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    new = not os.path.exists(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    if new:
+        # 암호화한 API Key가 작업이 끝날 때까지 저장되므로 소유자만 읽을 수 있게 함
+        os.chmod(DB_PATH, 0o600)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        " id TEXT PRIMARY KEY, user TEXT, status TEXT, files TEXT, options TEXT, api_key TEXT,"
+        " created REAL, started REAL, finished REAL, heartbeat REAL, worker TEXT, attempts INTEGER DEFAULT 0,"
+        " progress REAL DEFAULT 0, message TEXT, error TEXT, cancel INTEGER DEFAULT 0)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+    return conn
+
+def _cipher():
+    # 환경 변수에 키가 없으면 만들어 둠 (이후 띄우는 작업 관리자/작업 프로세스가 그대로 물려받음)
+    secret = os.environ.get(SECRET_ENV)
+    if not secret:
+        secret = os.environ[SECRET_ENV] = Fernet.generate_key().decode()
+    return Fernet(secret.encode())
+
+def _job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+def _public(row):
+    # 화면/호출자에게 돌려줄 작업 정보 (API Key 제외)
+    if row is None:
+        return None
+    job = {k: row[k] for k in row.keys() if k != 'api_key'}
+    job['files'] = json.loads(job['files'])
+    job['options'] = json.loads(job['options'])
+    return job
+
+def user_id(api_key):
+    """
+    사용자 구분 키 (API Key 해시 앞부분 - 같은 키를 쓰는 사용자는 같은 한도를 공유)
+    """
+    return result_cache.sha256_bytes(api_key)[:16]
+
+def submit(user, api_key, files, previous_job=None, **options):
+    """
+    업로드 파일을 작업 폴더에 저장하고 대기열에 넣음. 반환값: 작업 id
+    previous_job: 그 작업의 파일별 결과를 재사용 (바뀐 파일만 분석)
+    options는 incremental.analyze에 그대로 전달 (JSON으로 저장 가능한 값만)
+    """
+    job_id = uuid.uuid4().hex
+    conn = _connect()
+    try:
+        # 한도 확인과 등록을 한 트랜잭션으로 묶어 동시에 제출해도 한도를 넘지 않게 함
+        conn.execute("BEGIN IMMEDIATE")
+        pending = conn.execute(
+            f"SELECT COUNT(*) FROM jobs WHERE user = ? AND status IN {ACTIVE}", (user,)
+        ).fetchone()[0]
+        if pending >= MAX_PENDING_PER_USER:
+            raise JobLimitError(f"대기/실행 중인 작업이 {pending}개입니다. 끝나거나 취소한 뒤 다시 시도해 주세요.")
+
+        names = []
+        for i, file in enumerate(files):
+            folder = os.path.join(_job_dir(job_id), "inputs", str(i))
+            os.makedirs(folder, exist_ok=True)
+            name = os.path.basename(file.name)
+            with open(os.path.join(folder, name), "wb") as f:
+                f.write(file.getvalue())
+            names.append(name)
+
+        conn.execute(
+            "INSERT INTO jobs (id, user, status, files, options, api_key, created, message)"
+            " VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, user, json.dumps(names, ensure_ascii=False),
+             json.dumps(dict(options, previous_job=previous_job), ensure_ascii=False),
+             _cipher().encrypt(api_key.encode()).decode(), time.time(), STATUS_NAMES['queued']),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        # 등록하지 못한 작업의 입력 파일은 남기지 않음
+        shutil.rmtree(_job_dir(job_id), ignore_errors=True)
+        raise
+    finally:
+        conn.close()
+    return job_id
+
+def status(job_id):
+    """
+    작업 상태 dict (없으면 None)
+    {'id', 'user', 'status', 'files', 'progress', 'message', 'error', 'created', 'started', 'finished', ...}
+    """
+    conn = _connect()
+    try:
+        job = _public(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+        if job and job['status'] == 'queued':
+            job['position'] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?", (job['created'],)
+            ).fetchone()[0]
+        return job
+    finally:
+        conn.close()
+
+def user_jobs(user, limit=10):
+    """
+    사용자의 최근 작업 목록 (새것부터)
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT * FROM jobs WHERE user = ? ORDER BY created DESC LIMIT ?", (user, limit))
+        return [_public(row) for row in rows.fetchall()]
+    finally:
+        conn.close()
+
+def cancel(job_id):
+    """
+    대기 중이면 바로 취소, 실행 중이면 취소 요청만 기록 (작업 프로세스가 다음 진행 보고 때 중단)
+    """
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished = ?, api_key = NULL, message = ?"
+            " WHERE id = ? AND status = 'queued'", (time.time(), STATUS_NAMES['cancelled'], job_id)
+        )
+        conn.execute("UPDATE jobs SET cancel = 1, message = '취소 중' WHERE id = ? AND status = 'running'", (job_id,))
+    finally:
+        conn.close()
+
+def load_result(job_id):
+    """
+    완료된 작업 결과 {'raw_data', 'file_results', 'run_attrs', 'trace'} (없으면 None)
+    """
+    path = os.path.join(_job_dir(job_id), "result.pkl")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def save_result(job_id, result):
+    """
+    작업 결과 저장 (임시 파일에 쓴 뒤 바꿔치기 - 다른 작업이 이전 결과로 읽는 중이어도 안전)
+    """
+    path = os.path.join(_job_dir(job_id), "result.pkl")
+    with open(f"{path}.tmp", "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{path}.tmp", path)
+
+def update_result(job_id, **changes):
+    """
+    완료된 작업 결과의 일부를 바꿔 저장 (화면에서 교정한 파일별 결과를 이 작업을 이어받는 다음 분석에 넘김)
+    반환값: 저장 여부 (결과가 이미 정리되었으면 False)
+    """
+    result = load_result(job_id)
+    if result is None:
+        return False
+    result.update(changes)
+    save_result(job_id, result)
+    return True
+
+def partial_rows(job_id):
+    """
+    실행 중 작업에서 지금까지 추출된 행 (dict 리스트, 화면 미리보기용)
+    """
+    path = os.path.join(_job_dir(job_id), "rows.jsonl")
+    if not os.path.exists(path):
+        return []
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            # 쓰는 중인 마지막 줄은 건너뜀
+            if line.endswith("\n"):
+                rows.append(json.loads(line))
+    return rows
+
+def _claim(worker):
+    """
+    대기 작업 하나를 실행 중으로 바꿔 가져옴 (사용자별 실행 한도를 넘는 사용자의 작업은 건너뜀)
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        # 하트비트가 끊긴 작업: 재시도 횟수가 남았으면 다시 대기, 아니면 실패
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', message = '작업 프로세스 중단으로 다시 대기'"
+            " WHERE status = 'running' AND heartbeat < ? AND attempts < ?", (now - STALE_SECONDS, MAX_ATTEMPTS)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', finished = ?, api_key = NULL, error = '작업 프로세스가 응답하지 않음'"
+            " WHERE status = 'running' AND heartbeat < ?", (now, now - STALE_SECONDS)
+        )
+        # 다시 대기로 돌아온 작업 중 이미 취소 요청이 있던 작업
+        conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished = ?, api_key = NULL, message = ?"
+            " WHERE status = 'queued' AND cancel = 1", (now, STATUS_NAMES['cancelled'])
+        )
+        row = conn.execute(
+            "SELECT * FROM jobs AS j WHERE status = 'queued' AND"
+            " (SELECT COUNT(*) FROM jobs AS r WHERE r.user = j.user AND r.status = 'running') < ?"
+            " ORDER BY created LIMIT 1", (MAX_RUNNING_PER_USER,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started = ?, heartbeat = ?, worker = ?,"
+                " attempts = attempts + 1, message = ? WHERE id = ?",
+                (now, now, worker, STAGES['read'][2], row['id']),
+            )
+        conn.execute("COMMIT")
+        return dict(row) if row is not None else None
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def _update(job_id, progress=None, message=None):
+    """
+    하트비트(+진행률/문구) 기록. 반환값: 취소 요청 여부
+    """
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET heartbeat = ?, progress = COALESCE(?, progress), message = COALESCE(?, message)"
+            " WHERE id = ?", (time.time(), progress, message, job_id)
+        )
+        row = conn.execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel'])
+    finally:
+        conn.close()
+
+def _finish(job_id, state, message, error=None):
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished = ?, message = ?, error = ?, api_key = NULL,"
+            " progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END WHERE id = ?",
+            (state, time.time(), message, error, state, job_id),
+        )
+    finally:
+        conn.close()
+
+def run_job(job):
+    """
+    작업 하나 실행 (작업 프로세스 안에서). 결과를 result.pkl에 저장하고 상태를 기록
+    """
+    job_id = job['id']
+    options = json.loads(job['options'])
+    previous_job = options.pop('previous_job', None)
+    cancelled, stop = threading.Event(), threading.Event()
+
+    def heartbeat():
+        # 파일 읽기/분류처럼 진행 보고가 뜸한 구간에도 살아 있음을 알리고 취소 요청을 확인
+        while not stop.wait(HEARTBEAT_SECONDS):
+            if _update(job_id):
+                cancelled.set()
+
+    last = {'key': None, 'time': 0.0}
+
+    def on_progress(stage, done, total):
+        if cancelled.is_set():
+            raise JobCancelled()
+        start, end, label = STAGES[stage]
+        now = time.time()
+        if (stage, done) == last['key'] and now - last['time'] < POLL_SECONDS:
+            return
+        last['key'], last['time'] = (stage, done), now
+        progress = start + (end - start) * (done / total if total else 1.0)
+        message = f"{label} ({done}/{total})" if stage != 'merge' else label
+        if _update(job_id, progress, message):
+            cancelled.set()
+            raise JobCancelled()
+
+    rows_file = None
+
+    def on_rows(rows):
+        rows_file.write("".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows))
+        rows_file.flush()
+
+    thread = threading.Thread(target=heartbeat, name=f"heartbeat-{job_id[:8]}", daemon=True)
+    thread.start()
+    try:
+        rows_file = open(os.path.join(_job_dir(job_id), "rows.jsonl"), "w", encoding="utf-8")
+        inputs = os.path.join(_job_dir(job_id), "inputs")
+        files = [NamedBytes(os.path.join(inputs, str(i), name)) for i, name in enumerate(json.loads(job['files']))]
+        previous = load_result(previous_job) if previous_job else None
+        try:
+            api_key = _cipher().decrypt(job['api_key'].encode()).decode()
+        except (InvalidToken, AttributeError):
+            raise RuntimeError(f"API Key를 읽을 수 없습니다 (앱과 작업 프로세스의 {SECRET_ENV}가 다름)") from None
+        with tracing.trace("analysis") as trace:
+            raw_df, file_results, run_df = incremental.analyze(
+                api_key, files, previous['file_results'] if previous else None,
+                on_rows=on_rows, on_progress=on_progress, **options
+            )
+        result = {
+            'raw_data': raw_df,
+            'file_results': file_results,
+            'run_attrs': dict(run_df.attrs) if run_df is not None else {},
+            'trace': trace,
+        }
+        save_result(job_id, result)
+        _finish(job_id, 'done', f"{STATUS_NAMES['done']}: 계정 {len(raw_df)}행")
+    except JobCancelled:
+        _finish(job_id, 'cancelled', STATUS_NAMES['cancelled'])
+    except Exception as e:
+        logger.exception("작업 %s 실패", job_id)
+        _finish(job_id, 'failed', STATUS_NAMES['failed'], error=str(e))
+    finally:
+        stop.set()
+        thread.join()
+        if rows_file is not None:
+            rows_file.close()
+
+def work(stop=None):
+    """
+    작업 프로세스 본체: 대기 작업을 하나씩 가져와 실행 (stop 이벤트가 설정되면 끝냄)
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = str(os.getpid())
+    while stop is None or not stop.is_set():
+        job = _claim(worker)
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        logger.info("작업 %s 시작 (사용자 %s, 파일 %s개)", job['id'], job['user'], len(json.loads(job['files'])))
+        run_job(job)
+
+def purge(keep_days=KEEP_DAYS):
+    """
+    keep_days보다 오래전에 끝난 작업의 기록/폴더 삭제. 반환값: 삭제한 작업 수
+    """
+    conn = _connect()
+    try:
+        cutoff = time.time() - keep_days * 86400
+        ids = [row['id'] for row in conn.execute(
+            f"SELECT id FROM jobs WHERE status IN {FINISHED} AND finished < ?", (cutoff,)
+        ).fetchall()]
+        for job_id in ids:
+            shutil.rmtree(_job_dir(job_id), ignore_errors=True)
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+    finally:
+        conn.close()
+
+def _alive(pid):
+    if os.name == 'nt':
+        # Windows에서는 os.kill(pid, 0)이 프로세스를 종료시키므로 확인하지 않음
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _supervisor_pid():
+    try:
+        with open(SUPERVISOR_PID, encoding='utf-8') as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+    return pid if _alive(pid) else None
+
+def _take_supervisor_pid():
+    # pid 파일을 배타적으로 만들어 관리자가 하나만 돌게 함 (남아 있는 파일의 프로세스가 죽었으면 지우고 다시 시도)
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(SUPERVISOR_PID, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if _supervisor_pid() is not None:
+                return False
+            try:
+                os.remove(SUPERVISOR_PID)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+def supervise(workers=WORKERS, parent_pid=None):
+    """
+    작업 프로세스 workers개를 띄우고 죽으면 다시 띄움. parent_pid 프로세스가 끝나면 같이 끝냄
+    (ingest가 작업 프로세스 안에서 다시 프로세스 풀을 쓰므로 daemon 프로세스로 띄우지 않음)
+    """
+    if not _take_supervisor_pid():
+        logger.info("이미 실행 중인 작업 관리자가 있습니다 (pid %s)", _supervisor_pid())
+        return
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    context = multiprocessing.get_context("spawn")
+    processes, last_purge = {}, 0.0
+    try:
+        while not stop.is_set():
+            for i in range(workers):
+                process = processes.get(i)
+                if process is None or not process.is_alive():
+                    process = context.Process(target=work, name=f"fsmerger-job-{i}")
+                    process.start()
+                    processes[i] = process
+            if parent_pid and not _alive(parent_pid):
+                break
+            if time.time() - last_purge > 3600:
+                last_purge = time.time()
+                purge()
+            stop.wait(2)
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(10)
+        # 중간에 끊긴 작업은 하트비트 만료를 기다리지 않고 바로 다시 대기
+        conn = _connect()
+        try:
+            pids = [str(p.pid) for p in processes.values()]
+            conn.execute(
+                f"UPDATE jobs SET status = 'queued', message = ? WHERE status = 'running'"
+                f" AND worker IN ({','.join('?' * len(pids))})", [STATUS_NAMES['queued'], *pids]
+            )
+        finally:
+            conn.close()
+        if _supervisor_pid() == os.getpid():
+            os.remove(SUPERVISOR_PID)
+
+_launched = []
+
+def ensure_workers(workers=WORKERS):
+    """
+    작업 관리자가 없으면 백그라운드 프로세스로 띄움 (이 프로세스가 끝나면 같이 끝남). 반환값: 관리자 pid 또는 None
+    """
+    if workers <= 0:
+        return None
+    # 작업 관리자가 API Key를 복호화할 수 있도록 띄우기 전에 암호화 키를 환경 변수에 둠
+    _cipher()
+    running = [p for p in _launched if p.poll() is None]
+    if running:
+        return running[0].pid
+    pid = _supervisor_pid()
+    if pid is not None:
+        return pid
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--workers", str(workers), "--parent-pid", str(os.getpid())],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    _launched.append(process)
+    return process.pid
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="분석 작업 큐의 작업 프로세스 실행")
+    parser.add_argument("--workers", type=int, default=max(1, WORKERS), help="작업 프로세스 수")
+    parser.add_argument("--parent-pid", type=int, help="이 프로세스가 끝나면 같이 종료")
+    parser.add_argument("--purge", action="store_true", help="오래된 작업만 정리하고 끝냄")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.purge:
+        logger.info("삭제한 작업: %d개", purge())
+        return 0
+    supervise(args.workers, args.parent_pid)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,64 +1,156 @@
 import pandas as pd
-from google import genai
 import json
-import openpyxl
-import io
-import pypdf
-import docx
+import re
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import result_cache
+import taxonomy
+import table_parser
+import ingest
+import page_classifier
+import compaction
+import dedup
+import gemini_client
+import schema
+import tracing
+import table_output
+import validation
+
+MODEL_NAME = gemini_client.DEFAULT_MODEL
+FALLBACK_MODEL_NAME = gemini_client.FALLBACK_MODEL
+
+# 청크 분할 기준 (문자 수 / 추정 토큰 수) 및 동시 호출 개수
+MAX_CHUNK_CHARS = 60000
+CHUNK_TOKEN_BUDGET = 20000
+MAX_WORKERS = 4
+
+# 캐시 키에 포함되는 버전 (추출 방식/프롬프트가 바뀌면 올려서 기존 캐시 무효화)
+EXTRACT_VERSION = "3"
+PROMPT_VERSION = "3"
+
+AMOUNT_RE = re.compile(r'^\(?-?[\d,]+(\.\d+)?\)?$')
+YEAR_RE = re.compile(r'^(19|20)\d{2}(\.0)?$')
+
+def _is_error(sections, name):
+    return len(sections) == 1 and sections[0][1].startswith(f"Error reading {name}")
+
+def extract_file_sections(file, use_cache=True):
+    """
+    파일 내용을 시트/문서 단위 섹션 리스트로 변환
+    반환값: [(섹션 헤더, 본문 텍스트), ...]
+    같은 내용(SHA-256)의 파일은 디스크 캐시에서 바로 가져옴
+    """
+    return extract_all_sections([file], use_cache=use_cache)[0][0]
+
+def extract_all_sections(target_files, use_cache=True, max_workers=None):
+    """
+    여러 파일을 한 번에 섹션으로 변환 (캐시에 없는 파일만 ingest 프로세스 풀에서 동시에 읽음)
+    반환값: (파일별 섹션 리스트, 파일별 소요시간 목록)
+    """
+    named_data = [(file.name, result_cache.file_bytes(file)) for file in target_files]
+    # PDF는 페이지 선택 설정이 바뀌면 다시 읽음
+    keys = [
+        f"{result_cache.file_hash(file)}:{file.name}:{EXTRACT_VERSION}"
+        + (f":{page_classifier.cache_tag()}" if file.name.lower().endswith('.pdf') else "")
+        for file in target_files
+    ]
+
+    file_sections = [None] * len(named_data)
+    if use_cache:
+        for i, key in enumerate(keys):
+            cached = result_cache.get("sections", key)
+            if cached is not None:
+                file_sections[i] = [tuple(section) for section in cached]
+
+    missing = [i for i, sections in enumerate(file_sections) if sections is None]
+    with tracing.span("read_files", files=len(missing), cache_hits=len(named_data) - len(missing)):
+        read, timings = ingest.extract_files([named_data[i] for i in missing], max_workers=max_workers)
+    # 파일별 읽기는 ingest 작업 프로세스에서 일어나므로 거기서 잰 시간을 구간으로 기록
+    for timing in timings[:-1]:
+        pages = {'pages': timing['pages'], 'pages_used': timing['pages_used']} if timing['pages'] else {}
+        tracing.record("read_file", timing['seconds'], file=timing['file'], bytes_in=timing['bytes'],
+                       sections=timing['sections'], **pages)
+        if timing['pages']:
+            tracing.add("pdf_pages", timing['pages'])
+            tracing.add("pdf_pages_used", timing['pages_used'])
+    tracing.add("bytes_in", sum(len(data) for _, data in named_data))
+    for i, sections in zip(missing, read):
+        file_sections[i] = sections
+        name = named_data[i][0]
+        if use_cache and not _is_error(sections, name):
+            result_cache.put("sections", keys[i], sections)
+
+    return file_sections, timings
 
 def extract_file_content(file):
     """
     파일 내용을 텍스트로 변환
     """
-    file_ext = file.name.split('.')[-1].lower()
-    content_list = []
-    
-    try:
-        if file_ext in ['xlsx', 'xls']:
-            engine = 'openpyxl' if file_ext == 'xlsx' else 'xlrd'
-            # header=None으로 읽어서 모든 데이터를 있는 그대로 가져옴
-            dfs = pd.read_excel(file, sheet_name=None, engine=engine, header=None)
-            for sheet_name, df in dfs.items():
-                df = df.dropna(how='all').dropna(axis=1, how='all')
-                csv_text = df.to_csv(index=False, header=False)
-                content_list.append(f"File: {file.name} | Sheet: {sheet_name}\n{csv_text}")
-
-        elif file_ext == 'csv':
-            df = pd.read_csv(file, header=None)
-            content_list.append(f"File: {file.name}\n{df.to_csv(index=False, header=False)}")
-
-        elif file_ext == 'pdf':
-            pdf_reader = pypdf.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            content_list.append(f"File: {file.name} (PDF)\n{text}")
-
-        elif file_ext in ['docx', 'doc']:
-            doc = docx.Document(file)
-            text = "\n".join([para.text for para in doc.paragraphs])
-            content_list.append(f"File: {file.name} (Word)\n{text}")
-            
-        elif file_ext == 'txt':
-            text = file.getvalue().decode("utf-8")
-            content_list.append(f"File: {file.name}\n{text}")
-
-    except Exception as e:
-        return f"Error reading {file.name}: {str(e)}"
-
-    return "\n\n".join(content_list)
-
-def process_smart_merge(api_key, target_files):
-    full_context = ""
-    for file in target_files:
-        full_context += extract_file_content(file) + "\n\n"
-    
-    # Context 제한 없음 (Full processing)
-
-    client = genai.Client(api_key=api_key)
+    return "\n\n".join(f"{header}\n{body}" for header, body in extract_file_sections(file))
+
+def _is_amount_cell(cell):
+    # 연도(2023, 2023.0)는 머리글로 보고 그 외 숫자만 금액으로 취급
+    cell = cell.strip()
+    return bool(AMOUNT_RE.match(cell)) and not YEAR_RE.match(cell)
 
+def split_into_chunks(sections, limit=MAX_CHUNK_CHARS, measure=len):
+    """
+    섹션들을 원래 순서대로 limit 이하의 청크로 묶음 (크기는 measure로 측정, 기본은 문자 수)
+    한 섹션이 limit보다 크면 줄 단위로 잘라 헤더(기간 컬럼 행 포함)를 반복해서 붙임
+    """
+    pieces = []
+    for header, body in sections:
+        if measure(header) + measure(body) <= limit:
+            pieces.append(f"{header}\n{body}")
+            continue
+        body_lines = body.splitlines()
+        # 첫 숫자 행 이전까지(최대 5줄)를 표 머리글로 보고 각 조각에 반복
+        head_lines = []
+        for line in body_lines[:5]:
+            if any(_is_amount_cell(cell) for cell in line.split(',')[1:]):
+                break
+            head_lines.append(line)
+        head_text = "\n".join(head_lines)
+        budget = max(1, limit - measure(header) - measure(head_text) - measure(" (part 00)"))
+
+        lines, size, part = [], 0, 1
+        for line in body_lines[len(head_lines):]:
+            line_size = measure(line) + 1
+            if lines and size + line_size > budget:
+                pieces.append(f"{header} (part {part})\n{head_text}\n" + "\n".join(lines))
+                lines, size, part = [], 0, part + 1
+            lines.append(line)
+            size += line_size
+        if lines:
+            pieces.append(f"{header} (part {part})\n{head_text}\n" + "\n".join(lines))
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        piece_size = measure(piece)
+        if current and size + piece_size > limit:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += piece_size + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def build_prompt(context, unmapped=None):
     # [프롬프트] 모든 재무제표 식별 + 상세 계정 나열 지시
-    prompt = f"""
+    # unmapped: 로컬(택사노미)에서 분류하지 못한 계정명 - 주면 이 계정들만 "s"를 받고 나머지는 생략하게 함
+    statement_rule = ""
+    if unmapped is not None:
+        statement_rule = f"""
+    [RULE 4: Statement Codes Already Known]
+    The statement code of every account is already known EXCEPT the accounts in [Unmapped Accounts].
+    Give "s" ONLY for rows whose account is listed there. Omit "s" for every other row.
+
+    [Unmapped Accounts]
+    {json.dumps(unmapped, ensure_ascii=False)}
+"""
+    return f"""
     You are a Forensic Accountant creating a fully detailed consolidated report.
 
     [MISSION]
@@ -84,43 +176,499 @@ def process_smart_merge(api_key, target_files):
     - **Annual (Year-End):** "2023", "2024" (Simple Year)
     - **Interim (Quarter):** "2025.3Q(3M)", "2025.3Q(Cum)" (Split 3M/Cum)
     - Capture "Previous Period" comparisons if available.
-
+    {statement_rule}
     [Input Data]
-    {full_context}
-
-    [Output Format]
-    JSON Array Only.
-    [
-      {{
-        "Statement": "COGM",
-        "Level": 3,
-        "Account_Name": "원재료비",
-        "2023": 5000,
-        "2024": 6000,
-        "2025.3Q(Cum)": 4500
-      }},
-      ...
-    ]
+    {context}
+    {table_output.OUTPUT_FORMAT}"""
+
+def _generate_stream(client, prompt, config=None):
+    """
+    스트리밍 응답 텍스트 조각 생성 (첫 조각 전 오류는 재시도 후 예비 모델 사용)
+    """
+    return gemini_client.generate_stream(client, prompt, model=MODEL_NAME, fallback_model=FALLBACK_MODEL_NAME,
+                                         config=config)
+
+def _generate(client, prompt, config=None):
+    return gemini_client.generate(client, prompt, model=MODEL_NAME, fallback_model=FALLBACK_MODEL_NAME,
+                                  config=config).text
+
+def _extract_table(client, prompt, on_rows=None, span=None, statements=None):
+    """
+    표 형식(table_output)으로 스트리밍 추출. 반환값: ({'periods', 'rows'}, 응답이 끝까지 왔고 버린 행이 없는지)
+    statements: {정규화 계정명: Statement} - 모델이 "s"를 생략한 행을 로컬 분류 결과로 채움
+    """
+    rows, state = [], {}
+    pieces = _generate_stream(client, prompt, config=table_output.CONFIG)
+    # 추적 중이면 모델 응답 대기 시간과 JSON 파싱 시간을 나눠서 잼
+    stats = {'wait': 0.0, 'bytes': 0} if span is not None and tracing.active() else None
+    started = time.perf_counter()
+    for row in table_output.iter_rows(_timed_pieces(pieces, stats) if stats else pieces, state):
+        if row[0] is None and statements:
+            row[0] = statements.get(taxonomy.normalize_name(row[2]))
+        rows.append(row)
+        if on_rows:
+            on_rows(table_output.to_records(state['periods'], [row]))
+    # 객체가 닫힌 뒤 남은 조각까지 받아야 사용량이 기록됨
+    for _ in pieces:
+        pass
+    if state['invalid']:
+        tracing.add("invalid_rows", state['invalid'])
+    if stats:
+        span.set(rows=len(rows), invalid_rows=state['invalid'], response_bytes=stats['bytes'],
+                 model_seconds=round(stats['wait'], 6),
+                 parse_seconds=round(time.perf_counter() - started - stats['wait'], 6),
+                 complete=state['complete'])
+    table = {'periods': state['periods'] or [], 'rows': rows}
+    return table, state['complete'] and not state['invalid']
+
+def local_statements(chunk):
+    """
+    택사노미로 확신할 수 있는 계정은 로컬에서 분류하고 나머지 계정만 모델이 분류하게 함
+    반환값: ({정규화 계정명: Statement}, 모델이 분류할 계정명 목록 또는 None(모두 모델이 분류))
+    로컬로 분류한 계정이 더 적으면 목록이 입력 토큰만 늘리므로 예전처럼 모델이 모두 분류
     """
+    statements, unmapped = table_parser.classify_labels(chunk)
+    if len(statements) < len(unmapped):
+        return {}, None
+    return statements, unmapped
 
+def _extract_chunk(client, chunk, use_cache=True, on_rows=None):
+    """
+    청크 하나를 스트리밍으로 추출. 반환값: ({'periods', 'rows'}, 응답이 끝까지 왔는지 여부)
+    """
+    key = result_cache.sha256_bytes(f"{PROMPT_VERSION}|{MODEL_NAME}|{chunk}")
+    if use_cache:
+        cached = result_cache.get("chunk", key)
+        if cached is not None:
+            tracing.add("chunk_cache_hits")
+            if on_rows:
+                on_rows(table_output.to_records(cached['periods'], cached['rows']))
+            return cached, True
+
+    statements, unmapped = local_statements(chunk)
+    prompt = build_prompt(chunk, unmapped)
+    with tracing.span("extract_chunk", chunk=chunk.split("\n", 1)[0], prompt_bytes=len(prompt.encode()),
+                      local_accounts=len(statements), unmapped_accounts=len(unmapped or ())) as span:
+        table, complete = _extract_table(client, prompt, on_rows=on_rows, span=span, statements=statements)
+
+    # 잘렸거나 형식이 틀린 행이 있던 응답은 받은 행까지만 사용하고 캐시에는 넣지 않음
+    if use_cache and complete:
+        result_cache.put("chunk", key, table)
+    return table, complete
+
+def _timed_pieces(pieces, stats):
+    # 응답 조각을 기다린 시간과 받은 바이트 수를 stats에 누적
+    pieces = iter(pieces)
+    while True:
+        started = time.perf_counter()
+        piece = next(pieces, None)
+        stats['wait'] += time.perf_counter() - started
+        if piece is None:
+            return
+        stats['bytes'] += len(piece.encode())
+        yield piece
+
+def _source_label(text, taken):
+    # 섹션/청크 첫 줄을 Source 이름으로 사용 (겹치면 번호를 붙임)
+    label = text.split("\n", 1)[0].strip() or "(untitled)"
+    unique, n = label, 2
+    while unique in taken:
+        unique, n = f"{label} #{n}", n + 1
+    return unique
+
+class TruncatedResponseError(Exception):
+    """모델 응답이 끝까지 오지 않았거나 형식이 틀린 행이 있음"""
+
+def _drain(row_queue, on_rows, timeout=None):
+    batch = []
     try:
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview", 
-            contents=prompt
+        batch.extend(row_queue.get(timeout=timeout) if timeout else row_queue.get_nowait())
+        while True:
+            batch.extend(row_queue.get_nowait())
+    except queue.Empty:
+        pass
+    if batch:
+        on_rows(batch)
+
+def _read_stage(target_files, use_cache, compact, report):
+    """
+    파일을 섹션으로 읽고 compact=True이면 압축
+    반환값: (파일별 섹션, 파일별 읽기 시간, 압축 보고)
+    """
+    report('read', 0, len(target_files))
+    file_sections, ingest_timings = extract_all_sections(target_files, use_cache=use_cache)
+    report('read', len(target_files), len(target_files))
+    compaction_report = []
+    if compact:
+        with tracing.span("compaction") as span:
+            file_sections, compaction_report = compaction.compact_sections(
+                file_sections, names=[file.name for file in target_files]
+            )
+            span.set(tokens_before=sum(r['tokens_before'] for r in compaction_report),
+                     tokens_after=sum(r['tokens_after'] for r in compaction_report))
+    return file_sections, ingest_timings, compaction_report
+
+def _parse_stage(file_sections, rule_based):
+    """
+    정형 시트는 바로 변환하고 나머지만 모델로 보냄
+    반환값: 파일별 [(종류 'parsed'/'pending', header, body, 변환 결과)] (dedup에서 'dropped'로 바뀔 수 있음)
+    """
+    items = []
+    for sections in file_sections:
+        file_items = []
+        for header, body in sections:
+            parsed = None
+            if rule_based:
+                with tracing.span("parse_section", section=header.split("\n", 1)[0]) as span:
+                    parsed = table_parser.parse_section(header, body)
+                    span.set(rows=0 if parsed is None else len(parsed))
+            file_items.append(['pending' if parsed is None else 'parsed', header, body, parsed])
+        items.append(file_items)
+    return items
+
+def _dedup_stage(items, target_files):
+    """
+    파일 간 중복 표 제거는 모델에 보낼 섹션에만 적용 (규칙 기반으로 변환하는 시트는 토큰과 무관)
+    items의 본문을 줄이거나 'dropped'로 바꿈
+    반환값: (dedup 보고, restores) - restores: (파일명, header) -> 보고 항목/원래 표/원문, 추출 뒤 그 파일의 행에 값을 되살림
+    """
+    restores = {}
+    with tracing.span("dedup") as span:
+        pending = [[item for item in file_items if item[0] == 'pending'] for file_items in items]
+        kept_sections, dedup_report = dedup.dedup_sections(
+            [[(header, body) for _, header, body, _ in file_pending] for file_pending in pending],
+            names=[file.name for file in target_files]
         )
-    except Exception:
-        response = client.models.generate_content(
-            model="gemini-1.5-flash",
-            contents=prompt
+        originals = {}
+        for file, file_pending, kept in zip(target_files, pending, kept_sections):
+            kept = iter(kept)
+            section = next(kept, None)
+            for item in file_pending:
+                originals[(file.name, item[1])] = (item[2], section[1] if section and section[0] == item[1] else '')
+                if section is not None and section[0] == item[1]:
+                    item[2] = section[1]
+                    section = next(kept, None)
+                else:
+                    item[0] = 'dropped'
+        for entry in dedup_report:
+            key = (entry['file'], entry['section'])
+            original, trimmed = originals[key]
+            restores[key] = {'entry': entry, 'table': dedup.parse_table(original),
+                             'original': original, 'trimmed': trimmed, 'chunks': []}
+        span.set(sections=sum(1 for r in dedup_report if r['action'] == 'section'),
+                 columns=sum(len(r['periods'].split(', ')) for r in dedup_report if r['action'] == 'columns'),
+                 tokens_saved=sum(r['tokens_saved'] for r in dedup_report))
+    return dedup_report, restores
+
+def _plan_stage(target_files, items, restores, parallel, chunk_sections):
+    """
+    결과 순서와 모델에 보낼 청크를 정함
+    segments: ('parsed', DataFrame) / ('chunk', 청크 번호) / ('restored', (파일명, 섹션 header))
+    source_texts: Source 이름 -> 원문 (검증 실패 시 그 부분만 다시 추출할 때 사용)
+    반환값: {'segments', 'chunks', 'chunk_files', 'chunk_labels', 'source_texts'}
+    """
+    segments, chunks, chunk_files, source_texts = [], [], [], {}
+
+    def flush(pending, file):
+        for chunk in chunk_sections(pending):
+            segments.append(('chunk', len(chunks)))
+            chunks.append(chunk)
+            chunk_files.append(file.name)
+
+    for file, file_items in zip(target_files, items):
+        pending = []
+        for kind, header, body, parsed in file_items:
+            if kind == 'pending':
+                pending.append((header, body))
+                continue
+            if kind == 'dropped' and not parallel:
+                continue
+            if pending and parallel:
+                flush(pending, file)
+                pending = []
+            label = _source_label(header, source_texts)
+            if kind == 'dropped':
+                # 통째로 뺀 섹션은 원문을 남겨 두고 추출 뒤 앞선 표의 행으로 채움
+                source_texts[label] = f"{header}\n{body}"
+                restores[(file.name, header)]['label'] = label
+                segments.append(('restored', (file.name, header)))
+                continue
+            source_texts[label] = f"{header}\n{body}"
+            segments.append(('parsed', parsed.assign(Source=label, File=file.name)))
+        if pending and parallel:
+            flush(pending, file)
+        elif pending:
+            chunks.extend(f"{header}\n{body}" for header, body in pending)
+
+    if not parallel and chunks:
+        # Context 제한 없음 (Full processing) - 여러 파일이 한 요청에 섞이므로 파일 구분 없음
+        chunks = ["\n\n".join(chunks)]
+        chunk_files = [None]
+        segments.append(('chunk', 0))
+    chunk_labels = []
+    for idx, chunk in enumerate(chunks):
+        chunk_labels.append(_source_label(chunk, source_texts))
+        source_texts[chunk_labels[-1]] = chunk
+        if not parallel:
+            continue
+        # 기간 열을 뺀 섹션이 든 청크: 다시 추출할 때는 원래 표 전체를 보냄
+        for (name, header), restore in restores.items():
+            if name == chunk_files[idx] and restore['entry']['action'] == 'columns' and (
+                    f"{header}\n" in chunk or f"{header} (part " in chunk):
+                restore['chunks'].append(idx)
+                source_texts[chunk_labels[-1]] = source_texts[chunk_labels[-1]].replace(
+                    f"{header}\n{restore['trimmed']}", f"{header}\n{restore['original']}")
+    return {'segments': segments, 'chunks': chunks, 'chunk_files': chunk_files,
+            'chunk_labels': chunk_labels, 'source_texts': source_texts}
+
+def _model_stage(client, chunks, use_cache, max_workers, on_rows, on_progress, report):
+    """
+    청크를 동시에 모델로 추출. 반환값: 청크별 (표, 오류) - 잘린 응답은 TruncatedResponseError
+    """
+    # 진행 중 받은 행은 작업 스레드에서 큐에 넣고, 콜백은 호출한 스레드에서만 실행
+    # (Streamlit 요소는 스크립트 스레드에서만 갱신 가능)
+    row_queue = queue.Queue()
+
+    def run(chunk):
+        try:
+            table, complete = _extract_chunk(
+                client, chunk, use_cache=use_cache, on_rows=row_queue.put if on_rows else None
+            )
+            return table, None if complete else TruncatedResponseError(chunk.split("\n", 1)[0])
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks) or 1))) as pool:
+        futures = [tracing.submit(pool, run, chunk) for chunk in chunks]
+        try:
+            while (on_rows or on_progress) and not all(f.done() for f in futures):
+                if on_rows:
+                    _drain(row_queue, on_rows, timeout=0.2)
+                else:
+                    time.sleep(0.2)
+                report('model', sum(f.done() for f in futures), len(futures))
+        except BaseException:
+            # 중단 요청: 아직 시작 안 한 청크는 취소 (진행 중인 호출만 끝까지 기다림)
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        results = [f.result() for f in futures]
+    if on_rows:
+        _drain(row_queue, on_rows)
+    report('model', len(chunks), len(chunks))
+    return results
+
+def _frame_stage(client, results, plan):
+    """
+    청크별 표를 DataFrame으로 바꾸고 비어 있는 Statement/Level을 택사노미로 채움
+    반환값: {청크 번호: DataFrame}
+    """
+    # 로컬 분류로도 모델 출력으로도 Statement가 정해지지 않은 행, Level이 빈 행만 택사노미로 채움 (못 채운 것만 모델에 한 번에 질의)
+    model_frames = {
+        idx: schema.from_table(table['periods'], table['rows']).assign(
+            Source=plan['chunk_labels'][idx], File=plan['chunk_files'][idx]
         )
+        for idx, (table, _) in enumerate(results) if table and table['rows']
+    }
+    if not model_frames:
+        return {}
+    model_df = pd.concat(model_frames.values(), keys=list(model_frames), names=['_chunk', None], sort=False)
+    with tracing.span("taxonomy", rows=len(model_df)):
+        model_df = taxonomy.map_accounts(model_df, client, _generate)
+    return {idx: model_df.xs(idx, level='_chunk') for idx in model_frames}
+
+def _restore_stage(restores, extracted, plan, failed_files):
+    """
+    dedup으로 뺀 값을 그 파일의 행에 되살림 (파일별 결과만으로도 값이 빠지지 않도록)
+    extracted와 failed_files를 고치고, 통째로 뺀 섹션의 행을 {(파일명, header): DataFrame}으로 반환
+    """
+    chunk_files, chunk_labels = plan['chunk_files'], plan['chunk_labels']
+    restored = {}
+    with tracing.span("dedup_restore") as span:
+        for (name, header), restore in restores.items():
+            entry = restore['entry']
+            kept_files = entry['kept_files'].split(', ')
+            if failed_files & set(kept_files):
+                # 앞선 표의 청크가 실패하면 되살릴 행이 없으므로 이 파일도 다음 실행에서 다시 처리
+                failed_files.add(name)
+                continue
+            donors = [frame for idx, frame in extracted.items() if chunk_files[idx] in kept_files]
+            donors = pd.concat(donors, sort=False) if donors else schema.concat_results([])
+            indices = [idx for idx in restore['chunks'] if idx in extracted]
+            frame = (pd.concat([extracted[idx] for idx in indices], keys=indices, sort=False)
+                     if indices else schema.concat_results([]))
+            frame, extra = dedup.restore_rows(frame, donors, restore['table'], entry['periods'].split(', '))
+            for idx in indices:
+                extracted[idx] = frame.xs(idx)
+            if entry['action'] == 'section':
+                restored[(name, header)] = extra.assign(Source=restore['label'], File=name)
+            elif len(extra) and indices:
+                extracted[indices[-1]] = pd.concat(
+                    [extracted[indices[-1]], extra.assign(Source=chunk_labels[indices[-1]], File=name)],
+                    sort=False)
+        span.set(sections=len(restores), rows=sum(len(frame) for frame in restored.values()))
+    return restored
+
+def _assemble_stage(segments, extracted, restored):
+    # 원래 순서대로 모아 정형 스키마로 한 번에 변환 (Statement/Account_Name 범주형, Level int8, 기간 float64)
+    frames = []
+    for kind, value in segments:
+        if kind == 'parsed':
+            frames.append(value)
+        elif kind == 'restored':
+            if value in restored:
+                frames.append(restored[value])
+        elif value in extracted:
+            frames.append(extracted[value])
+    with tracing.span("build_frame", frames=len(frames)) as span:
+        df = schema.concat_results(frames)
+        span.set(rows=len(df))
+    return df
+
+def process_smart_merge(api_key, target_files, parallel=True, max_workers=MAX_WORKERS, use_cache=True,
+                        rule_based=True, on_rows=None, compact=True, token_budget=CHUNK_TOKEN_BUDGET,
+                        on_progress=None, deduplicate=True):
+    """
+    파일들을 섹션 단위로 추출 후 청크로 나눠 모델에 동시 요청하고,
+    청크별 JSON 결과를 원래 순서대로 합쳐 DataFrame으로 반환
+    parallel=False이면 기존처럼 전체를 한 번에 요청
+    청크는 파일 경계를 넘지 않으므로 파일 하나가 바뀌면 그 파일의 청크만 다시 요청됨
+    rule_based=True이면 정형화된 시트는 table_parser로 바로 변환하고 나머지만 모델에 보냄
+    on_rows(rows)를 주면 완성된 행(dict 리스트)을 받는 대로 호출 (화면 실시간 갱신용)
+    compact=True이면 불필요한 내용을 걷어낸 뒤 추정 토큰 수 token_budget 이하로 청크를 나눔
+    on_progress(stage, done, total)를 주면 단계('read'/'model'/'merge')별 진행을 호출한 스레드에서 알림
+    (모델 호출 중에는 0.2초마다 호출되므로 예외를 던지면 남은 청크를 취소하고 중단)
+    deduplicate=True이면 모델에 보낼 섹션 중 앞선 표와 값이 같은 기간 열/시트를 빼고 보내고,
+    추출 뒤 뺀 값을 원래 파일의 행에 되살림 (파일별 결과는 dedup하지 않은 것과 같음, dedup 참고)
+    """
+    report = on_progress or (lambda stage, done, total: None)
+    file_sections, ingest_timings, compaction_report = _read_stage(target_files, use_cache, compact, report)
+
+    def chunk_sections(sections):
+        if compact:
+            return split_into_chunks(sections, limit=token_budget, measure=compaction.estimate_tokens)
+        return split_into_chunks(sections)
+
+    items = _parse_stage(file_sections, rule_based)
+    dedup_report, restores = _dedup_stage(items, target_files) if deduplicate else ([], {})
+    plan = _plan_stage(target_files, items, restores, parallel, chunk_sections)
+    segments, chunks = plan['segments'], plan['chunks']
+
+    if on_rows:
+        for kind, value in segments:
+            if kind == 'parsed':
+                on_rows(value.to_dict('records'))
+    client = gemini_client.get_client(api_key) if chunks else None
+    results = _model_stage(client, chunks, use_cache, max_workers, on_rows, on_progress, report)
+
+    truncated = [err.args[0] for _, err in results if isinstance(err, TruncatedResponseError)]
+    results = [(table, None if isinstance(err, TruncatedResponseError) else err) for table, err in results]
+    errors = [err for _, err in results if err is not None]
+    if errors and len(errors) == len(results) and not any(kind == 'parsed' for kind, _ in segments):
+        raise errors[0]
+
+    report('merge', 0, 1)
+    extracted = _frame_stage(client, results, plan)
+    failed_files = {name for name, (_, err) in zip(plan['chunk_files'], results) if err is not None and name}
+    restored = _restore_stage(restores, extracted, plan, failed_files) if restores and parallel else {}
+    df = _assemble_stage(segments, extracted, restored)
+
+    # 실패한 청크는 전체 실행을 버리지 않고 목록으로만 남김
+    df.attrs['failed_chunks'] = [
+        chunk.split("\n", 1)[0] for chunk, (_, err) in zip(chunks, results) if err is not None
+    ]
+    df.attrs['truncated_chunks'] = truncated
+    df.attrs['failed_files'] = sorted(failed_files)
+    df.attrs['ingest_timings'] = ingest_timings
+    df.attrs['compaction_report'] = compaction_report
+    df.attrs['dedup_report'] = dedup_report
+    df.attrs['parsed_sections'] = sum(1 for kind, _ in segments if kind == 'parsed')
+    df.attrs['sources'] = plan['source_texts']
+    df.attrs['model_sources'] = plan['chunk_labels']
+    with tracing.span("validation") as span:
+        df.attrs['validation'] = validation.validate(df)
+        span.set(issues=len(df.attrs['validation']))
+    report('merge', 1, 1)
+
+    return df
+
+def build_correction_prompt(context, problems):
+    # [프롬프트] 검증에 실패한 부분만 문제 목록과 함께 다시 추출 요청
+    problem_text = "\n".join(f"    - {p}" for p in problems)
+    return build_prompt(context) + f"""
+    [Correction Request]
+    A previous extraction of this input failed these consistency checks:
+{problem_text}
+    Re-extract ALL accounts of this input again and fix the errors above.
+    - Use the numbers exactly as written in the input (no rounding, keep signs).
+    - Every total/subtotal row must equal the sum of its detail accounts, with correct Level values.
+    - Total assets must equal total liabilities plus total equity.
+    - Fill every period column that appears in the input.
+    """
+
+def _rebuild(df, replacements):
+    # Source 순서를 유지하면서 바꿀 Source의 행만 새 DataFrame으로 교체
+    frames = []
+    for source in pd.unique(df['Source']):
+        frames.append(replacements[source] if source in replacements else df[df['Source'] == source])
+    rebuilt = schema.concat_results(frames)
+    rebuilt.attrs = dict(df.attrs)
+    return rebuilt
+
+def reextract_sources(api_key, df, issues=None, max_workers=MAX_WORKERS, use_cache=True):
+    """
+    검증에 실패한 Source(시트/청크)만 교정 프롬프트로 다시 추출해서 그 행만 바꿔 끼움
+    다시 추출한 결과가 그 Source의 검증 문제를 줄이지 못하면 기존 행을 유지함
+    반환값: (새 DataFrame, 바꾼 Source 목록)
+    """
+    if issues is None:
+        issues = validation.validate(df)
+    texts = df.attrs.get('sources', {})
+    by_source = validation.failing_sources(issues)
+    targets = [source for source in by_source if source in texts]
+    if not targets or 'Source' not in df.columns:
+        return df, []
+
+    client = gemini_client.get_client(api_key)
+    failed = []
+
+    def run(source):
+        prompt = build_correction_prompt(texts[source], [validation.describe(i) for i in by_source[source]])
+        key = result_cache.sha256_bytes(f"{PROMPT_VERSION}|{MODEL_NAME}|{prompt}")
+        cached = result_cache.get("correction", key) if use_cache else None
+        if cached is not None:
+            return cached
+        with tracing.span("reextract", source=source, problems=len(by_source[source])) as span:
+            try:
+                table, complete = _extract_table(client, prompt, span=span)
+            except Exception:
+                failed.append(source)
+                return None
+        if use_cache and complete and table['rows']:
+            result_cache.put("correction", key, table)
+        return table
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as pool:
+        results = [f.result() for f in [tracing.submit(pool, run, source) for source in targets]]
+
+    def issue_count(frame, source):
+        return sum(1 for issue in validation.validate(frame) if source in issue['sources'])
+
+    replaced = []
+    for source, table in zip(targets, results):
+        if not table or not table['rows']:
+            continue
+        file = df.loc[df['Source'] == source, 'File'].iloc[0] if 'File' in df.columns else None
+        frame = schema.from_table(table['periods'], table['rows']).assign(Source=source, File=file)
+        frame = taxonomy.map_accounts(frame, client, _generate)
+        candidate = _rebuild(df, {source: frame})
+        if issue_count(candidate, source) < len(by_source[source]):
+            df = candidate
+            replaced.append(source)
+            # 모델 청크였으면 다음 실행에서도 교정된 행을 쓰도록 청크 캐시를 갱신
+            if use_cache and source in df.attrs.get('model_sources', []):
+                result_cache.put("chunk", result_cache.sha256_bytes(f"{PROMPT_VERSION}|{MODEL_NAME}|{texts[source]}"), table)
 
-    cleaned_text = response.text.replace("```json", "").replace("```", "").strip()
-    if "[" in cleaned_text and "]" in cleaned_text:
-        s = cleaned_text.find("[")
-        e = cleaned_text.rfind("]") + 1
-        cleaned_text = cleaned_text[s:e]
-    
-    data_list = json.loads(cleaned_text)
-    df = pd.DataFrame(data_list)
-    
-    return df
\ No newline at end of file
+    df = schema.drop_empty_periods(df)
+    df.attrs['validation'] = validation.validate(df)
+    df.attrs['failed_corrections'] = failed
+    return df, replaced
@@ -0,0 +1,145 @@
+"""
+PDF 페이지 분류기 (감사보고서/사업보고서에서 재무제표 본문 페이지만 골라냄)
+
+150쪽짜리 감사보고서에서 실제 재무제표는 몇 쪽뿐이므로, 페이지 글자에서
+제목 키워드(재무상태표/손익계산서/제조원가명세서/현금흐름표...)와 숫자 열(금액이 붙은 줄 비율)을 보고
+재무제표 페이지(+선택한 주석 표 페이지)만 모델에 보냄
+
+    pages = select_pages(page_texts)                 # [(페이지 번호(1부터), 분류), ...]
+    format_pages([1, 2, 3, 7])                       # '1-3, 7'
+
+FSMERGER_PDF_PAGE_FILTER=0이면 모든 페이지를 그대로 보냄
+FSMERGER_PDF_NOTE_PAGES=1이면 NOTE_KEYWORDS가 제목에 있는 주석 표 페이지도 함께 보냄
+"""
+import os
+import re
+
+ENABLED = os.environ.get("FSMERGER_PDF_PAGE_FILTER", "1") not in ("0", "false", "False")
+INCLUDE_NOTES = os.environ.get("FSMERGER_PDF_NOTE_PAGES", "0") not in ("0", "false", "False")
+
+# 이 페이지 수 이하의 PDF는 거를 것이 별로 없으므로 그대로 보냄
+MIN_PAGES = 3
+
+# 제목 키워드 (공백 제거, 소문자 기준)
+STATEMENT_TITLES = {
+    'BS': ('재무상태표', '대차대조표', 'statementoffinancialposition', 'balancesheet'),
+    'IS': ('포괄손익계산서', '손익계산서', 'incomestatement', 'statementofcomprehensiveincome',
+           'statementofprofitorloss'),
+    'COGM': ('제조원가명세서', 'costofgoodsmanufactured'),
+    'CF': ('현금흐름표', 'statementofcashflows', 'cashflowstatement'),
+    'SCE': ('자본변동표', 'statementofchangesinequity'),
+    'RE': ('이익잉여금처분계산서', '결손금처리계산서'),
+}
+# 제목이 없는 이어지는 페이지도 알아볼 수 있도록 본문에 자주 나오는 합계 계정
+ACCOUNT_KEYWORDS = (
+    '자산총계', '부채총계', '자본총계', '유동자산', '비유동자산', '유동부채', '매출액', '매출원가', '매출총이익',
+    '영업이익', '당기순이익', '법인세비용', '당기총제조원가', '재료비', '노무비', '영업활동', '투자활동', '재무활동',
+    'totalassets', 'totalliabilities', 'totalequity', 'revenue', 'grossprofit', 'operatingincome',
+    'netincome', 'profitbeforetax', 'operatingactivities', 'investingactivities', 'financingactivities',
+)
+# 함께 보낼 주석 표 (INCLUDE_NOTES일 때만)
+NOTE_KEYWORDS = (
+    '유형자산', '무형자산', '차입금', '사채', '매출채권', '재고자산', '판매비와관리비', '비용의성격별분류',
+    '특수관계자', '영업부문', 'propertyplantandequipment', 'borrowings', 'segment',
+)
+# 주석 페이지 제목: 줄 맨 앞의 "주석" / "Notes" / "5. 유형자산" 같은 번호 제목
+# (재무제표 본문에도 "주석" 열 머리글과 "(주)회사명" 줄이 있으므로 줄 중간에 나오는 것은 보지 않고,
+#  "1. 유형자산 1,234"처럼 금액이 붙은 계정 줄도 제목으로 보지 않음)
+_NOTE_HEADING_RE = re.compile(r'^(?:주석|notes?\b|\d{1,2}\s*\.\s*\S)', re.I)
+
+# 제목을 찾는 범위 (페이지 앞쪽 몇 줄)
+HEAD_LINES = 8
+# 재무제표 페이지로 보는 최소 금액 줄 수 / 비율
+MIN_AMOUNT_LINES = 5
+MIN_AMOUNT_RATIO = 0.3
+# 제목 없이 이어지는 페이지는 금액 줄 비율이 이보다 높아야 함
+CONTINUATION_RATIO = 0.5
+
+# 금액: 1,234 / (1,234) / -1234 (4자리 이상, 연도는 제외)
+_AMOUNT_RE = re.compile(r'(?<![\w.])\(?-?(?:\d{1,3}(?:,\d{3})+|\d{4,})(?:\.\d+)?\)?(?![\w.])')
+_YEAR_RE = re.compile(r'^\(?(19|20)\d{2}\)?$')
+_SPACE_RE = re.compile(r'\s+')
+
+def _key(text):
+    return _SPACE_RE.sub('', text).lower()
+
+def _amount_line(line):
+    return any(not _YEAR_RE.match(m.group()) for m in _AMOUNT_RE.finditer(line))
+
+def page_features(text):
+    """
+    페이지 글자에서 분류용 특징 추출
+    반환값: {'titles': 제목에 나온 재무제표 키 목록, 'accounts': 합계 계정 수, 'notes': 주석 키워드 수,
+             'note_page': 주석 페이지 여부, 'lines': 줄 수, 'amount_lines': 금액 줄 수}
+    """
+    lines = [line for line in (text or '').splitlines() if line.strip()]
+    head = _key(" ".join(lines[:HEAD_LINES]))
+    body = _key(text or '')
+    return {
+        'titles': [kind for kind, titles in STATEMENT_TITLES.items() if any(t in head for t in titles)],
+        'accounts': sum(1 for keyword in ACCOUNT_KEYWORDS if keyword in body),
+        'notes': sum(1 for keyword in NOTE_KEYWORDS if keyword in head),
+        'note_page': any(_NOTE_HEADING_RE.match(line.strip()) and not _amount_line(line)
+                         for line in lines[:HEAD_LINES]),
+        'lines': len(lines),
+        'amount_lines': sum(1 for line in lines if _amount_line(line)),
+    }
+
+def classify_page(features, previous=None):
+    """
+    특징으로 페이지 분류: 'statement' / 'continuation' / 'note' / None(제외)
+    previous: 앞 페이지 분류 (제목 없이 이어지는 재무제표 페이지 판단용)
+    """
+    lines, amount_lines = features['lines'], features['amount_lines']
+    ratio = amount_lines / lines if lines else 0.0
+    if amount_lines < MIN_AMOUNT_LINES or ratio < MIN_AMOUNT_RATIO:
+        # 목차/감사의견처럼 제목은 있어도 숫자 열이 없는 페이지
+        return None
+    # 재무제표 제목이 있으면 주석 제목보다 우선
+    if features['titles']:
+        return 'statement'
+    if features['note_page']:
+        return 'note' if features['notes'] else None
+    if features['accounts'] >= 2:
+        return 'statement'
+    if previous in ('statement', 'continuation') and ratio >= CONTINUATION_RATIO:
+        return 'continuation'
+    if features['notes']:
+        return 'note'
+    return None
+
+def select_pages(page_texts, include_notes=None):
+    """
+    보낼 페이지 선택. 반환값: [(페이지 번호(1부터), 분류), ...]
+    재무제표 페이지를 하나도 찾지 못하면(스캔본, 형식이 다른 문서 등) 모든 페이지를 그대로 보냄
+    """
+    include_notes = INCLUDE_NOTES if include_notes is None else include_notes
+    every_page = [(i + 1, 'all') for i in range(len(page_texts))]
+    if not ENABLED or len(page_texts) <= MIN_PAGES:
+        return every_page
+
+    selected, previous = [], None
+    for i, text in enumerate(page_texts):
+        kind = classify_page(page_features(text), previous)
+        if kind in ('statement', 'continuation') or (kind == 'note' and include_notes):
+            selected.append((i + 1, kind))
+        previous = kind
+    if not any(kind == 'statement' for _, kind in selected):
+        return every_page
+    return selected
+
+def format_pages(numbers):
+    """
+    페이지 번호 목록을 '1-3, 7' 형태로 표기
+    """
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+def cache_tag():
+    # 추출 캐시 키에 붙여서 설정을 바꾸면 PDF를 다시 읽도록 함
+    return f"pages{int(ENABLED)}{int(INCLUDE_NOTES)}"
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# 캐시 위치 및 최대 용량 (환경변수로 변경 가능)
+CACHE_DIR = os.environ.get("FSMERGER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fsmerger"))
+MAX_CACHE_BYTES = int(os.environ.get("FSMERGER_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+_lock = threading.Lock()
+
+def _connect():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, "cache.sqlite3"), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " key TEXT PRIMARY KEY, kind TEXT, value BLOB, size INTEGER, last_access REAL)"
+    )
+    return conn
+
+def sha256_bytes(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def file_bytes(file):
+    """
+    업로드 파일(UploadedFile 또는 파일 객체)의 전체 내용, 읽기 위치는 그대로 둠
+    """
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    pos = file.tell()
+    file.seek(0)
+    data = file.read()
+    file.seek(pos)
+    return data
+
+def file_hash(file):
+    """
+    업로드 파일 내용(bytes)의 SHA-256
+    """
+    return sha256_bytes(file_bytes(file))
+
+def get(kind, key):
+    """
+    캐시 조회 (없으면 None). 조회 시 last_access 갱신 (LRU)
+    """
+    full_key = f"{kind}:{key}"
+    with _lock:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (full_key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), full_key))
+            conn.commit()
+        finally:
+            conn.close()
+    return json.loads(row[0])
+
+def put(kind, key, value):
+    """
+    캐시 저장 후 총 용량이 MAX_CACHE_BYTES를 넘으면 오래 안 쓴 항목부터 삭제
+    """
+    full_key = f"{kind}:{key}"
+    blob = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+    with _lock:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, kind, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (full_key, kind, blob, len(blob), time.time())
+            )
+            _evict(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    # 한 번에 90%까지 줄여서 매 저장마다 삭제가 반복되지 않게 함
+    target = MAX_CACHE_BYTES * 0.9
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+        if total <= target:
+            break
+        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        total -= size
+
+def clear(kind=None):
+    """
+    캐시 무효화 (kind를 주면 해당 종류만 삭제)
+    """
+    with _lock:
+        conn = _connect()
+        try:
+            if kind is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE kind = ?", (kind,))
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+def stats():
+    """
+    종류별 항목 수와 용량
+    """
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute("SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY kind").fetchall()
+        finally:
+            conn.close()
+    return {kind: {"count": count, "bytes": size} for kind, count, size in rows}
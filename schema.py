@@ -0,0 +1,200 @@
+import re
+import math
+
+import numpy as np
+import pandas as pd
+
+import table_parser
+
+# 결과 DataFrame 구조: 메타 컬럼 5개 + 기간 컬럼(float64)
+# Source/File: 행을 만든 섹션·청크 이름과 파일명 (부분 재추출/파일 단위 갱신에 사용, 화면/엑셀에는 표시 안 함)
+META_COLS = ['Statement', 'Level', 'Account_Name', 'Source', 'File']
+STATEMENTS = ['BS', 'IS', 'COGM', 'CF', 'SCE', 'RE', 'Other']
+DEFAULT_LEVEL = 3
+
+# 재무제표 코드 -> 시트/탭 이름, 표시 단위 -> 나눌 값
+STATEMENT_NAMES = {
+    'BS': '재무상태표', 'IS': '손익계산서', 'COGM': '제조원가명세서',
+    'CF': '현금흐름표', 'SCE': '자본변동표', 'RE': '이익잉여금', 'Other': '기타'
+}
+UNIT_DIVISORS = {"원": 1, "천원": 1000, "백만원": 1000000, "억원": 100000000}
+
+STATEMENT_DTYPE = pd.CategoricalDtype(STATEMENTS)
+_STATEMENT_CODES = {code.upper(): code for code in STATEMENTS}
+LEVEL_DTYPE = np.int8
+
+def normalize_column(name):
+    """
+    컬럼명 정규화: 공백 정리 후 기간 머리글이면 table_parser와 같은 형식("2023", "2025.3Q(Cum)")으로 통일
+    """
+    text = ' '.join(str(name).split())
+    if text in META_COLS:
+        return text
+    return table_parser.normalize_period(text) or text
+
+def period_columns(df):
+    return [c for c in df.columns if c not in META_COLS]
+
+def to_amount(value):
+    """
+    금액 값 하나를 float로 변환 (숫자가 아니면 NaN)
+    """
+    if value is None or isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        amount = table_parser.parse_amount(value)
+    except ValueError:
+        return math.nan
+    return math.nan if amount is None else amount
+
+def to_amounts(values):
+    """
+    금액 값 목록을 float64 배열로 변환 (숫자/숫자 문자열은 한 번에, 실패하면 값마다 to_amount)
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([to_amount(v) for v in values], dtype=np.float64)
+
+def from_records(rows):
+    """
+    모델이 돌려준 행(dict 리스트)을 DataFrame으로 변환
+    기간 값은 컬럼별로 모아 바로 float64 배열로 만듦 (object 컬럼을 거치지 않음). 메타 컬럼은 분류 전이라 그대로 둠
+    """
+    n = len(rows)
+    meta = {c: [None] * n for c in META_COLS}
+    periods = {}
+    names = {}
+    for i, row in enumerate(rows):
+        for key, value in row.items():
+            col = names.get(key)
+            if col is None:
+                col = names[key] = normalize_column(key)
+            if col in meta:
+                meta[col][i] = value
+                continue
+            values = periods.get(col)
+            if values is None:
+                values = periods[col] = [None] * n
+            values[i] = value
+    return pd.DataFrame({**meta, **{col: to_amounts(values) for col, values in periods.items()}})
+
+def from_table(periods, rows):
+    """
+    표 형식 출력(table_output)의 행 [Statement, Level, 계정명, [기간별 값]]을 바로 정형 DataFrame으로 변환
+    기간 값은 행렬 하나로 만들고 (값 없음은 NaN), 정규화하면 같은 기간이 되는 머리글은 비어 있는 칸만 채움
+    """
+    order = {}
+    targets = [order.setdefault(normalize_column(p), len(order)) for p in periods]
+    values = np.array([row[3] for row in rows], dtype=np.float64).reshape(len(rows), len(periods))
+    block = np.full((len(rows), len(order)), np.nan)
+    for j, target in enumerate(targets):
+        column = block[:, target]
+        np.copyto(column, values[:, j], where=np.isnan(column))
+    df = pd.DataFrame(block, columns=list(order))
+    df.insert(0, 'File', [None] * len(rows))
+    df.insert(0, 'Source', [None] * len(rows))
+    df.insert(0, 'Account_Name', _names([row[2] for row in rows]))
+    df.insert(0, 'Level', np.array([row[1] for row in rows], dtype=LEVEL_DTYPE))
+    df.insert(0, 'Statement', _statements([row[0] for row in rows]))
+    return df
+
+def _statements(values):
+    codes = []
+    for value in values:
+        code = value.strip().upper() if isinstance(value, str) else ''
+        codes.append(_STATEMENT_CODES.get(code, 'Other'))
+    return pd.Categorical(codes, dtype=STATEMENT_DTYPE)
+
+def _levels(values):
+    levels = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    return levels.fillna(DEFAULT_LEVEL).clip(1, DEFAULT_LEVEL).to_numpy().astype(LEVEL_DTYPE)
+
+def _names(values):
+    return pd.Categorical(['' if v is None or v != v else str(v) for v in values])
+
+def concat_results(frames):
+    """
+    여러 결과 DataFrame을 하나의 정형 DataFrame으로 합침
+    - Statement: 범주형(STATEMENTS, 모르는 값은 Other), Level: int8, Account_Name/Source/File: 범주형
+    - 기간 컬럼: 정규화한 이름 기준으로 처음 나온 순서대로 모아 float64 블록 하나로 만듦 (값 없음은 0)
+    """
+    frames = [f for f in frames if len(f)]
+    total = sum(len(f) for f in frames)
+
+    order = {}
+    for frame in frames:
+        for col in period_columns(frame):
+            order.setdefault(normalize_column(col), len(order))
+
+    block = np.zeros((total, len(order)))
+    meta = {c: [] for c in META_COLS}
+    offset = 0
+    for frame in frames:
+        n = len(frame)
+        for col in META_COLS:
+            meta[col].extend(frame[col].tolist() if col in frame.columns else [None] * n)
+        for col in period_columns(frame):
+            values = frame[col]
+            if values.dtype == object or not pd.api.types.is_numeric_dtype(values):
+                values = to_amounts(values.tolist())
+            else:
+                values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            target = block[offset:offset + n, order[normalize_column(col)]]
+            # 같은 기간으로 정규화된 컬럼이 여러 개면 비어 있는 칸만 채움
+            np.copyto(target, values, where=~np.isnan(values) & (target == 0))
+        offset += n
+
+    df = pd.DataFrame(block, columns=list(order))
+    df.insert(0, 'File', _names(meta['File']))
+    df.insert(0, 'Source', _names(meta['Source']))
+    df.insert(0, 'Account_Name', _names(meta['Account_Name']))
+    df.insert(0, 'Level', _levels(meta['Level']))
+    df.insert(0, 'Statement', _statements(meta['Statement']))
+    return df
+
+def drop_empty_periods(df):
+    """
+    값이 모두 0인 기간 컬럼 제거
+    """
+    zero_cols = [c for c in period_columns(df) if df[c].abs().sum() == 0]
+    return df.drop(columns=zero_cols) if zero_cols else df
+
+def scale_rows(df, divisor=1):
+    """
+    금액이 모두 0인 행 제거 + 단위 변환 (기간 컬럼을 float64 블록 하나로 나눔)
+    """
+    meta_cols = [c for c in df.columns if c in META_COLS]
+    numeric_cols = period_columns(df)
+
+    block = df[numeric_cols].to_numpy(dtype=np.float64, na_value=0.0)
+    keep = np.abs(block).sum(axis=1) != 0
+    if divisor > 1:
+        block = block / divisor
+
+    scaled = pd.DataFrame(block[keep], columns=numeric_cols)
+    meta_df = df.loc[keep, meta_cols].reset_index(drop=True)
+    return pd.concat([meta_df, scaled], axis=1)[list(df.columns)]
+
+def sort_columns_chronologically(columns):
+    fixed_cols = ['Account_Name']
+    date_cols = [c for c in columns if c not in META_COLS]
+
+    def date_sort_key(col_name):
+        s_name = str(col_name)
+        year_match = re.search(r'(\d{4})', s_name)
+        year = int(year_match.group(1)) if year_match else 9999
+
+        sub_val = 0
+        if '1Q' in s_name: sub_val = 1
+        elif '2Q' in s_name: sub_val = 4
+        elif '3Q' in s_name: sub_val = 7
+        elif '4Q' in s_name: sub_val = 10
+
+        is_cum = 1 if '누적' in s_name or 'Cum' in s_name or 'Year' in s_name else 0
+        return (year, sub_val, is_cum, s_name)
+
+    sorted_date_cols = sorted(date_cols, key=date_sort_key)
+    return fixed_cols + sorted_date_cols
@@ -0,0 +1,167 @@
+"""
+모델 추출 결과의 표 형식 (스키마로 강제한 JSON 출력 + 엄격한 스트리밍 파서)
+
+기간 머리글은 한 번만 쓰고 행마다 값 배열만 받음 (행마다 "Statement"/"Level"/"Account_Name"/기간 키를 반복하지 않음)
+
+    {"periods": ["2023", "2024"],
+     "rows": [{"s": "BS", "l": 1, "n": "자산총계", "v": [1000, null]}, ...]}
+
+파싱한 행은 [Statement, Level, 계정명, [기간별 값]] 리스트로 보관 (청크 캐시에 그대로 저장)
+로컬에서 분류한 계정은 "s"를 생략하게 해서 모델은 나머지 계정의 Statement만 판단함
+"""
+import json
+
+from google.genai import types
+
+import schema
+
+STATEMENT_CODES = [code for code in schema.STATEMENTS if code != 'Other']
+LEVELS = (1, 2, 3)
+
+RESPONSE_SCHEMA = types.Schema(
+    type=types.Type.OBJECT,
+    properties={
+        'periods': types.Schema(type=types.Type.ARRAY, items=types.Schema(type=types.Type.STRING)),
+        'rows': types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    's': types.Schema(type=types.Type.STRING, enum=STATEMENT_CODES, nullable=True),
+                    'l': types.Schema(type=types.Type.INTEGER, minimum=1, maximum=3),
+                    'n': types.Schema(type=types.Type.STRING),
+                    'v': types.Schema(type=types.Type.ARRAY,
+                                      items=types.Schema(type=types.Type.NUMBER, nullable=True)),
+                },
+                # s는 로컬에서 분류하지 못한 계정에만 받음 (logic.build_prompt의 [Unmapped Accounts])
+                required=['l', 'n', 'v'],
+                property_ordering=['s', 'l', 'n', 'v'],
+            ),
+        ),
+    },
+    required=['periods', 'rows'],
+    # 스트리밍 중에 기간 머리글을 먼저 알아야 행을 바로 쓸 수 있음
+    property_ordering=['periods', 'rows'],
+)
+
+CONFIG = types.GenerateContentConfig(response_mime_type='application/json', response_schema=RESPONSE_SCHEMA)
+
+OUTPUT_FORMAT = """
+    [Output Format]
+    One JSON object. List every period column once in "periods", then one entry per account in "rows":
+    "s" = statement code (BS/IS/COGM/CF/SCE/RE, omit it when told below), "l" = Level (1-3), "n" = account name,
+    "v" = amounts in the same order as "periods" (null if blank).
+    {"periods": ["2023", "2024", "2025.3Q(Cum)"],
+     "rows": [{"s": "COGM", "l": 3, "n": "원재료비", "v": [5000, 6000, 4500]}, ...]}
+    """
+
+class MalformedOutputError(ValueError):
+    """스키마와 다른 모델 출력"""
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+def _skip(text, pos, chars=_WHITESPACE):
+    while pos < len(text) and text[pos] in chars:
+        pos += 1
+    return pos
+
+def _expect(text, pos, token):
+    # text[pos:]가 (공백 뒤) token으로 시작하면 그 뒤 위치, 아직 글자가 모자라면 None
+    pos = _skip(text, pos)
+    head = text[pos:pos + len(token)]
+    if head == token:
+        return pos + len(token)
+    if token.startswith(head):
+        return None
+    raise MalformedOutputError(f"expected {token!r} at {pos}: {text[pos:pos + 40]!r}")
+
+def validate_row(item, width):
+    """
+    행 하나 검사. 반환값: [Statement, Level, 계정명, 값 리스트] 또는 None(스키마와 다름)
+    Statement를 생략한 행은 None으로 둠 (logic에서 로컬 분류 결과로 채움)
+    """
+    if not isinstance(item, dict):
+        return None
+    statement, level, name, values = item.get('s'), item.get('l'), item.get('n'), item.get('v')
+    if (statement is not None and statement not in STATEMENT_CODES) or isinstance(level, bool) or level not in LEVELS:
+        return None
+    if not isinstance(name, str) or not name.strip() or not isinstance(values, list) or len(values) != width:
+        return None
+    for value in values:
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return None
+    return [statement, int(level), name, values]
+
+def iter_rows(pieces, state=None):
+    """
+    스트리밍 텍스트 조각에서 검사를 통과한 행을 완성되는 대로 반환
+    state: 'periods'(기간 머리글), 'complete'(객체가 끝까지 닫혔는지), 'invalid'(버린 행 수)
+    응답이 중간에 끊기면 그 전까지 완성된 행만 반환하고 complete는 False
+    구조가 다르면(코드펜스, 다른 키 등) MalformedOutputError
+    """
+    if state is None:
+        state = {}
+    state.update(periods=None, complete=False, invalid=0)
+    text, pos, stage = '', 0, 'open'
+    for piece in pieces:
+        # 처리한 앞부분은 버려서 버퍼가 한 행 크기 정도로만 유지되게 함
+        text, pos = text[pos:] + piece, 0
+        while True:
+            if stage == 'open':
+                end = _expect(text, pos, '{')
+                end = end and _expect(text, end, '"periods"')
+                end = end and _expect(text, end, ':')
+                if end is None:
+                    break
+                pos, stage = end, 'periods'
+            elif stage == 'periods':
+                pos = _skip(text, pos)
+                try:
+                    periods, end = _decoder.raw_decode(text, pos)
+                except json.JSONDecodeError:
+                    break
+                if not isinstance(periods, list) or not all(isinstance(p, str) for p in periods):
+                    raise MalformedOutputError("periods must be a list of strings")
+                state['periods'] = periods
+                end = _expect(text, end, ',')
+                end = end and _expect(text, end, '"rows"')
+                end = end and _expect(text, end, ':')
+                end = end and _expect(text, end, '[')
+                if end is None:
+                    # 머리글은 다시 읽어도 되므로 위치를 옮기지 않음
+                    break
+                pos, stage = end, 'rows'
+            elif stage == 'rows':
+                pos = _skip(text, pos, _WHITESPACE + ',')
+                if pos >= len(text):
+                    break
+                if text[pos] == ']':
+                    stage = 'close'
+                    pos += 1
+                    continue
+                try:
+                    item, end = _decoder.raw_decode(text, pos)
+                except json.JSONDecodeError:
+                    break
+                pos = end
+                row = validate_row(item, len(state['periods']))
+                if row is None:
+                    state['invalid'] += 1
+                    continue
+                yield row
+            else:
+                end = _expect(text, pos, '}')
+                if end is None:
+                    break
+                state['complete'] = True
+                return
+
+def to_records(periods, rows):
+    """
+    행 리스트를 기존 dict 형식으로 변환 (실시간 화면/작업 큐의 행 미리보기용)
+    """
+    return [
+        {'Statement': statement, 'Level': level, 'Account_Name': name, **dict(zip(periods, values))}
+        for statement, level, name, values in rows
+    ]
@@ -0,0 +1,311 @@
+import re
+import csv
+from collections import Counter
+
+import pandas as pd
+import taxonomy
+
+# 시트명/표 제목 키워드 -> Statement 코드 (앞쪽이 우선)
+STATEMENT_KEYWORDS = [
+    ('COGM', ['제조원가명세서', '제조원가', 'COGM']),
+    ('RE', ['이익잉여금처분', '결손금처리', '이익잉여금 처분']),
+    ('SCE', ['자본변동표', 'SCE']),
+    ('CF', ['현금흐름표', 'CF']),
+    ('IS', ['손익계산서', '포괄손익', 'IS', 'PL', 'P&L']),
+    ('BS', ['재무상태표', '대차대조표', 'BS']),
+]
+
+# 머리글 행을 찾을 범위, 로컬 파싱을 신뢰하기 위한 최소 조건
+HEADER_SEARCH_ROWS = 15
+MIN_DATA_ROWS = 3
+MIN_NUMERIC_RATIO = 0.95
+
+TOTAL_SUFFIXES = ('총계', '합계')
+
+_YEAR_RE = re.compile(r'((?:19|20)\d{2})')
+_PLAIN_NUMBER_RE = re.compile(r'^[\d,.\-()\s]+$')
+_YEAR_CELL_RE = re.compile(r'^(?:19|20)\d{2}(?:\.0)?$')
+_DATE_RE = re.compile(r'((?:19|20)\d{2})[.\-/년\s]+(\d{1,2})[.\-/월\s]')
+_QUARTER_RE = re.compile(r'([1-4])\s*(?:Q|분기)', re.IGNORECASE)
+_THREE_MONTH_RE = re.compile(r'3\s*M|3\s*개월', re.IGNORECASE)
+_CUM_RE = re.compile(r'Cum|누적|Year', re.IGNORECASE)
+
+_ROMAN_RE = re.compile(r'^\s*[IVXⅠ-Ⅻ]+\s*[.)]\s*')
+_ARABIC_RE = re.compile(r'^\s*\d+\s*[.)]\s*')
+_SUB_RE = re.compile(r'^\s*(?:\(\d+\)|\(?[가-하]\s*[.)]|[①-⑳])\s*')
+_INDENT_RE = re.compile(r'^[ 　\t]*')
+# CSV가 아닌 텍스트 줄(PDF)에서 계정명과 금액 사이 구분
+_AMOUNT_SPLIT_RE = re.compile(r'\s+(?=\(?-?[\d,]+(?:\.\d+)?\)?(?:\s|$))')
+
+def normalize_period(cell):
+    """
+    기간 머리글을 결과 컬럼명으로 변환 ("2023", "2025.3Q(3M)", "2025.3Q(Cum)")
+    기간으로 볼 수 없으면 None
+    """
+    if cell is None:
+        return None
+    text = str(cell).strip()
+    match = _YEAR_RE.search(text)
+    if not match:
+        return None
+    # 연도만 있는 칸 외의 순수 숫자(금액)는 제외
+    if _PLAIN_NUMBER_RE.match(text) and not _YEAR_CELL_RE.match(text) and not _DATE_RE.search(text + ' '):
+        return None
+    year = match.group(1)
+
+    quarter = _QUARTER_RE.search(text)
+    if quarter:
+        q = int(quarter.group(1))
+    elif '반기' in text:
+        q = 2
+    else:
+        date = _DATE_RE.search(text + ' ')
+        month = int(date.group(2)) if date else 12
+        q = {3: 1, 6: 2, 9: 3}.get(month)
+
+    if q is None:
+        return year
+    period = f"{year}.{q}Q"
+    if _THREE_MONTH_RE.search(text):
+        period += "(3M)"
+    elif _CUM_RE.search(text):
+        period += "(Cum)"
+    return period
+
+def parse_amount(cell):
+    """
+    금액 문자열을 float로 변환. 빈칸/대시는 None, 숫자가 아니면 ValueError
+    """
+    text = str(cell).strip().replace(',', '')
+    if text in ('', '-', '—', '–', 'nan', 'NaN', 'None'):
+        return None
+    negative = text.startswith('(') and text.endswith(')')
+    if negative:
+        text = text[1:-1]
+    value = float(text)
+    return -value if negative else value
+
+def detect_statement(texts):
+    """
+    시트명/표 제목 텍스트에서 Statement 코드 추정
+    """
+    for text in texts:
+        upper = str(text).upper()
+        for statement, keywords in STATEMENT_KEYWORDS:
+            for keyword in keywords:
+                # 영문 약어는 단어 단위로만 인정 (예: "CF", "BS_2024")
+                if keyword.isascii():
+                    if re.search(rf'(?<![A-Z]){re.escape(keyword)}(?![A-Z])', upper):
+                        return statement
+                elif keyword in str(text):
+                    return statement
+    return None
+
+def _split_label(line):
+    """
+    입력 한 줄을 (계정명, 금액 개수)로 나눔. CSV 행이면 칸 단위, 아니면(PDF 텍스트) 앞쪽 글자 / 뒤쪽 숫자
+    """
+    cells = next(csv.reader([line]), [])
+    if len(cells) < 2:
+        cells = _AMOUNT_SPLIT_RE.split(line.strip())
+    label, amounts = '', 0
+    for cell in cells:
+        cell = cell.strip()
+        if not cell:
+            continue
+        try:
+            if parse_amount(cell) is not None and not normalize_period(cell):
+                amounts += 1
+            continue
+        except ValueError:
+            pass
+        if not label:
+            label = cell
+    return label, amounts
+
+def classify_labels(text, index=None, min_confidence=None):
+    """
+    모델에 보낼 입력에서 계정명을 찾아 택사노미로 먼저 분류
+    반환값: ({정규화 계정명: Statement} - 로컬에서 확신한 것, [로컬로 분류하지 못한 계정명])
+    표 제목/시트명으로 재무제표 종류를 알면 그 종류를 우선함 (파일명은 보지 않음)
+    """
+    index = index or taxonomy.load_taxonomy()
+    min_confidence = taxonomy.MIN_CONFIDENCE if min_confidence is None else min_confidence
+    known, unmapped, hint = {}, {}, None
+    for line in text.splitlines():
+        if line.startswith('File:'):
+            hint = detect_statement([line.split('| Sheet:', 1)[1]]) if '| Sheet:' in line else None
+            continue
+        label, amounts = _split_label(line)
+        if not label:
+            continue
+        if not amounts:
+            # 금액이 없는 줄은 표 제목일 수 있음 ("손익계산서", "제조원가명세서" 등)
+            hint = detect_statement([label]) or hint
+            continue
+        key = taxonomy.normalize_name(label)
+        if not key or key in known or key in unmapped:
+            continue
+        result = taxonomy.classify_account(label, hint, index=index)
+        if result['confidence'] >= min_confidence:
+            known[key] = result['Statement']
+        else:
+            unmapped[key] = _clean_name(label)
+    return known, list(unmapped.values())
+
+def find_header(rows):
+    """
+    (머리글 행 번호, {컬럼 인덱스: 기간명}) - 기간 셀이 가장 많은 상단 행
+    """
+    best = (None, {})
+    for r, row in enumerate(rows[:HEADER_SEARCH_ROWS]):
+        periods = {c: normalize_period(cell) for c, cell in enumerate(row) if c > 0}
+        periods = {c: p for c, p in periods.items() if p}
+        if len(periods) > len(best[1]):
+            best = (r, periods)
+    header_row, periods = best
+    if header_row is None:
+        return None, {}
+
+    # 2단 머리글 (연도 행 + 3개월/누적 행) 결합
+    if header_row + 1 < len(rows):
+        sub = rows[header_row + 1]
+        if any(_THREE_MONTH_RE.search(str(cell)) or _CUM_RE.search(str(cell)) for cell in sub):
+            top, carried = rows[header_row], ''
+            combined = {}
+            for c in range(1, max(len(top), len(sub))):
+                if c < len(top) and str(top[c]).strip():
+                    carried = str(top[c]).strip()
+                sub_cell = str(sub[c]).strip() if c < len(sub) else ''
+                period = normalize_period(f"{carried} {sub_cell}") if carried else None
+                if period:
+                    combined[c] = period
+            if combined:
+                return header_row + 1, combined
+    return header_row, periods
+
+def _numbering_level(label):
+    if _ROMAN_RE.match(label):
+        return 1
+    if _ARABIC_RE.match(label):
+        return 2
+    if _SUB_RE.match(label):
+        return 3
+    return None
+
+def _clean_name(label):
+    name = label.strip()
+    for pattern in (_ROMAN_RE, _ARABIC_RE, _SUB_RE):
+        name = pattern.sub('', name, count=1)
+    return name.strip()
+
+def parse_section(header, body):
+    """
+    잘 정형된 재무제표 시트(계정명 컬럼 + 기간 컬럼)를 규칙 기반으로 파싱
+    확신할 수 없으면 None 반환 -> 모델 추출로 넘김
+    """
+    sheet_name = header.split('| Sheet:', 1)[1].strip() if '| Sheet:' in header else ''
+    rows = [row for row in csv.reader(body.splitlines()) if any(str(cell).strip() for cell in row)]
+    if len(rows) < MIN_DATA_ROWS + 1:
+        return None
+
+    header_row, periods = find_header(rows)
+    if not periods or len(set(periods.values())) != len(periods):
+        return None
+
+    label_col = _label_column(rows[header_row + 1:], min(periods))
+    # 제목은 시트명과 표 안의 머리글 위 행에서만 찾음 (파일명 "손익계산서_참고.xlsx"가 모든 시트에 적용되지 않도록)
+    title_texts = [sheet_name] + [" ".join(row) for row in rows[:header_row]]
+    statement = detect_statement(title_texts)
+
+    labels, values = [], []
+    numeric, non_numeric = 0, 0
+    for row in rows[header_row + 1:]:
+        label = row[label_col] if label_col < len(row) else ''
+        if not label.strip():
+            continue
+        record = {}
+        for c, period in periods.items():
+            cell = row[c] if c < len(row) else ''
+            try:
+                amount = parse_amount(cell)
+            except ValueError:
+                non_numeric += 1
+                continue
+            if amount is not None:
+                numeric += 1
+            record[period] = amount
+        labels.append(label)
+        values.append(record)
+
+    if len(labels) < MIN_DATA_ROWS or numeric == 0:
+        return None
+    if numeric / (numeric + non_numeric) < MIN_NUMERIC_RATIO:
+        return None
+
+    names = [_clean_name(label) for label in labels]
+
+    # 표 제목으로 재무제표 종류를 못 찾으면 택사노미 다수결
+    if statement is None:
+        index = taxonomy.load_taxonomy()
+        votes = Counter()
+        for name in names:
+            result = taxonomy.classify_account(name, index=index)
+            if result['confidence'] >= taxonomy.MIN_CONFIDENCE:
+                votes[result['Statement']] += 1
+        if not votes:
+            return None
+        statement, count = votes.most_common(1)[0]
+        if count / len(names) < 0.6:
+            return None
+
+    levels = _derive_levels(labels)
+    if levels is None:
+        index = taxonomy.load_taxonomy()
+        levels = [taxonomy.classify_account(name, statement, index=index)['Level'] or 3 for name in names]
+    # 금액이 하나도 없는 행은 구분 제목 (예: "자산")
+    levels = [1 if all(v is None for v in record.values()) else level for level, record in zip(levels, values)]
+
+    period_names = list(periods.values())
+    df = pd.DataFrame(values, columns=period_names)
+    df.insert(0, 'Account_Name', names)
+    df.insert(0, 'Level', levels)
+    df.insert(0, 'Statement', statement)
+    return df
+
+def _label_column(rows, first_period):
+    """
+    계정명 컬럼: 기간 컬럼 앞에서 데이터 행의 절반 이상이 글자인 첫 컬럼 (앞쪽 구분/번호 컬럼은 건너뜀)
+    """
+    for c in range(first_period):
+        text = 0
+        for row in rows:
+            cell = row[c].strip() if c < len(row) else ''
+            if not cell:
+                continue
+            try:
+                parse_amount(cell)
+            except ValueError:
+                text += 1
+        if text * 2 >= len(rows):
+            return c
+    return 0
+
+def _derive_levels(labels):
+    """
+    번호 체계(Ⅰ./1./(1)) 또는 들여쓰기로 Level 결정. 단서가 없으면 None
+    """
+    numbered = [_numbering_level(label) for label in labels]
+    indents = [len(_INDENT_RE.match(label).group(0)) for label in labels]
+    distinct = sorted(set(indents))
+    indent_rank = {width: min(i + 1, 3) for i, width in enumerate(distinct)}
+
+    if sum(1 for n in numbered if n) >= max(1, len(labels) // 5):
+        # 번호 없는 합계/총계 행은 대분류로 취급
+        return [
+            n if n else (1 if label.strip().endswith(TOTAL_SUFFIXES) else indent_rank[w] if len(distinct) > 1 else 3)
+            for n, w, label in zip(numbered, indents, labels)
+        ]
+    if len(distinct) > 1:
+        return [indent_rank[w] for w in indents]
+    return None
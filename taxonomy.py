@@ -0,0 +1,302 @@
+import os
+import re
+import json
+import functools
+from collections import Counter, defaultdict
+
+import openpyxl
+from google.genai import types
+
+import result_cache
+
+TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "2018taxonomy.xlsx")
+TAXONOMY_VERSION = "1"
+
+# 이 점수 이상이면 모델에 묻지 않고 로컬 분류 결과를 그대로 사용
+MIN_CONFIDENCE = 0.85
+
+# 문서에서 읽은 값으로 인정하는 Statement 코드 / Level
+STATEMENT_CODES = ('BS', 'IS', 'COGM', 'CF', 'SCE', 'RE')
+LEVELS = (1, 2, 3)
+
+# 모델 분류 응답 스키마: [{"n": 계정명, "s": Statement, "l": Level}, ...]
+CLASSIFY_CONFIG = types.GenerateContentConfig(
+    response_mime_type='application/json',
+    response_schema=types.Schema(
+        type=types.Type.ARRAY,
+        items=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                'n': types.Schema(type=types.Type.STRING),
+                's': types.Schema(type=types.Type.STRING, enum=list(STATEMENT_CODES)),
+                'l': types.Schema(type=types.Type.INTEGER, minimum=1, maximum=3),
+            },
+            required=['n', 's', 'l'],
+            property_ordering=['n', 's', 'l'],
+        ),
+    ),
+)
+
+# 택사노미 시트명 접두어 -> Statement 코드
+SHEET_STATEMENTS = [('DCIS', 'IS'), ('CIS', 'IS'), ('SCE', 'SCE'), ('BS', 'BS'), ('IS', 'IS'), ('CF', 'CF')]
+
+# 택사노미에 없는 제조원가명세서/이익잉여금처분계산서 기본 계정 (계정명, Level)
+EXTRA_ACCOUNTS = {
+    'COGM': [
+        ('재료비', 1), ('원재료비', 2), ('기초원재료재고액', 3), ('당기원재료매입액', 3), ('기말원재료재고액', 3),
+        ('노무비', 1), ('급여', 3), ('상여금', 3), ('잡급', 3), ('퇴직급여', 3),
+        ('경비', 1), ('전력비', 3), ('가스수도료', 3), ('수선비', 3), ('소모품비', 3), ('외주가공비', 3),
+        ('당기총제조비용', 1), ('기초재공품재고액', 2), ('기말재공품재고액', 2), ('합계', 2),
+        ('타계정으로대체액', 2), ('당기제품제조원가', 1),
+    ],
+    'RE': [
+        ('미처분이익잉여금', 1), ('전기이월미처분이익잉여금', 2),
+        ('이익잉여금처분액', 1), ('이익준비금', 2), ('배당금', 2), ('현금배당', 3), ('주식배당', 3),
+        ('차기이월미처분이익잉여금', 1),
+    ],
+}
+
+# 제외할 택사노미 데이터 타입 (표 구조용 요소)
+SKIP_TYPES = {'table', 'axis', 'member', 'line items', 'text block', 'text'}
+
+_TAG_RE = re.compile(r'\[[^\]]*\]')
+_NUMBERING_RE = re.compile(r'^\s*(?:[IVXⅠ-Ⅻⅰ-ⅹ]+\s*[.)]|\(?\d+\s*[.)]|\(?[가-하]\s*[.)]|[①-⑳])\s*')
+_PAREN_RE = re.compile(r'\(([^)]*)\)')
+_SPACE_RE = re.compile(r'[\s·ㆍ.,:\'"]+')
+
+# 괄호 안 내용이 이 단어들뿐이면 별칭으로 쓰지 않음 ("영업이익(손실)" 등)
+_PAREN_NOISE = {'손실', '이익', '손익', '수익', '비용', '순', '세후', '세전', '주', '주석'}
+
+def normalize_name(name):
+    """
+    계정명 정규화: 태그/번호/공백/구두점 제거
+    """
+    text = _TAG_RE.sub('', str(name))
+    text = _NUMBERING_RE.sub('', text)
+    return _SPACE_RE.sub('', text).strip()
+
+def _name_keys(name):
+    """
+    (정규화 이름, 괄호 제거 이름, 괄호 안 별칭 목록)
+    """
+    norm = normalize_name(name)
+    base = _PAREN_RE.sub('', norm)
+    aliases = [a for a in _PAREN_RE.findall(norm) if len(a) >= 2 and a not in _PAREN_NOISE]
+    return norm, base, aliases
+
+def _bigrams(text):
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def _statement_for_sheet(sheet_name):
+    for prefix, statement in SHEET_STATEMENTS:
+        if sheet_name.startswith(prefix):
+            return statement
+    return None
+
+def _read_entries(path):
+    """
+    택사노미 엑셀에서 (계정명, Statement, Level) 목록 추출
+    들여쓰기 깊이를 시트별로 순위화해서 Level 1/2/3으로 변환
+    """
+    wb = openpyxl.load_workbook(path, read_only=True)
+    entries = []
+    try:
+        for ws in wb.worksheets:
+            statement = _statement_for_sheet(ws.title)
+            if statement is None:
+                continue
+            rows = []
+            for row in ws.iter_rows(min_row=3):
+                if len(row) < 3 or not row[1].value:
+                    continue
+                data_type = str(row[2].value or '').strip().lower()
+                if data_type in SKIP_TYPES:
+                    continue
+                indent = row[1].alignment.indent if row[1].alignment is not None else 0
+                rows.append((str(row[1].value).strip(), indent or 0))
+
+            depths = sorted({indent for _, indent in rows if indent > 0})
+            rank = {indent: i + 1 for i, indent in enumerate(depths)}
+            for name, indent in rows:
+                if indent <= 0:
+                    continue  # 표 제목
+                entries.append((name, statement, min(rank[indent], 3)))
+    finally:
+        wb.close()
+
+    for statement, accounts in EXTRA_ACCOUNTS.items():
+        for name, level in accounts:
+            entries.append((name, statement, level))
+    return entries
+
+@functools.lru_cache(maxsize=2)
+def load_taxonomy(path=TAXONOMY_PATH):
+    """
+    택사노미를 한 번만 파싱해서 인덱스로 보관
+    (파싱 결과는 파일 해시 기준으로 디스크 캐시에도 저장)
+    """
+    with open(path, "rb") as f:
+        key = f"{result_cache.sha256_bytes(f.read())}:{TAXONOMY_VERSION}"
+    entries = result_cache.get("taxonomy", key)
+    if entries is None:
+        entries = _read_entries(path)
+        result_cache.put("taxonomy", key, entries)
+
+    exact = defaultdict(list)    # 원문 이름
+    by_norm = defaultdict(list)  # 정규화 이름
+    by_base = defaultdict(list)  # 괄호 제거 이름 / 괄호 안 별칭
+    grams = defaultdict(set)     # 바이그램 -> 정규화 이름
+    for idx, (name, _, _) in enumerate(entries):
+        exact[name].append(idx)
+        norm, base, aliases = _name_keys(name)
+        by_norm[norm].append(idx)
+        for key_name in {base, *aliases} - {norm}:
+            by_base[key_name].append(idx)
+        for gram in _bigrams(norm):
+            grams[gram].add(norm)
+
+    return {
+        'entries': entries,
+        'exact': dict(exact),
+        'norm': dict(by_norm),
+        'base': dict(by_base),
+        'grams': dict(grams),
+    }
+
+def _candidates(index, name):
+    """
+    (점수, 엔트리 인덱스 목록) - 정확 > 정규화 > 별칭 > 유사도 순으로 첫 매치 사용
+    """
+    name = str(name).strip()
+    if name in index['exact']:
+        return 1.0, index['exact'][name]
+
+    norm, base, _ = _name_keys(name)
+    if not norm:
+        return 0.0, []
+    if norm in index['norm']:
+        return 0.97, index['norm'][norm]
+    for key_name in (base, norm):
+        if key_name in index['norm']:
+            return 0.93, index['norm'][key_name]
+        if key_name in index['base']:
+            return 0.9, index['base'][key_name]
+
+    # 바이그램 Dice 유사도
+    query = _bigrams(norm)
+    counts = Counter()
+    for gram in query:
+        for candidate in index['grams'].get(gram, ()):
+            counts[candidate] += 1
+    best_score, best = 0.0, None
+    for candidate, shared in counts.items():
+        score = 2 * shared / (len(query) + len(_bigrams(candidate)))
+        if score > best_score or (score == best_score and best is not None and len(candidate) < len(best)):
+            best_score, best = score, candidate
+    if best is None:
+        return 0.0, []
+    return best_score * 0.9, index['norm'][best]
+
+def classify_account(name, statement_hint=None, index=None):
+    """
+    계정명 하나를 로컬로 분류
+    반환값: {'Statement', 'Level', 'confidence'} (찾지 못하면 Statement/Level은 None)
+    """
+    index = index or load_taxonomy()
+    score, idxs = _candidates(index, name)
+    found = [index['entries'][i] for i in idxs]
+    if not found:
+        return {'Statement': statement_hint, 'Level': None, 'confidence': 0.0}
+
+    if statement_hint:
+        matched = [e for e in found if e[1] == statement_hint]
+        if matched:
+            found = matched
+        else:
+            # 다른 재무제표에만 있는 계정 -> 힌트를 따르되 신뢰도 낮춤
+            score *= 0.8
+        statement = statement_hint
+    else:
+        votes = Counter(e[1] for e in found)
+        statement, count = votes.most_common(1)[0]
+        score *= count / len(found)
+        found = [e for e in found if e[1] == statement]
+
+    levels = Counter(e[2] for e in found)
+    top = max(levels.values())
+    level = min(lv for lv, c in levels.items() if c == top)
+    return {'Statement': statement, 'Level': level, 'confidence': round(score, 3)}
+
+def _classify_with_model(client, names, generate):
+    """
+    로컬에서 분류하지 못한 계정명만 모델에 보내 Statement/Level 판단 (스키마로 강제한 JSON 응답)
+    """
+    prompt = f"""
+    You are a Korean financial accountant.
+    Classify each account name into a statement type (BS, IS, COGM, SCE, RE, CF)
+    and a Level (1: major section/total, 2: subtotal, 3: detail account).
+
+    [Account Names]
+    {json.dumps(names, ensure_ascii=False)}
+
+    [Output Format]
+    One entry per account: "n" = account name as given, "s" = statement type, "l" = Level.
+    [{{"n": "원재료비", "s": "COGM", "l": 3}}, ...]
+    """
+    rows = json.loads(generate(client, prompt, CLASSIFY_CONFIG))
+    return {
+        row['n']: {'Statement': row.get('s'), 'Level': row.get('l')}
+        for row in rows if isinstance(row, dict) and isinstance(row.get('n'), str)
+    }
+
+def map_accounts(df, client=None, generate=None, min_confidence=MIN_CONFIDENCE):
+    """
+    추출된 행 중 Statement/Level이 비었거나 잘못된 행만 택사노미로 채움
+    - 문서에서 읽은 Statement/Level은 그대로 둠 (합계/소계 구조, Level 1 서식, 검증의 부모 행 판단이 이 값을 따름)
+    - 로컬 신뢰도가 min_confidence 이상이면 택사노미 결과로 빈 값만 채움 (실행마다 동일한 결과)
+    - 그래도 못 채운 행만 모아서 모델에 한 번에 질의
+    generate(client, prompt, config) -> 응답 텍스트 를 넘겨야 모델 질의를 함
+    """
+    if df.empty or 'Account_Name' not in df.columns:
+        return df
+
+    df = df.copy()
+    if 'Statement' not in df.columns:
+        df['Statement'] = None
+    if 'Level' not in df.columns:
+        df['Level'] = None
+
+    index = None
+    unresolved = []
+    statements, levels = df['Statement'].tolist(), df['Level'].tolist()
+    for i, name in enumerate(df['Account_Name'].tolist()):
+        has_statement, has_level = statements[i] in STATEMENT_CODES, levels[i] in LEVELS
+        if has_statement and has_level:
+            continue
+        index = index or load_taxonomy()
+        result = classify_account(name, statements[i] if has_statement else None, index=index)
+        if result['confidence'] < min_confidence:
+            unresolved.append(i)
+            continue
+        if not has_statement:
+            statements[i] = result['Statement']
+        if not has_level:
+            levels[i] = result['Level']
+
+    if unresolved and client is not None and generate is not None:
+        names = sorted({str(df['Account_Name'].iat[i]) for i in unresolved})
+        answers = _classify_with_model(client, names, generate)
+        for i in unresolved:
+            answer = answers.get(str(df['Account_Name'].iat[i]))
+            if answer:
+                if statements[i] not in STATEMENT_CODES:
+                    statements[i] = answer.get('Statement')
+                if levels[i] not in LEVELS:
+                    levels[i] = answer.get('Level')
+
+    df['Statement'] = statements
+    df['Level'] = levels
+    df.attrs['unresolved_accounts'] = len(unresolved)
+    return df
@@ -0,0 +1,37 @@
+"""
+동작 확인용 테스트 공통 설정 (가짜 genai.Client와 임시 캐시 폴더 사용, 네트워크/API Key 불필요)
+
+    python -m pytest -q tests
+"""
+import io
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+# 실제 사용 중인 결과 캐시를 건드리지 않도록 모듈을 불러오기 전에 임시 폴더로 바꿈
+os.environ["FSMERGER_CACHE_DIR"] = tempfile.mkdtemp(prefix="fsmerger-test-")
+
+import pytest  # noqa: E402
+
+import gemini_client  # noqa: E402
+from fake_gemini import FakeClient  # noqa: E402
+
+class UploadedFile(io.BytesIO):
+    # Streamlit UploadedFile처럼 name/size가 있는 파일 객체
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+@pytest.fixture
+def fake_client():
+    gemini_client.set_client_factory(FakeClient.factory())
+    yield
+    gemini_client.set_client_factory(None)
+
+@pytest.fixture
+def upload():
+    return UploadedFile
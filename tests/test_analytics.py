@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+import analytics
+
+DF = pd.DataFrame({
+    'Statement': ['IS', 'IS', 'IS', 'IS'],
+    'Level': [1, 1, 1, 1],
+    'Account_Name': ['매출액', '매출원가', '매출총이익', '영업이익'],
+    '2023': [800.0, 500.0, 300.0, 100.0],
+    '2024': [1000.0, 600.0, 400.0, 150.0],
+})
+
+def test_single_account_is_answered_locally():
+    assert analytics.answer(DF, "2024년 매출원가는?") == "2024년 매출원가은(는) 600 원입니다."
+
+def test_growth_is_answered_locally():
+    reply = analytics.answer(DF, "2024년 매출액 증감률")
+    assert reply.startswith("2024년 매출액은(는) 1,000 원으로 2023년(800 원) 대비 25.00%")
+
+def test_metric_is_answered_locally():
+    assert analytics.answer(DF, "2024년 영업이익률") == "2024년 영업이익률은(는) 15.00%입니다."
+
+@pytest.mark.parametrize("question", [
+    "2024년 매출액과 영업이익은?",
+    "매출원가와 매출총이익 알려줘",
+    "2024년 매출총이익률과 영업이익률",
+])
+def test_several_accounts_go_to_model(question):
+    assert analytics.answer(DF, question) is None
+
+@pytest.mark.parametrize("question", [
+    "2024년 매출액과 영업이익을 비교해줘",
+    "매출액 추이",
+    "영업이익이 왜 늘었어?",
+    "매출원가 분석",
+])
+def test_comparison_and_analysis_go_to_model(question):
+    assert analytics.answer(DF, question) is None
+
+def test_find_account_ignores_names_inside_longer_names():
+    data = analytics.FinancialData(DF)
+    assert data.find_account("매출원가 얼마야") == 1
+    assert data.find_account("매출액과 영업이익") is None
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import chat_context
+import gemini_client
+
+def _frame(rows):
+    return pd.DataFrame({
+        'Statement': ['IS'] * rows,
+        'Level': [3] * rows,
+        'Account_Name': [f'판매비와관리비 세부계정 {i}' for i in range(rows)],
+        '2023': [float(i) for i in range(rows)],
+        '2024': [float(i * 2) for i in range(rows)],
+    })
+
+@pytest.fixture
+def calls(fake_client, monkeypatch):
+    sent = []
+    monkeypatch.setattr(gemini_client, 'generate', lambda client, prompt, fallback_model=None, config=None: (
+        sent.append((prompt, config)) or SimpleNamespace(text='답변')))
+    return sent
+
+def test_small_dataset_is_not_cached(calls):
+    client, state = gemini_client.get_client("small"), {}
+    chat_context.ask(client, _frame(5), "판매비와관리비 세부계정 3은?", "원", state, "a")
+    assert client.caches.created == []
+    prompt, config = calls[0]
+    assert config is None
+    assert '[관련 데이터]' in prompt and '[전체 데이터]' not in prompt
+
+def test_large_dataset_is_cached_with_rows(calls):
+    client, state = gemini_client.get_client("large"), {}
+    df = _frame(400)
+    chat_context.ask(client, df, "판매비와관리비 세부계정 3은?", "원", state, "a")
+    chat_context.ask(client, df, "세부계정 7은?", "원", state, "a")
+    assert len(client.caches.created) == 1
+    assert '판매비와관리비 세부계정 399' in client.caches.created[0].contents[0]
+    # 전체 행이 캐시에 있으므로 질문마다 행을 다시 보내지 않음
+    assert all(config.cached_content == state['cache'] and '[관련 데이터]' not in prompt
+               for prompt, config in calls)
+
+    # 데이터가 바뀌면 이전 캐시를 지움
+    old = state['cache']
+    chat_context.ask(client, _frame(5), "세부계정 1은?", "원", state, "b")
+    assert client.caches.deleted == [old]
+    assert state['cache'] is None
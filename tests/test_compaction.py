@@ -0,0 +1,51 @@
+import pytest
+
+import compaction
+
+@pytest.mark.parametrize("cell, expected", [
+    ("1,234,567", "1234567"),
+    ("(1,234)", "-1234"),
+    ("1000.0", "1000"),
+    ("12.50", "12.5"),
+    ("-", ""),
+    ("0", ""),
+    ("(1)", "(1)"),
+    ("현금", "현금"),
+])
+def test_compact_number(cell, expected):
+    assert compaction.compact_number(cell) == expected
+
+def test_estimate_tokens_counts_korean_per_character():
+    assert compaction.estimate_tokens("") == 0
+    assert compaction.estimate_tokens("abcd") == 1
+    assert compaction.estimate_tokens("매출액") == 3
+
+def test_compact_table_drops_repeated_headers_and_empty_columns():
+    body = "\n".join([
+        "계정,,당기,전기",
+        "  현금,,\"1,000\",\"2,000\"",
+        ",,,",
+        "계정,,당기,전기",
+        "매출채권,,(500),0",
+    ])
+    assert compaction.compact_table(body) == "계정,당기,전기\n  현금,1000,2000\n매출채권,-500\n"
+
+def test_compact_text_removes_blank_lines_and_separators():
+    assert compaction.compact_text("매출액    1,234,567\n\n\t영업이익  (12,000)") == "매출액 1234567\n영업이익 (12000)"
+
+def test_compact_sections_drops_duplicates_only_within_a_file():
+    sheet = "계정,2024\n현금,\"1,000\"\n"
+    files = [
+        [("File: a.xlsx | Sheet: BS", sheet), ("File: a.xlsx | Sheet: BS (2)", sheet)],
+        [("File: b.xlsx | Sheet: BS", sheet)],
+    ]
+    compacted, report = compaction.compact_sections(files, names=['a.xlsx', 'b.xlsx'])
+    assert [len(sections) for sections in compacted] == [1, 1]
+    assert [r['duplicates'] for r in report] == [1, 0]
+    assert report[0]['file'] == 'a.xlsx'
+    assert report[0]['tokens_after'] < report[0]['tokens_before']
+
+def test_compact_sections_uses_text_compaction_for_pdf():
+    files = [[("File: a.pdf (PDF)", "매출액   1,000\n\n")], [("File: b.xlsx | Sheet: 빈 시트", ",,\n")]]
+    compacted, _ = compaction.compact_sections(files)
+    assert compacted == [[("File: a.pdf (PDF)", "매출액 1000")], []]
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import consolidation
+import validation
+
+def _entity(receivables, payables):
+    # 합계 행이 하위 계정 뒤에 오는 재무상태표 (유동자산은 세부 뒤, 자산총계는 맨 끝)
+    cash, equity = 100.0, 100.0 + receivables - payables - 10.0
+    rows = [
+        ('현금및현금성자산', 3, cash), ('매출채권', 3, receivables), ('유동자산', 2, cash + receivables),
+        ('자산총계', 1, cash + receivables),
+        ('매입채무', 3, payables), ('기타부채', 3, 10.0), ('유동부채', 2, payables + 10.0),
+        ('부채총계', 1, payables + 10.0),
+        ('자본금', 3, equity - 10.0), ('이익잉여금', 3, 10.0), ('자본총계', 1, equity),
+    ]
+    return pd.DataFrame({
+        'Statement': ['BS'] * len(rows), 'Level': [level for _, level, _ in rows],
+        'Account_Name': [name for name, _, _ in rows], '2024': [value for _, _, value in rows],
+    })
+
+def test_elimination_reaches_totals_listed_after_details():
+    mapping = consolidation.parse_mapping(
+        ownership=[{'entity': 'A', 'ownership': 100}, {'entity': 'B', 'ownership': 100}],
+        eliminations=[
+            {'entity': 'A', 'counterparty': 'B', 'statement': 'BS', 'account': '매출채권', 'amount': 20},
+            {'entity': 'B', 'counterparty': 'A', 'statement': 'BS', 'account': '매입채무', 'amount': 20},
+        ],
+    )
+    result = consolidation.consolidate({'A': _entity(80.0, 50.0), 'B': _entity(40.0, 30.0)}, mapping)
+    values = dict(zip(result['consolidated']['Account_Name'].astype(str), result['consolidated']['2024']))
+    assert values['매출채권'] == 100.0
+    assert values['유동자산'] == 300.0
+    assert values['자산총계'] == 300.0
+    assert values['매입채무'] == 60.0
+    assert values['부채총계'] == 80.0
+    assert not [i for i in result['consolidated'].attrs['validation'] if i['check'] == 'balance']
+
+def test_parent_tree_handles_header_and_total_layouts():
+    statements = np.array(['BS'] * 7)
+    # 유동자산(머리글형) -> 세부 2개, 비유동자산 세부 뒤에 비유동자산(합계형), 맨 끝 자산총계
+    levels = np.array([2, 3, 3, 3, 3, 2, 1])
+    values = np.array([[30.0], [10.0], [20.0], [5.0], [7.0], [12.0], [42.0]])
+    parents = validation.parent_tree(statements, levels, values)
+    assert parents.tolist() == [6, 0, 0, 5, 5, 6, -1]
+
+def test_totals_after_details_validate_clean():
+    df = _entity(80.0, 50.0).assign(Source='BS', File='a.xlsx')
+    assert validation.validate(df) == []
+
+def test_wrong_total_after_details_is_reported():
+    df = _entity(80.0, 50.0).assign(Source='BS', File='a.xlsx')
+    df.loc[df['Account_Name'] == '자산총계', '2024'] = 999.0
+    issues = validation.validate(df)
+    assert any(i['account'] == '자산총계' for i in issues)
+
+def test_run_without_parquet_results_says_why(tmp_path):
+    checkpoint = {'A': {'status': 'done', 'outputs': [str(tmp_path / 'A.xlsx')]}}
+    (tmp_path / 'checkpoint.json').write_text(json.dumps(checkpoint), encoding='utf-8')
+    with pytest.raises(ValueError, match='pyarrow'):
+        consolidation.run(str(tmp_path))
@@ -0,0 +1,56 @@
+import pytest
+
+import incremental
+import synthetic
+
+def _reports(upload):
+    # 2024년 보고서(2022~2024)와 2025년 보고서(2023~2025): 2023/2024는 값이 같은 비교 기간
+    return (upload("2024.xlsx", synthetic.make_xlsx(sheets=2, rows=12, period_count=3, seed=7, shift=1)),
+            upload("2025.xlsx", synthetic.make_xlsx(sheets=2, rows=12, period_count=3, seed=7)))
+
+@pytest.mark.parametrize("rule_based", [False, True])
+def test_removing_earlier_report_keeps_comparative_periods(fake_client, upload, rule_based):
+    old, new = _reports(upload)
+    options = dict(rule_based=rule_based, use_cache=False)
+    merged, results, _ = incremental.analyze("test", [old, new], **options)
+    assert {'2022', '2023', '2024', '2025'} <= set(merged.columns)
+
+    # 2024.xlsx를 빼고 다시 합쳐도 2025.xlsx의 비교 기간(2023/2024)이 남아 있어야 함
+    again, _, run_df = incremental.analyze("test", [new], file_results=results, **options)
+    assert run_df is None
+    assert {'2023', '2024', '2025'} <= set(again.columns)
+    alone, _, _ = incremental.analyze("test", [new], **options)
+    periods = ['2023', '2024', '2025']
+    assert again[periods].abs().sum().tolist() == pytest.approx(alone[periods].abs().sum().tolist())
+
+def test_dedup_skips_rule_based_sections(fake_client, upload):
+    old, new = _reports(upload)
+    merged, _, run_df = incremental.analyze("test", [old, new], rule_based=True, use_cache=False)
+    assert run_df.attrs['parsed_sections'] > 0
+    assert run_df.attrs['dedup_report'] == []
+
+def test_dropped_section_is_restored_for_its_file(fake_client, upload):
+    # 앞선 파일에 통째로 들어 있는 시트(섹션 제거)도 그 파일의 결과에는 남아 있어야 함
+    full = upload("3년.xlsx", synthetic.make_xlsx(sheets=2, rows=12, period_count=3, seed=3))
+    part = upload("2년.xlsx", synthetic.make_xlsx(sheets=2, rows=12, period_count=2, seed=3))
+    _, results, run_df = incremental.analyze("test", [full, part], rule_based=False, use_cache=False)
+    assert {r['action'] for r in run_df.attrs['dedup_report']} == {'section'}
+
+    again, _, _ = incremental.analyze("test", [part], file_results=results, rule_based=False, use_cache=False)
+    alone, _, _ = incremental.analyze("test", [part], rule_based=False, use_cache=False)
+    assert len(again) == len(alone)
+    assert again[['2024', '2025']].to_numpy().tolist() == alone[['2024', '2025']].to_numpy().tolist()
+    assert set(again['Source'].astype(str)) <= set(again.attrs['sources'])
+
+@pytest.mark.parametrize("deduplicate", [False, True])
+def test_duplicate_sheet_is_kept_for_each_file(fake_client, upload, deduplicate):
+    # 같은 시트가 든 두 파일: 앞 파일을 빼도 뒤 파일의 결과에 값이 남아 있어야 함
+    data = synthetic.make_xlsx(sheets=2, rows=12, seed=5)
+    first, second = upload("원본.xlsx", data), upload("사본.xlsx", data)
+    options = dict(rule_based=False, use_cache=False, deduplicate=deduplicate)
+    _, results, _ = incremental.analyze("test", [first, second], **options)
+    again, _, _ = incremental.analyze("test", [second], file_results=results, **options)
+    alone, _, _ = incremental.analyze("test", [second], **options)
+    assert len(again) == len(alone) > 0
+    periods = ['2023', '2024', '2025']
+    assert again[periods].to_numpy().tolist() == alone[periods].to_numpy().tolist()
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+import pytest
+
+import gemini_client
+
+class BrokenStream:
+    # 두 번째 조각에서 연결이 끊기는 스트림
+    def __init__(self):
+        self.models = self
+
+    def generate_content_stream(self, model, contents, config=None):
+        yield SimpleNamespace(text='{"periods": [', usage_metadata=None)
+        raise ConnectionError("stream reset")
+
+def test_stream_failing_midway_is_recorded_as_error():
+    with pytest.raises(ConnectionError):
+        list(gemini_client.generate_stream(BrokenStream(), "prompt", fallback_model=None))
+    assert gemini_client.CALL_LOG[-1]['error'] == "stream reset"
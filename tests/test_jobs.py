@@ -0,0 +1,106 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import jobs
+import synthetic
+
+def _run_next():
+    job = jobs._claim("test")
+    jobs.run_job(job)
+    return job['id']
+
+# 엑셀 파일에는 저장 시각이 들어가므로 한 번만 만들어 같은 내용으로 다시 올림
+_DATA = {}
+
+def _files(upload):
+    if not _DATA:
+        _DATA.update({"a.xlsx": synthetic.make_xlsx(sheets=2, rows=12, seed=1),
+                      "b.xlsx": synthetic.make_xlsx(sheets=2, rows=12, seed=2)})
+    return [upload(name, data) for name, data in _DATA.items()]
+
+def test_corrected_results_carry_over_to_next_job(fake_client, upload):
+    user = jobs.user_id("test")
+    first = jobs.submit(user, "test", _files(upload), use_cache=False)
+    assert _run_next() == first
+    assert jobs.status(first)['status'] == 'done'
+    result = jobs.load_result(first)
+
+    # 화면에서 교정한 것처럼 우선순위가 높은 파일(나중에 올린 파일)의 값을 바꿔 저장
+    key = result['raw_data'].attrs['file_keys'][-1]
+    corrected = result['file_results'][key].copy()
+    corrected.attrs = dict(result['file_results'][key].attrs)
+    corrected.loc[0, '2025'] = 123.0
+    file_results = dict(result['file_results'], **{key: corrected})
+    assert jobs.update_result(first, file_results=file_results)
+
+    second = jobs.submit(user, "test", _files(upload), previous_job=first, use_cache=False)
+    assert _run_next() == second
+    merged = jobs.load_result(second)['raw_data']
+    assert merged.attrs['reused_files'] == ['a.xlsx', 'b.xlsx']
+    assert merged.loc[0, '2025'] == 123.0
+
+def test_missing_result(fake_client, upload):
+    user = jobs.user_id("test")
+    job_id = jobs.submit(user, "test", _files(upload), use_cache=False)
+    assert _run_next() == job_id
+    os.remove(os.path.join(jobs._job_dir(job_id), "result.pkl"))
+    assert jobs.load_result(job_id) is None
+    assert not jobs.update_result(job_id, raw_data=None)
+
+    def page(job_id, user):
+        import streamlit as st
+        import ui_results
+        if 'started' not in st.session_state:
+            # 새로고침 후 주소의 job 값으로 다시 연결한 상태
+            st.session_state['started'] = True
+            st.query_params['job'] = job_id
+            st.session_state['job_id'] = job_id
+        if st.session_state.get('loaded_job') != job_id:
+            ui_results.render_job(job_id, user)
+        ui_results.render_run_summary()
+
+    app = AppTest.from_function(page, args=(job_id, user)).run()
+    assert not app.exception
+    assert 'job_id' not in app.session_state
+    assert 'job' not in app.query_params
+    assert app.session_state['loaded_job'] == job_id
+    assert any("결과 파일을 찾을 수 없습니다" in e.value for e in app.error)
+
+@pytest.mark.parametrize("owner", ["someone else"])
+def test_job_of_other_user_is_not_attached(fake_client, upload, owner):
+    job_id = jobs.submit(jobs.user_id(owner), owner, _files(upload), use_cache=False)
+    assert _run_next() == job_id
+
+    def page(job_id, user):
+        import ui_results
+        ui_results.render_job(job_id, user)
+
+    app = AppTest.from_function(page, args=(job_id, jobs.user_id("test"))).run()
+    assert not app.exception
+    assert 'raw_data' not in app.session_state
+    assert app.warning and "찾을 수 없습니다" in app.warning[0].value
+
+def test_submit_over_limit_leaves_nothing_behind(fake_client, upload, monkeypatch):
+    monkeypatch.setattr(jobs, 'MAX_PENDING_PER_USER', 1)
+    user = jobs.user_id("limit")
+    job_id = jobs.submit(user, "limit", _files(upload), use_cache=False)
+    before = set(os.listdir(jobs.JOBS_DIR))
+    with pytest.raises(jobs.JobLimitError):
+        jobs.submit(user, "limit", _files(upload), use_cache=False)
+    assert set(os.listdir(jobs.JOBS_DIR)) == before
+    assert _run_next() == job_id
+
+def test_api_key_is_not_stored_in_plain_text(fake_client, upload):
+    job_id = jobs.submit(jobs.user_id("secret-key"), "secret-key", _files(upload), use_cache=False)
+    with open(jobs.DB_PATH, "rb") as f:
+        assert b"secret-key" not in f.read()
+    conn = jobs._connect()
+    try:
+        stored = conn.execute("SELECT api_key FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+    finally:
+        conn.close()
+    assert stored != "secret-key"
+    assert _run_next() == job_id
+    assert jobs.status(job_id)['status'] == 'done'
@@ -0,0 +1,30 @@
+import page_classifier
+
+OPINION = "독립된 감사인의 감사보고서\n주식회사 테스트 주주 및 이사회 귀중\n감사의견\n" + "우리는 재무제표를 감사하였습니다.\n" * 10
+
+def _statement(title, accounts):
+    lines = [title, "제 55 기 2024년 12월 31일 현재", "(주)테스트", "(단위: 원)", "과목 주석 제 55 기 제 54 기"]
+    lines += [f"{name} {i + 5} {(i + 1) * 1234567:,} {(i + 2) * 1234567:,}" for i, name in enumerate(accounts)]
+    return "\n".join(lines)
+
+BS = _statement("재 무 상 태 표", ["유동자산", "현금및현금성자산", "매출채권", "비유동자산", "유형자산", "자산총계"])
+CF = _statement("현 금 흐 름 표", ["영업활동현금흐름", "당기순이익", "투자활동현금흐름", "재무활동현금흐름", "현금의증가"])
+NOTE = "\n".join(["5. 유형자산", "(1) 당기 중 유형자산의 변동 내역은 다음과 같습니다.", "구분 토지 건물 합계"]
+                 + [f"항목{i} {i * 1234567:,} {i * 2345678:,} {i * 3580245:,}" for i in range(1, 7)])
+
+def test_statement_page_with_company_line_and_note_column_is_kept():
+    assert page_classifier.classify_page(page_classifier.page_features(BS)) == 'statement'
+    assert page_classifier.select_pages([OPINION, BS, CF, OPINION, OPINION]) == [(2, 'statement'), (3, 'statement')]
+
+def test_numbered_note_heading_is_a_note_page():
+    assert page_classifier.page_features(NOTE)['note_page']
+    assert page_classifier.classify_page(page_classifier.page_features(NOTE)) == 'note'
+    pages = [OPINION, BS, CF, NOTE, OPINION]
+    assert page_classifier.select_pages(pages) == [(2, 'statement'), (3, 'statement')]
+    assert page_classifier.select_pages(pages, include_notes=True)[-1] == (4, 'note')
+
+def test_no_statement_pages_falls_back_to_every_page():
+    assert page_classifier.select_pages([OPINION] * 5) == [(i, 'all') for i in range(1, 6)]
+
+def test_format_pages():
+    assert page_classifier.format_pages([1, 2, 3, 7, 9, 10]) == "1-3, 7, 9-10"
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import gemini_client
+import schema
+import table_output
+import taxonomy
+
+ANSWER = json.dumps({'periods': ['2023', '2024년'], 'rows': [
+    {'s': 'BS', 'l': 1, 'n': '자산총계', 'v': [100, 120]},
+    {'l': 3, 'n': '현금및현금성자산', 'v': [40, None]},
+    {'s': 'XX', 'l': 3, 'n': '잘못된 코드', 'v': [1, 2]},
+    {'s': 'BS', 'l': 3, 'n': '값 개수 틀림', 'v': [1]},
+    {'s': 'BS', 'l': 2, 'n': '매출채권', 'v': [60, 70]},
+]}, ensure_ascii=False)
+
+def _pieces(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+@pytest.mark.parametrize("size", [1, 7, 10000])
+def test_rows_stream_in_regardless_of_piece_size(size):
+    state = {}
+    rows = list(table_output.iter_rows(_pieces(ANSWER, size), state))
+    assert [row[2] for row in rows] == ['자산총계', '현금및현금성자산', '매출채권']
+    # "s"를 생략한 행은 Statement None (로컬 분류 결과로 채움)
+    assert rows[1] == [None, 3, '현금및현금성자산', [40, None]]
+    assert state == {'periods': ['2023', '2024년'], 'complete': True, 'invalid': 2}
+
+def test_truncated_response_keeps_finished_rows():
+    cut = ANSWER.index('매출채권') - 10
+    state = {}
+    rows = list(table_output.iter_rows(_pieces(ANSWER[:cut], 5), state))
+    assert [row[2] for row in rows] == ['자산총계', '현금및현금성자산']
+    assert state['complete'] is False
+
+def test_code_fence_is_malformed():
+    with pytest.raises(table_output.MalformedOutputError):
+        list(table_output.iter_rows(["```json\n" + ANSWER + "\n```"]))
+
+def test_from_table_builds_typed_frame():
+    state = {}
+    rows = list(table_output.iter_rows([ANSWER], state))
+    df = schema.from_table(state['periods'], rows)
+    assert list(df.columns) == ['Statement', 'Level', 'Account_Name', 'Source', 'File', '2023', '2024']
+    assert df['Statement'].tolist() == ['BS', 'Other', 'BS']
+    assert df['Level'].dtype == np.int8
+    assert np.isnan(df['2024'].iat[1])
+
+def test_concat_results_merges_equivalent_periods():
+    first = pd.DataFrame({'Statement': ['IS'], 'Level': [3], 'Account_Name': ['매출액'], '2024년': [10.0]})
+    second = pd.DataFrame({'Statement': ['is'], 'Level': [None], 'Account_Name': ['매출원가'], '2024': ['(5)']})
+    df = schema.concat_results([first, second])
+    assert df['2024'].tolist() == [10.0, -5.0]
+    assert df['Statement'].tolist() == ['IS', 'IS']
+    assert df['Level'].tolist() == [3, schema.DEFAULT_LEVEL]
+
+def test_unresolved_accounts_are_classified_with_schema_output(fake_client):
+    df = pd.DataFrame({'Statement': [None], 'Level': [None], 'Account_Name': ['가나다특수계정']})
+    generate = lambda client, prompt, config: gemini_client.generate(client, prompt, config=config).text
+    mapped = taxonomy.map_accounts(df, gemini_client.get_client("test"), generate)
+    assert mapped[['Statement', 'Level']].values.tolist() == [['IS', 3]]
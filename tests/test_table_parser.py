@@ -0,0 +1,52 @@
+import pytest
+
+import table_parser
+
+BS_ROWS = [
+    ("현금및현금성자산", "100", "120"),
+    ("매출채권", "200", "210"),
+    ("재고자산", "300", "330"),
+    ("유형자산", "400", "380"),
+]
+
+def _body(rows, title=None, prefix=None):
+    lines = [title] if title else []
+    lines.append(",".join(([prefix] if prefix else []) + ["과목", "2023", "2024"]))
+    for i, row in enumerate(rows, 1):
+        lines.append(",".join(([str(i)] if prefix else []) + list(row)))
+    return "\n".join(lines)
+
+def test_file_name_does_not_decide_statement():
+    df = table_parser.parse_section("File: 손익계산서_참고.xlsx | Sheet: Sheet1", _body(BS_ROWS))
+    assert set(df['Statement']) == {'BS'}
+
+def test_sheet_name_and_title_decide_statement():
+    df = table_parser.parse_section("File: a.xlsx | Sheet: 재무상태표", _body(BS_ROWS))
+    assert set(df['Statement']) == {'BS'}
+    df = table_parser.parse_section("File: a.xlsx | Sheet: Sheet1", _body(BS_ROWS, title="제조원가명세서"))
+    assert set(df['Statement']) == {'COGM'}
+
+def test_leading_number_column_is_not_the_label():
+    df = table_parser.parse_section("File: a.xlsx | Sheet: 재무상태표", _body(BS_ROWS, prefix="번호"))
+    assert df['Account_Name'].tolist() == [name for name, _, _ in BS_ROWS]
+    assert df['2024'].tolist() == [120.0, 210.0, 330.0, 380.0]
+
+def test_numbering_sets_levels():
+    rows = [("Ⅰ. 유동자산", "300", "330"), ("1. 현금및현금성자산", "100", "120"),
+            ("(1) 보통예금", "100", "120"), ("2. 매출채권", "200", "210")]
+    df = table_parser.parse_section("File: a.xlsx | Sheet: 재무상태표", _body(rows))
+    assert df['Level'].tolist() == [1, 2, 3, 2]
+    assert df['Account_Name'].tolist() == ['유동자산', '현금및현금성자산', '보통예금', '매출채권']
+
+@pytest.mark.parametrize("cell, period", [
+    ("2024", "2024"), ("2024.0", "2024"), ("2024년 3분기 누적", "2024.3Q(Cum)"),
+    ("2025.09.30 (3개월)", "2025.3Q(3M)"), ("2024 반기", "2024.2Q"), ("1,234", None), ("과목", None),
+])
+def test_normalize_period(cell, period):
+    assert table_parser.normalize_period(cell) == period
+
+def test_parse_amount():
+    assert table_parser.parse_amount("(1,200)") == -1200.0
+    assert table_parser.parse_amount("-") is None
+    with pytest.raises(ValueError):
+        table_parser.parse_amount("주석 5")
@@ -0,0 +1,53 @@
+import pandas as pd
+
+import gemini_client
+import logic
+import table_parser
+import taxonomy
+
+def test_map_accounts_keeps_document_levels():
+    df = pd.DataFrame({
+        'Statement': ['BS', 'BS', 'BS', 'BS', 'BS', 'BS'],
+        'Level': [1, 3, 2, 1, 1, 1],
+        'Account_Name': ['유동자산', '현금및현금성자산', '매출채권', '자산총계', '부채총계', '자본총계'],
+        '2024': [100.0, 40.0, 60.0, 100.0, 30.0, 70.0],
+    })
+    mapped = taxonomy.map_accounts(df)
+    assert mapped['Level'].tolist() == [1, 3, 2, 1, 1, 1]
+    assert mapped['Statement'].tolist() == ['BS'] * 6
+
+def test_map_accounts_fills_only_missing_values():
+    df = pd.DataFrame({
+        'Statement': ['BS', None, 'BS'],
+        'Level': [None, 1, 2],
+        'Account_Name': ['현금및현금성자산', '자산총계', '매출채권'],
+    })
+    mapped = taxonomy.map_accounts(df)
+    assert mapped['Statement'].tolist()[1] == 'BS'
+    assert mapped['Level'].tolist()[1:] == [1, 2]
+    assert mapped['Level'].tolist()[0] in taxonomy.LEVELS
+
+CHUNK = "\n".join([
+    "File: 2024.xlsx | Sheet: 재무상태표",
+    "계정,2023,2024",
+    "현금및현금성자산,10,20",
+    "매출채권,5,6",
+    "가나다특수계정,1,2",
+])
+
+def test_classify_labels_leaves_only_unknown_accounts():
+    known, unmapped = table_parser.classify_labels(CHUNK)
+    assert known == {'현금및현금성자산': 'BS', '매출채권': 'BS'}
+    assert unmapped == ['가나다특수계정']
+
+def test_model_classifies_only_unmapped_accounts(fake_client, monkeypatch):
+    prompts = []
+    stream = logic._generate_stream
+    monkeypatch.setattr(logic, '_generate_stream', lambda client, prompt, config=None: (
+        prompts.append(prompt) or stream(client, prompt, config)))
+    table, complete = logic._extract_chunk(gemini_client.get_client("test"), CHUNK, use_cache=False)
+    assert complete
+    assert '["가나다특수계정"]' in prompts[0]
+    # 모델은 가나다특수계정에만 "s"를 주고 나머지는 로컬 분류 결과로 채움
+    assert [row[:3] for row in table['rows']] == [
+        ['BS', 3, '현금및현금성자산'], ['BS', 3, '매출채권'], ['BS', 3, '가나다특수계정']]
@@ -0,0 +1,60 @@
+import io
+import zipfile
+
+import openpyxl
+
+import workbook_reader
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_REL_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+def _xlsx(sheet_data, merges=""):
+    # 공유 문자열 없이 인라인 문자열만 쓰는 최소 xlsx (다른 프로그램이 만든 파일 형태)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("_rels/.rels",
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Target="xl/workbook.xml"/></Relationships>')
+        zf.writestr("xl/workbook.xml",
+                    f'<workbook {_NS} {_REL_NS}><sheets><sheet name="BS" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        zf.writestr("xl/_rels/workbook.xml.rels",
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>')
+        zf.writestr("xl/worksheets/sheet1.xml",
+                    f'<worksheet {_NS}><sheetData>{sheet_data}</sheetData>{merges}</worksheet>')
+    return buffer.getvalue()
+
+def test_inline_rich_string_keeps_every_run():
+    data = _xlsx(
+        '<row r="1"><c r="A1" t="inlineStr"><is><r><rPr><b/></rPr><t>현금및</t></r>'
+        '<r><t xml:space="preserve">현금성</t></r><r><t>자산</t></r>'
+        '<rPh sb="0" eb="1"><t>ゲンキン</t></rPh></is></c><c r="B1"><v>100</v></c></row>'
+    )
+    [(name, rows)] = list(workbook_reader.iter_visible_sheets(data))
+    assert rows == [('현금및현금성자산', 100)]
+
+def _merged_workbook():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "재무상태표"
+    ws.append(["재무상태표 (단위: 원)", None, None])
+    ws.append(["과목", "2024", None])
+    ws.append([None, "3개월", "누적"])
+    ws.append(["현금", 10, 20])
+    ws.merge_cells("A1:C1")
+    ws.merge_cells("B2:C2")
+    ws.append(["숨김", 1, 2])
+    ws.row_dimensions[5].hidden = True
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def test_full_width_title_is_not_copied_but_headers_are():
+    [(name, rows)] = list(workbook_reader.iter_visible_sheets(_merged_workbook()))
+    assert name == "재무상태표"
+    assert rows == [
+        ("재무상태표 (단위: 원)", None, None),
+        ("과목", "2024", "2024"),
+        (None, "3개월", "누적"),
+        ("현금", 10, 20),
+    ]
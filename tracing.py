@@ -0,0 +1,283 @@
+"""
+분석 파이프라인 단계별 추적 (구간 시간, 바이트/토큰 수, 재시도/예비 모델 횟수, 최대 메모리)
+
+    with tracing.trace("analysis") as t:          # 추적 시작 (FSMERGER_TRACE=0이면 t는 None)
+        with tracing.span("extract_sections", files=3) as s:
+            ...
+            s.set(sections=10)
+        tracing.add("prompt_tokens", 1200)
+    t.to_json() / t.to_prometheus()
+
+활성 추적은 contextvars로 전달되므로 추적 중이 아닌 곳의 span()/add()는 아무것도 하지 않음
+스레드 풀에서는 submit()으로 넘겨야 작업 스레드에도 같은 추적이 이어짐
+"""
+import os
+import sys
+import json
+import time
+import itertools
+import threading
+import contextlib
+import contextvars
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENABLED = os.environ.get("FSMERGER_TRACE", "1") not in ("0", "false", "False")
+
+# 추적 하나에 보관하는 최대 구간 수 (화면을 다시 그릴 때마다 구간이 쌓이므로 제한)
+MAX_SPANS = 5000
+
+METRIC_PREFIX = "fsmerger"
+
+# (추적 객체, 현재 구간 번호)
+_active = contextvars.ContextVar("fsmerger_trace", default=None)
+
+def peak_rss_bytes():
+    """
+    프로세스 최대 메모리 사용량(RSS). 알 수 없으면 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = time.time()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.spans = deque(maxlen=MAX_SPANS)
+        self.counters = {}
+        self.peak_rss = peak_rss_bytes()
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def __getstate__(self):
+        # 작업 결과와 함께 pickle로 저장할 수 있도록 잠금/번호 생성기는 빼고 다음 번호만 남김
+        state = self.to_dict()
+        state.update(spans=list(self.spans), next_id=next(self._ids))
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(state["name"])
+        self.wall_time = state["time"]
+        # perf_counter 기준점은 프로세스마다 다르므로 불러온 시점에 끝난 추적으로 맞춤
+        self.seconds = state["seconds"]
+        self.started = time.perf_counter() - self.seconds
+        self.peak_rss = state["peak_rss_bytes"]
+        self.counters = state["counters"]
+        self.spans.extend(state["spans"])
+        self._ids = itertools.count(state["next_id"])
+
+    def _add_span(self, entry):
+        with self.lock:
+            self.spans.append(entry)
+
+    def add(self, counter, value=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        self.peak_rss = peak_rss_bytes()
+
+    def summary(self):
+        """
+        구간 이름별 집계 [{'span', 'count', 'seconds', 'max_seconds', ...숫자 속성 합계}]
+        """
+        rows = {}
+        with self.lock:
+            spans = list(self.spans)
+        for entry in spans:
+            row = rows.setdefault(entry["name"], {"span": entry["name"], "count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            row["count"] += 1
+            row["seconds"] += entry["seconds"]
+            row["max_seconds"] = max(row["max_seconds"], entry["seconds"])
+            for key, value in entry["attrs"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    row[key] = row.get(key, 0) + value
+        for row in rows.values():
+            row["seconds"] = round(row["seconds"], 3)
+            row["max_seconds"] = round(row["max_seconds"], 3)
+        return list(rows.values())
+
+    def to_dict(self):
+        with self.lock:
+            spans = [dict(entry, attrs=dict(entry["attrs"])) for entry in self.spans]
+            counters = dict(self.counters)
+        return {
+            "name": self.name,
+            "time": self.wall_time,
+            "seconds": round(self.seconds if self.seconds is not None else time.perf_counter() - self.started, 3),
+            "peak_rss_bytes": self.peak_rss,
+            "counters": counters,
+            "spans": spans,
+        }
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent, default=str)
+
+    def to_prometheus(self):
+        """
+        Prometheus 텍스트 형식 (구간별 누적 시간/횟수, 카운터, 최대 메모리)
+        """
+        trace_label = f'trace="{_escape(self.name)}"'
+        lines = [
+            f"# HELP {METRIC_PREFIX}_span_seconds_total Time spent in each pipeline stage",
+            f"# TYPE {METRIC_PREFIX}_span_seconds_total counter",
+        ]
+        summary = self.summary()
+        for row in summary:
+            lines.append(f'{METRIC_PREFIX}_span_seconds_total{{{trace_label},span="{_escape(row["span"])}"}} {row["seconds"]}')
+        lines += [
+            f"# HELP {METRIC_PREFIX}_span_count_total Number of times each pipeline stage ran",
+            f"# TYPE {METRIC_PREFIX}_span_count_total counter",
+        ]
+        for row in summary:
+            lines.append(f'{METRIC_PREFIX}_span_count_total{{{trace_label},span="{_escape(row["span"])}"}} {row["count"]}')
+        with self.lock:
+            counters = sorted(self.counters.items())
+        for counter, value in counters:
+            metric = f"{METRIC_PREFIX}_{_metric_name(counter)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric}{{{trace_label}}} {value}"]
+        data = self.to_dict()
+        lines += [
+            f"# TYPE {METRIC_PREFIX}_trace_seconds gauge",
+            f"{METRIC_PREFIX}_trace_seconds{{{trace_label}}} {data['seconds']}",
+        ]
+        if data["peak_rss_bytes"] is not None:
+            lines += [
+                f"# TYPE {METRIC_PREFIX}_peak_rss_bytes gauge",
+                f"{METRIC_PREFIX}_peak_rss_bytes{{{trace_label}}} {data['peak_rss_bytes']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _metric_name(name):
+    return "".join(ch if ch.isascii() and (ch.isalnum() or ch == "_") else "_" for ch in name)
+
+class Span:
+    def __init__(self, trace, parent, name, attrs):
+        self.trace = trace
+        self.parent = parent
+        self.id = next(trace._ids)
+        self.name = name
+        self.attrs = attrs
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _active.set((self.trace, self.id))
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        _active.reset(self._token)
+        if exc is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.trace._add_span({
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "start": round(self.started - self.trace.started, 6),
+            "seconds": round(seconds, 6),
+            "thread": threading.current_thread().name,
+            "attrs": self.attrs,
+        })
+        return False
+
+class _NoopSpan:
+    # 추적 중이 아닐 때 쓰는 빈 구간 (할당 없이 재사용)
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopSpan()
+
+@contextlib.contextmanager
+def trace(name):
+    """
+    새 추적을 시작해 with 블록 동안 활성화. 끝나면 전체 시간과 최대 메모리를 기록
+    """
+    if not ENABLED:
+        yield None
+        return
+    current = Trace(name)
+    token = _active.set((current, None))
+    try:
+        yield current
+    finally:
+        current.finish()
+        _active.reset(token)
+
+@contextlib.contextmanager
+def use(existing):
+    """
+    이미 만든 추적을 다시 활성화 (다음 화면 갱신에서 같은 추적에 구간을 이어 붙일 때)
+    """
+    if existing is None:
+        yield None
+        return
+    token = _active.set((existing, None))
+    try:
+        yield existing
+    finally:
+        _active.reset(token)
+
+def current():
+    state = _active.get()
+    return state[0] if state else None
+
+def active():
+    return _active.get() is not None
+
+def span(name, **attrs):
+    state = _active.get()
+    if state is None:
+        return _NOOP
+    return Span(state[0], state[1], name, attrs)
+
+def record(name, seconds, **attrs):
+    """
+    이미 끝난 구간을 기록 (다른 곳에서 잰 시간을 추적에 넣을 때)
+    """
+    state = _active.get()
+    if state is None:
+        return
+    current_trace, parent = state
+    current_trace._add_span({
+        "id": next(current_trace._ids),
+        "parent": parent,
+        "name": name,
+        "start": round(time.perf_counter() - current_trace.started - seconds, 6),
+        "seconds": round(seconds, 6),
+        "thread": threading.current_thread().name,
+        "attrs": attrs,
+    })
+
+def add(counter, value=1):
+    state = _active.get()
+    if state is not None:
+        state[0].add(counter, value)
+
+def submit(pool, func, *args, **kwargs):
+    """
+    pool.submit과 같지만 현재 추적/구간을 작업 스레드로 넘김
+    """
+    return pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
@@ -1,83 +1,84 @@
 import streamlit as st
 import pandas as pd
-import io
-import re
-from google import genai
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.utils import get_column_letter
+import hashlib
+import numpy as np
+import gemini_client
+import analytics
+import chat_context
+import excel_export
+import schema
+import tracing
+import validation
+import logic
+import incremental
+import jobs
 
 # --- 내부 헬퍼 함수들 (app.py에서 이사옴) ---
-def sort_columns_chronologically(columns):
-    fixed_cols = ['Account_Name']
-    date_cols = [c for c in columns if c not in ['Statement', 'Level', 'Account_Name']]
-    
-    def date_sort_key(col_name):
-        s_name = str(col_name)
-        year_match = re.search(r'(\d{4})', s_name)
-        year = int(year_match.group(1)) if year_match else 9999
-        
-        sub_val = 0
-        if '1Q' in s_name: sub_val = 1
-        elif '2Q' in s_name: sub_val = 4
-        elif '3Q' in s_name: sub_val = 7
-        elif '4Q' in s_name: sub_val = 10
-        
-        is_cum = 1 if '누적' in s_name or 'Cum' in s_name or 'Year' in s_name else 0
-        return (year, sub_val, is_cum, s_name)
-    
-    sorted_date_cols = sorted(date_cols, key=date_sort_key)
-    return fixed_cols + sorted_date_cols
+sort_columns_chronologically = schema.sort_columns_chronologically
 
-def style_dataframe(row):
-    level = row.get('Level', 3)
-    if level == 1: return ['background-color: #1f77b4; color: white; font-weight: bold;'] * len(row)
-    elif level == 2: return ['background-color: #aec7e8; color: black; font-weight: bold;'] * len(row)
-    return ['color: black;'] * len(row)
+LEVEL_STYLES = {
+    1: 'background-color: #1f77b4; color: white; font-weight: bold;',
+    2: 'background-color: #aec7e8; color: black; font-weight: bold;',
+}
+DEFAULT_STYLE = 'color: black;'
 
-def save_styled_excel(df, sheet_name_map, unit_text):
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        if 'Statement' in df.columns: statements = df['Statement'].unique()
-        else: statements = ['Result']
-            
-        for stmt in statements:
-            if 'Statement' in df.columns: sub_df = df[df['Statement'] == stmt].copy()
-            else: sub_df = df.copy()
-            
-            all_cols = sub_df.columns.tolist()
-            sorted_cols = sort_columns_chronologically(all_cols)
+TYPE_MAP = schema.STATEMENT_NAMES
+UNIT_DIVISORS = schema.UNIT_DIVISORS
+
+def level_css(levels, n_cols):
+    """
+    Level 값 배열로 셀 스타일(css) 배열을 한 번에 생성 (행 단위 apply 대신 마스크 사용)
+    """
+    levels = pd.to_numeric(pd.Series(levels), errors='coerce').to_numpy()
+    css = np.full(len(levels), DEFAULT_STYLE, dtype=object)
+    for level, style in LEVEL_STYLES.items():
+        css[levels == level] = style
+    return np.repeat(css[:, None], n_cols, axis=1)
+
+def dataset_key(df):
+    """
+    데이터셋 내용 해시 (캐시 키)
+    """
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(row_hash.tobytes() + "|".join(map(str, df.columns)).encode("utf-8")).hexdigest()
+
+def _session_dataset_key():
+    # raw_data가 바뀐 경우에만 해시를 다시 계산
+    raw_df = st.session_state['raw_data']
+    if st.session_state.get('_raw_data_id') != id(raw_df):
+        st.session_state['_raw_data_id'] = id(raw_df)
+        st.session_state['_raw_data_key'] = dataset_key(raw_df)
+    return st.session_state['_raw_data_key']
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def prepare_views(_raw_df, key, divisor):
+    """
+    0인 행 제거 + 단위 변환(float64 블록 한 번에 나눔) + 재무제표별 화면용 테이블/스타일 준비
+    _raw_df는 해시하지 않고 key(데이터셋 해시)와 divisor로 캐시
+    """
+    display_df = schema.scale_rows(_raw_df, divisor)
+    numeric_cols = schema.period_columns(display_df)
+
+    views = []
+    if 'Statement' in display_df.columns:
+        for stmt_type, sub_df in display_df.groupby('Statement', sort=False, observed=True):
+            sorted_cols = sort_columns_chronologically(sub_df.columns.tolist())
             final_cols = [c for c in sorted_cols if c in sub_df.columns]
-            
-            sheet_title = sheet_name_map.get(stmt, stmt)[:30]
-            sub_df[final_cols].to_excel(writer, sheet_name=sheet_title, index=False, startrow=1)
-            
-            ws = writer.sheets[sheet_title]
-            ws['A1'] = f"(단위: {unit_text})"
-            ws['A1'].font = Font(bold=True, italic=True)
-            
-            fill_lv1 = PatternFill(start_color="1F77B4", end_color="1F77B4", fill_type="solid")
-            font_lv1 = Font(color="FFFFFF", bold=True)
-            fill_lv2 = PatternFill(start_color="AEC7E8", end_color="AEC7E8", fill_type="solid")
-            font_lv2 = Font(color="000000", bold=True)
-            
-            numeric_col_indices = [i+1 for i, c in enumerate(final_cols) if c != 'Account_Name']
-            
-            sub_df = sub_df.reset_index(drop=True)
-            for idx, row in sub_df.iterrows():
-                excel_row = idx + 3
-                level = row.get('Level', 3)
-                for col_idx in range(1, len(final_cols) + 1):
-                    cell = ws.cell(row=excel_row, column=col_idx)
-                    if level == 1:
-                        cell.fill = fill_lv1
-                        cell.font = font_lv1
-                    elif level == 2:
-                        cell.fill = fill_lv2
-                        cell.font = font_lv2
-                    if col_idx - 1 in numeric_col_indices:
-                        cell.number_format = '#,##0'
-            ws.column_dimensions['A'].width = 30
-    return buffer
+            view = sub_df[final_cols].reset_index(drop=True)
+            levels = sub_df['Level'].to_numpy() if 'Level' in sub_df.columns else np.full(len(sub_df), 3)
+            css = pd.DataFrame(level_css(levels, len(final_cols)), columns=final_cols)
+            views.append((stmt_type, view, css))
+
+    return display_df, numeric_cols, views
+
+def save_styled_excel(df, sheet_name_map, unit_text):
+    return excel_export.write_styled_excel(df, sheet_name_map, unit_text)
+
+def _export_excel(trace, df, unit_text):
+    with tracing.use(trace), tracing.span("excel_export", rows=len(df)) as span:
+        data = excel_export.to_styled_excel_bytes(df, TYPE_MAP, unit_text)
+        span.set(bytes_out=len(data))
+    return data
 
 # --- [핵심] UI 렌더링 함수 ---
 def render_analysis_result(api_key):
@@ -93,56 +94,36 @@ def render_analysis_result(api_key):
     c_title, c_unit = st.columns([0.7, 0.3])
     with c_unit:
         unit_option = st.selectbox("단위 선택", ("원", "천원", "백만원", "억원"), index=0)
-        unit_divisors = {"원": 1, "천원": 1000, "백만원": 1000000, "억원": 100000000}
-        divisor = unit_divisors[unit_option]
+        divisor = UNIT_DIVISORS[unit_option]
 
     with c_title:
         st.subheader(f"📊 분석 결과 (단위: {unit_option})")
 
-    # 데이터 복사 및 가공
-    display_df = st.session_state['raw_data'].copy()
-    numeric_cols = [c for c in display_df.columns if c not in ['Statement', 'Level', 'Account_Name']]
-    
-    # 값이 0인 행 제거
-    display_df = display_df[display_df[numeric_cols].abs().sum(axis=1) != 0]
-    
-    # 단위 변환
-    for col in numeric_cols:
-        if divisor > 1:
-            display_df[col] = display_df[col] / divisor
+    # 데이터 가공 (데이터셋 해시 + 단위 기준으로 캐시됨)
+    trace = st.session_state.get('trace')
+    key = _session_dataset_key()
+    with tracing.use(trace), tracing.span("prepare_views", unit=unit_option):
+        display_df, numeric_cols, views = prepare_views(st.session_state['raw_data'], key, divisor)
 
     # 탭 생성
-    available_types = display_df['Statement'].unique() if 'Statement' in display_df.columns else []
-    type_map = {
-        'BS': '재무상태표', 'IS': '손익계산서', 'COGM': '제조원가명세서', 
-        'CF': '현금흐름표', 'SCE': '자본변동표', 'RE': '이익잉여금', 'Other': '기타'
-    }
-    
-    if len(available_types) > 0:
-        tabs = st.tabs([type_map.get(t, t) for t in available_types])
-        for i, stmt_type in enumerate(available_types):
+    if len(views) > 0:
+        tabs = st.tabs([TYPE_MAP.get(t, t) for t, _, _ in views])
+        for i, (stmt_type, view, css) in enumerate(views):
             with tabs[i]:
-                sub_df = display_df[display_df['Statement'] == stmt_type].copy()
-                
-                all_cols = sub_df.columns.tolist()
-                sorted_cols = sort_columns_chronologically(all_cols)
-                final_cols = [c for c in sorted_cols if c in sub_df.columns]
-                
-                format_dict = {col: "{:,.0f}" for col in numeric_cols if col in final_cols}
+                format_dict = {col: "{:,.0f}" for col in numeric_cols if col in view.columns}
                 
                 st.dataframe(
-                    sub_df[final_cols].style
-                    .apply(style_dataframe, axis=1)
+                    view.style
+                    .apply(lambda _, css=css: css, axis=None)
                     .format(format_dict),
                     use_container_width=True,
                     height=600
                 )
     
-    # 엑셀 다운로드
-    excel_buffer = save_styled_excel(display_df, type_map, unit_option)
+    # 엑셀 다운로드 (버튼을 누를 때만 파일 생성)
     st.download_button(
         f"📥 엑셀 다운로드 (현재 단위: {unit_option})",
-        data=excel_buffer.getvalue(),
+        data=lambda: _export_excel(trace, display_df, unit_option),
         file_name=f"Financial_Report_{unit_option}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -162,31 +143,211 @@ def render_analysis_result(api_key):
         st.session_state["messages"].append({"role": "user", "content": prompt})
         st.chat_message("user").write(prompt)
 
-        # 현재 화면에 보이는 데이터프레임을 CSV로 변환해 컨텍스트로 사용
-        context_csv = display_df.to_csv(index=False)
-        system_prompt = f"""
-        당신은 유능한 재무 분석가입니다. 
-        사용자는 아래의 재무제표 데이터(CSV 포맷, 단위: {unit_option})를 보고 있습니다.
-        사용자의 질문에 대해 데이터를 기반으로 명확하고 통찰력 있게 답변하세요.
-        
-        [데이터]
-        {context_csv}
-        
-        [답변 가이드]
-        - 구체적인 수치를 인용하세요.
-        - 추세나 특이사항이 있다면 언급하세요.
-        """
+        # 지표/계정 값/증감률처럼 바로 계산할 수 있는 질문은 모델 호출 없이 답함
+        with tracing.use(trace), tracing.span("chat_local"):
+            local_reply = analytics.answer(display_df, prompt, unit_option)
+        if local_reply:
+            st.session_state["messages"].append({"role": "assistant", "content": local_reply})
+            st.chat_message("assistant").write(local_reply)
+            return
 
+        # 전체 데이터가 캐시 최소 크기 이상이면 컨텍스트 캐시로 재사용하고, 아니면 관련 행만 골라 보냄
         try:
-            client = genai.Client(api_key=api_key)
-            response = client.models.generate_content(
-                model="gemini-3-flash-preview",
-                contents=f"{system_prompt}\n\n[사용자 질문]: {prompt}"
-            )
-            ai_reply = response.text
+            client = gemini_client.get_client(api_key)
+            with tracing.use(trace), tracing.span("chat_model"):
+                ai_reply = chat_context.ask(
+                    client, display_df, prompt, unit_option,
+                    state=st.session_state.setdefault("chat_context", {}),
+                    dataset_key=key,
+                    history=st.session_state["messages"][:-1],
+                )
             
             st.session_state["messages"].append({"role": "assistant", "content": ai_reply})
             st.chat_message("assistant").write(ai_reply)
             
         except Exception as e:
-            st.error(f"답변 생성 중 오류가 발생했습니다: {e}")
\ No newline at end of file
+            st.error(f"답변 생성 중 오류가 발생했습니다: {e}")
+
+def _forget_job(job_id):
+    # 다시 연결할 수 없는 작업: 주소의 job 값과 세션의 작업 id를 지움
+    st.session_state['loaded_job'] = job_id
+    st.session_state.pop('job_id', None)
+    if st.query_params.get('job') == job_id:
+        del st.query_params['job']
+
+@st.fragment(run_every=1.0)
+def render_job(job_id, user):
+    """
+    백그라운드 분석 작업 진행 상황 (1초마다 갱신). 끝나면 결과를 세션에 불러오고 화면 전체를 다시 그림
+    user: 지금 API Key의 사용자 키 (jobs.user_id) - 다른 사용자의 작업 주소로는 연결하지 않음
+    """
+    job = jobs.status(job_id)
+    if job is None or job['user'] != user:
+        _forget_job(job_id)
+        st.warning("작업을 찾을 수 없습니다. 보관 기간이 지나 정리되었을 수 있습니다.")
+        return
+
+    if job['status'] in jobs.ACTIVE:
+        if job['status'] == 'queued':
+            text = f"⏳ {jobs.STATUS_NAMES['queued']} (앞선 작업 {job.get('position', 0)}개)"
+        else:
+            text = f"⚙️ {job['message']}"
+        st.progress(min(max(job['progress'] or 0.0, 0.0), 1.0), text=text)
+        # 받은 행을 바로 표에 채워서 보여줌
+        rows = jobs.partial_rows(job_id) if job['status'] == 'running' else []
+        if rows:
+            st.caption(f"추출된 계정 {len(rows)}개")
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, height=300)
+        st.caption(f"파일 {len(job['files'])}개 · 새로고침하거나 창을 닫아도 분석은 계속되고, 이 주소로 다시 열면 이어서 볼 수 있습니다.")
+        if job['message'] != '취소 중' and st.button("⏹️ 분석 취소", key=f"cancel_{job_id}"):
+            jobs.cancel(job_id)
+        return
+
+    st.session_state['loaded_job'] = job_id
+    if job['status'] == 'done':
+        result = jobs.load_result(job_id)
+        if result is None:
+            _forget_job(job_id)
+            st.session_state['job_notice'] = (
+                'error', "작업 결과 파일을 찾을 수 없습니다. 보관 기간이 지나 정리되었을 수 있으니 다시 분석해 주세요.")
+            st.rerun(scope="app")
+        st.session_state['raw_data'] = result['raw_data']
+        st.session_state['file_results'] = result['file_results']
+        st.session_state['run_attrs'] = result['run_attrs']
+        st.session_state['trace'] = result['trace']
+        # 다음 분석은 이 작업의 파일별 결과를 재사용
+        st.session_state['reuse_job'] = job_id
+        st.session_state['fresh_result'] = True
+        # 분석 새로 하면 채팅 기록도 리셋
+        st.session_state.pop('messages', None)
+    elif job['status'] == 'failed':
+        st.session_state['job_notice'] = ('error', f"에러 내용: {job['error']}")
+    else:
+        st.session_state['job_notice'] = ('info', "분석을 취소했습니다.")
+    st.rerun(scope="app")
+
+def render_run_summary():
+    """
+    방금 불러온 분석 결과의 실행 정보 (재사용/충돌/실패 구간, 파일별 읽기 시간과 토큰 수)
+    """
+    notice = st.session_state.pop('job_notice', None)
+    if notice:
+        getattr(st, notice[0])(notice[1])
+    if not st.session_state.pop('fresh_result', False) or 'raw_data' not in st.session_state:
+        return
+    raw_df = st.session_state['raw_data']
+    run_attrs = st.session_state.get('run_attrs', {})
+
+    st.success("✅ 분석 완료!")
+    if raw_df.attrs.get('reused_files'):
+        reused = len(raw_df.attrs['reused_files'])
+        st.info(f"📎 이전 결과 재사용: {reused}개 파일 (새로 분석: {len(raw_df.attrs.get('file_keys', [])) - reused}개)")
+    if raw_df.attrs.get('conflict_count'):
+        st.info(f"🔀 파일 간 값이 다른 {raw_df.attrs['conflict_count']}개 칸은 "
+                "더 최근 기간까지 담은 파일(같으면 나중에 올린 파일)의 값을 사용했습니다.")
+    if run_attrs.get('failed_chunks'):
+        st.warning("⚠️ 일부 구간 분석에 실패했습니다: " + ", ".join(run_attrs['failed_chunks']))
+    if run_attrs.get('truncated_chunks'):
+        st.warning("⚠️ 응답이 중간에 끊겨 일부 계정만 반영된 구간: " + ", ".join(run_attrs['truncated_chunks']))
+    if run_attrs.get('ingest_timings') or run_attrs.get('compaction_report') or run_attrs.get('dedup_report'):
+        with st.expander("📂 분석 실행 정보", expanded=False):
+            if run_attrs.get('ingest_timings'):
+                st.caption("📂 파일별 읽기 시간 (초), PDF는 전체 페이지 중 재무제표로 골라 보낸 페이지 수 (pages_used)")
+                st.dataframe(pd.DataFrame(run_attrs['ingest_timings']), hide_index=True, use_container_width=True)
+            if run_attrs.get('compaction_report'):
+                st.caption("✂️ 파일별 추정 토큰 수 (압축 전 → 후)")
+                st.dataframe(pd.DataFrame(run_attrs['compaction_report']), hide_index=True, use_container_width=True)
+            if run_attrs.get('dedup_report'):
+                st.caption("🧹 앞선 표와 값이 같아 빼고 보낸 섹션/기간 열 (section: 섹션 전체, columns: 일부 기간 열)")
+                st.dataframe(pd.DataFrame(run_attrs['dedup_report']), hide_index=True, use_container_width=True)
+
+def render_validation(api_key):
+    """
+    검증 문제 목록 + 문제가 난 시트/청크만 다시 추출하는 버튼 (나머지 결과는 그대로 유지)
+    """
+    raw_df = st.session_state.get('raw_data')
+    issues = raw_df.attrs.get('validation') if raw_df is not None else None
+    if not issues:
+        return
+
+    with st.expander(f"🔎 검증 결과: 확인이 필요한 항목 {len(issues)}건", expanded=False):
+        st.dataframe(pd.DataFrame(validation.summary_table(issues)), hide_index=True, use_container_width=True)
+        sources = [s for s in validation.failing_sources(issues) if s in raw_df.attrs.get('sources', {})]
+        if sources and st.button(f"🔧 문제가 있는 {len(sources)}개 구간만 다시 추출"):
+            with st.spinner("문제가 있는 구간만 다시 분석 중입니다..."), tracing.use(st.session_state.get('trace')):
+                if 'file_results' in st.session_state:
+                    # 파일별 결과에서 해당 파일만 고친 뒤 다시 합침
+                    new_df, replaced = incremental.reextract(
+                        api_key, st.session_state['file_results'], raw_df.attrs.get('file_keys', []), issues
+                    )
+                    # 다음 증분 분석은 이 작업의 저장된 결과를 이어받으므로 교정한 결과도 저장해 둠
+                    if replaced and st.session_state.get('reuse_job'):
+                        if not jobs.update_result(st.session_state['reuse_job'], raw_data=new_df,
+                                                  file_results=st.session_state['file_results']):
+                            st.session_state.pop('reuse_job', None)
+                else:
+                    new_df, replaced = logic.reextract_sources(api_key, raw_df, issues)
+            st.session_state['raw_data'] = new_df
+            if new_df.attrs.get('failed_corrections'):
+                st.warning("⚠️ 다시 추출하지 못한 구간: " + ", ".join(new_df.attrs['failed_corrections']))
+            if replaced:
+                st.toast(f"{len(replaced)}개 구간을 교정했습니다.")
+                st.rerun()
+            else:
+                st.info("다시 추출해도 검증 결과가 나아지지 않아 기존 결과를 유지합니다.")
+
+def render_provenance():
+    """
+    파일별로 반영된 행/값 수와 파일 간 값 충돌 목록
+    """
+    raw_df = st.session_state.get('raw_data')
+    if raw_df is None or not raw_df.attrs.get('file_keys'):
+        return
+
+    with st.expander(f"📎 파일별 반영 현황 ({len(raw_df.attrs['file_keys'])}개 파일)", expanded=False):
+        st.caption("같은 계정·기간 값이 파일마다 다르면 더 최근 기간까지 담은 파일, 같으면 나중에 올린 파일의 값을 사용합니다.")
+        st.dataframe(pd.DataFrame(incremental.provenance_table(raw_df)), hide_index=True, use_container_width=True)
+        conflicts = raw_df.attrs.get('conflicts', [])
+        if conflicts:
+            st.caption(f"값이 다른 칸 {raw_df.attrs.get('conflict_count', len(conflicts))}개")
+            st.dataframe(pd.DataFrame(conflicts), hide_index=True, use_container_width=True, height=250)
+
+def render_diagnostics():
+    """
+    마지막 분석의 단계별 시간/토큰/재시도 정보를 접힌 패널로 표시 (JSON/Prometheus로 내려받기 가능)
+    """
+    trace = st.session_state.get('trace')
+    if trace is None:
+        return
+
+    with st.expander("🩺 진단 정보 (단계별 소요 시간)", expanded=False):
+        data = trace.to_dict()
+        counters = data['counters']
+        peak = data['peak_rss_bytes']
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("전체 시간", f"{data['seconds']:.1f}초")
+        c2.metric("모델 호출", f"{counters.get('model_calls', 0)}회",
+                  f"재시도 {counters.get('retries', 0)}회", delta_color="off")
+        c3.metric("토큰 (입력/출력)", f"{counters.get('prompt_tokens', 0):,} / {counters.get('output_tokens', 0):,}")
+        c4.metric("최대 메모리", f"{peak / 1024 / 1024:,.0f}MB" if peak else "-")
+        if counters.get('fallbacks'):
+            st.warning(f"⚠️ 예비 모델({gemini_client.FALLBACK_MODEL})로 응답한 호출: {counters['fallbacks']}회")
+        if counters.get('model_errors'):
+            st.caption(f"실패한 호출 시도: {counters['model_errors']}회")
+
+        st.caption("단계별 합계")
+        st.dataframe(pd.DataFrame(trace.summary()), hide_index=True, use_container_width=True)
+        st.caption("구간 상세 (파일/시트/모델 호출)")
+        st.dataframe(
+            pd.DataFrame([
+                {'span': e['name'], 'start': e['start'], 'seconds': e['seconds'], 'thread': e['thread'], **e['attrs']}
+                for e in data['spans']
+            ]),
+            hide_index=True, use_container_width=True, height=300,
+        )
+
+        d1, d2 = st.columns(2)
+        d1.download_button("JSON 내려받기", data=trace.to_json(indent=2),
+                           file_name="fsmerger_trace.json", mime="application/json")
+        d2.download_button("Prometheus 형식 내려받기", data=trace.to_prometheus(),
+                           file_name="fsmerger_metrics.prom", mime="text/plain")
@@ -0,0 +1,244 @@
+"""
+통합 결과 검증 (모델 호출 없이 로컬에서 계산)
+
+- balance: 자산총계 = 부채총계 + 자본총계
+- subtotal: Level 1/2 합계 행 = 직계 하위 계정 합 (합계 행이 하위 계정 앞/뒤 어디에 있든, parent_tree 참고)
+- cogm_link: 손익계산서의 당기제품제조원가 = 제조원가명세서의 당기제품제조원가
+- period: 다른 재무제표에는 있는 기간이 한 재무제표에서만 통째로 비어 있음
+
+문제마다 관련 행의 Source(섹션/청크 이름)를 함께 돌려주므로 실패한 부분만 다시 추출할 수 있음
+"""
+import numpy as np
+
+import analytics
+
+# 허용 오차: 상대 0.5% 또는 절대 1 (반올림/단위 표기 차이)
+RELATIVE_TOLERANCE = 0.005
+ABSOLUTE_TOLERANCE = 1.0
+# 합계 검사에 필요한 최소 하위 계정 수 (하위 1개짜리는 같은 값 반복인 경우가 많음)
+MIN_CHILDREN = 2
+
+MAIN_STATEMENTS = ['BS', 'IS', 'COGM', 'CF']
+COGM_LINK_NAMES = ['당기제품제조원가', '당기제조원가']
+
+CHECK_NAMES = {
+    'balance': '자산 = 부채 + 자본',
+    'subtotal': '합계 = 하위 계정 합',
+    'cogm_link': '손익계산서 ↔ 제조원가명세서',
+    'period': '기간 누락',
+}
+
+def _mismatch(expected, actual):
+    # 둘 다 값이 있고 허용 오차를 넘는 칸 (0은 값 없음으로 봄)
+    present = (expected != 0) & (actual != 0)
+    tolerance = np.maximum(ABSOLUTE_TOLERANCE, RELATIVE_TOLERANCE * np.abs(expected))
+    return present & (np.abs(expected - actual) > tolerance)
+
+def source_labels(df):
+    # 행별 Source 이름 배열 (없으면 None)
+    if 'Source' not in df.columns:
+        return None
+    return df['Source'].astype(object).fillna('').astype(str).to_numpy()
+
+def _sources(labels, rows):
+    if labels is None:
+        return []
+    return sorted({label for label in labels[list(rows)] if label})
+
+def _issue(check, statement, period, account, expected, actual, sources):
+    return {
+        'check': check, 'statement': statement, 'period': period, 'account': account,
+        'expected': float(expected), 'actual': float(actual), 'sources': sources,
+    }
+
+def _row(data, statement, names):
+    for name in names:
+        row = data.by_statement.get((statement, analytics.name_key(name)))
+        if row is not None:
+            return row
+    return None
+
+def check_balance(df, data, labels):
+    _, asset_names = analytics.ACCOUNTS['total_assets']
+    _, liability_names = analytics.ACCOUNTS['total_liabilities']
+    _, equity_names = analytics.ACCOUNTS['total_equity']
+    rows = [_row(data, 'BS', names) for names in (asset_names, liability_names, equity_names)]
+    if any(r is None for r in rows):
+        return []
+    assets, liabilities, equity = (data.values[r] for r in rows)
+    # 부채나 자본 한쪽만 있으면 비교하지 않음
+    bad = _mismatch(assets, liabilities + equity) & (liabilities != 0) & (equity != 0)
+    sources = _sources(labels, rows)
+    return [
+        _issue('balance', 'BS', data.periods[j], asset_names[0], assets[j], liabilities[j] + equity[j], sources)
+        for j in np.flatnonzero(bad)
+    ]
+
+def parent_rows(statements, levels):
+    """
+    각 행의 바로 위 상위 행 번호 (같은 재무제표 안에서 앞쪽에 있는 더 낮은 Level 행, 없으면 -1)
+    """
+    n = len(levels)
+    index = np.arange(n)
+    parents = np.full(n, -1)
+    for level in (2, 3):
+        candidates = np.where(levels < level, index, -1)
+        # 자기 자신 앞까지의 마지막 후보
+        last = np.maximum.accumulate(np.concatenate(([-1], candidates[:-1])))
+        mask = levels == level
+        parents[mask] = last[mask]
+    same = parents >= 0
+    same[same] = statements[parents[same]] == statements[same]
+    return np.where(same, parents, -1)
+
+def _matching_run(values, row, children):
+    # children 앞에서부터 더해 가다가 row 값과 맞는 첫 구간 (둘 다 값이 있는 기간이 모두 허용 오차 안), 없으면 []
+    expected = values[row]
+    actual = np.zeros_like(expected)
+    for m, child in enumerate(children):
+        actual = actual + values[child]
+        present = (expected != 0) & (actual != 0)
+        if present.any() and not _mismatch(expected, actual).any():
+            return children[:m + 1]
+    return []
+
+def parent_tree(statements, levels, values=None):
+    """
+    각 행의 상위 합계 행 번호 (없으면 -1)
+    합계 행이 하위 계정 앞에 오는 표(머리글형)와 뒤에 오는 표(유동자산 세부 뒤의 유동자산, 맨 끝의 자산총계)를 모두 처리:
+    Level이 낮은 행마다 바로 뒤 구간의 앞쪽 / 바로 앞 구간의 뒤쪽에서 직계 하위 행(구간 안 가장 낮은 Level)을
+    더해 values(행 x 기간)와 맞는 쪽을 하위로 봄. 어느 쪽에도 들지 않는 행은 parent_rows와 같음(앞쪽 행)
+    """
+    parents = parent_rows(statements, levels)
+    if values is None or not len(levels):
+        return parents
+    n = len(levels)
+    header_of, total_of = np.full(n, -1), np.full(n, -1)
+
+    def direct(block):
+        if not block:
+            return []
+        top = min(levels[i] for i in block)
+        return [i for i in block if levels[i] == top]
+
+    for row in np.flatnonzero(levels < 3):
+        after, i = [], row + 1
+        while i < n and levels[i] > levels[row] and statements[i] == statements[row]:
+            after.append(i)
+            i += 1
+        before, i = [], row - 1
+        while i >= 0 and levels[i] > levels[row] and statements[i] == statements[row]:
+            before.append(i)
+            i -= 1
+        children = _matching_run(values, row, direct(after))
+        header_of[children] = row
+        children = [c for c in _matching_run(values, row, direct(before)) if total_of[c] < 0]
+        total_of[children] = row
+    return np.where(header_of >= 0, header_of, np.where(total_of >= 0, total_of, parents))
+
+def check_subtotals(df, data, labels):
+    if data.values is None or 'Level' not in df.columns:
+        return []
+    statements = df['Statement'].astype(str).to_numpy()
+    levels = df['Level'].to_numpy(dtype=np.int64)
+    # 합계 행이 하위 계정 뒤에 오는 표(세부 뒤의 유동자산, 맨 끝의 자산총계)도 맞는 하위 계정과 비교
+    parents = parent_tree(statements, levels, data.values)
+
+    has_parent = parents >= 0
+    sums = np.zeros_like(data.values)
+    np.add.at(sums, parents[has_parent], data.values[has_parent])
+    counts = np.bincount(parents[has_parent], minlength=len(df))
+
+    candidates = np.flatnonzero(counts >= MIN_CHILDREN)
+    bad = _mismatch(data.values[candidates], sums[candidates])
+    names = df['Account_Name'].astype(str).to_numpy()
+    # 상위 행 번호순으로 정렬해 두고 하위 행 목록은 구간으로 잘라 씀
+    order = np.argsort(parents, kind='stable')
+    starts = np.searchsorted(parents[order], candidates)
+    issues, sources = [], {}
+    for k, j in zip(*np.nonzero(bad)):
+        row = candidates[k]
+        if row not in sources:
+            sources[row] = _sources(labels, [row, *order[starts[k]:starts[k] + counts[row]]])
+        issues.append(_issue(
+            'subtotal', statements[row], data.periods[j], names[row], data.values[row, j], sums[row, j], sources[row],
+        ))
+    return issues
+
+def check_cogm_link(df, data, labels):
+    is_row, cogm_row = _row(data, 'IS', COGM_LINK_NAMES), _row(data, 'COGM', COGM_LINK_NAMES)
+    if is_row is None or cogm_row is None:
+        return []
+    bad = _mismatch(data.values[cogm_row], data.values[is_row])
+    sources = _sources(labels, [is_row, cogm_row])
+    return [
+        _issue('cogm_link', 'COGM', data.periods[j], COGM_LINK_NAMES[0],
+               data.values[cogm_row, j], data.values[is_row, j], sources)
+        for j in np.flatnonzero(bad)
+    ]
+
+def check_periods(df, data, labels):
+    if data.values is None or 'Statement' not in df.columns:
+        return []
+    statements = df['Statement'].astype(str).to_numpy()
+    present = [s for s in MAIN_STATEMENTS if (statements == s).any()]
+    if len(present) < 2:
+        return []
+    filled = {s: (data.values[statements == s] != 0).any(axis=0) for s in present}
+    # 주요 재무제표 중 절반 이상에 값이 있는 기간만 기준으로 삼음
+    coverage = np.sum([filled[s] for s in present], axis=0)
+    expected = coverage * 2 >= len(present)
+    issues = []
+    for statement in present:
+        rows = np.flatnonzero(statements == statement)
+        for j in np.flatnonzero(expected & ~filled[statement]):
+            issues.append(_issue('period', statement, data.periods[j], '', 0, 0, _sources(labels, rows)))
+    return issues
+
+def validate(df):
+    """
+    결과 DataFrame 검증. 반환값: 문제 목록
+    [{'check', 'statement', 'period', 'account', 'expected', 'actual', 'sources'}]
+    """
+    if df is None or df.empty or 'Account_Name' not in df.columns:
+        return []
+    data = analytics.FinancialData(df)
+    if not data.periods:
+        return []
+    labels = source_labels(df)
+    return (check_balance(df, data, labels) + check_subtotals(df, data, labels)
+            + check_cogm_link(df, data, labels) + check_periods(df, data, labels))
+
+def failing_sources(issues):
+    """
+    문제가 난 Source별 문제 목록 {Source: [문제, ...]}
+    """
+    by_source = {}
+    for issue in issues:
+        for source in issue['sources']:
+            by_source.setdefault(source, []).append(issue)
+    return by_source
+
+def describe(issue, unit_divisor=1):
+    """
+    문제 한 줄 설명 (모델 교정 요청과 화면 표시에 같이 사용)
+    """
+    if issue['check'] == 'period':
+        return f"[{issue['statement']}] {issue['period']}: 다른 재무제표에는 있는 기간의 값이 모두 비어 있음"
+    expected, actual = issue['expected'] / unit_divisor, issue['actual'] / unit_divisor
+    label = {
+        'balance': '부채총계 + 자본총계',
+        'subtotal': '하위 계정 합',
+        'cogm_link': '손익계산서의 같은 계정',
+    }[issue['check']]
+    return (f"[{issue['statement']}] {issue['period']} {issue['account']} = {expected:,.0f}, "
+            f"{label} = {actual:,.0f} (차이 {expected - actual:,.0f})")
+
+def summary_table(issues, unit_divisor=1):
+    """
+    화면 표시용 문제 목록 (dict 리스트)
+    """
+    return [
+        {'검사': CHECK_NAMES[i['check']], '내용': describe(i, unit_divisor), 'Source': ", ".join(i['sources'])}
+        for i in issues
+    ]
@@ -0,0 +1,265 @@
+"""
+xlsx를 화면에 보이는 셀만 스트리밍으로 읽는 리더
+
+openpyxl read-only 모드는 숨김 행/열/병합 정보를 주지 않고, 일반 모드는 모든 셀 객체를 메모리에 올림.
+여기서는 시트 XML을 expat으로 한 번만 훑으면서 숨김 열(<col hidden>), 숨김 행(<row hidden>),
+병합(<mergeCell>)을 함께 읽고 값은 보이는 행마다 작은 dict로만 보관함
+"""
+import io
+import posixpath
+import zipfile
+from xml.etree.ElementTree import iterparse
+from xml.parsers import expat
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+HIDDEN_SHEET_STATES = ('hidden', 'veryHidden')
+_TRUE = ('1', 'true')
+
+def _local(tag):
+    # 네임스페이스 제거 (Transitional/Strict 모두 처리)
+    return tag.rsplit('}', 1)[-1]
+
+def _attr(elem, name):
+    # r:id 처럼 네임스페이스가 붙은 속성도 이름만으로 찾음
+    for key, value in elem.attrib.items():
+        if _local(key) == name:
+            return value
+    return None
+
+def _read_rels(zf, path):
+    rels_path = posixpath.join(posixpath.dirname(path), '_rels', posixpath.basename(path) + '.rels')
+    if rels_path not in zf.namelist():
+        return {}
+    targets = {}
+    with zf.open(rels_path) as f:
+        for _, elem in iterparse(f):
+            if _local(elem.tag) == 'Relationship':
+                target = elem.get('Target', '')
+                if target.startswith('/'):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+                targets[elem.get('Id')] = target
+    return targets
+
+def _workbook_path(zf):
+    for target in _read_rels(zf, '').values():
+        if target.endswith('.xml') and 'workbook' in posixpath.basename(target):
+            return target
+    return 'xl/workbook.xml'
+
+def _read_workbook(zf, path):
+    """
+    시트 목록 [(이름, 상태, r:id)]와 1904 날짜 체계 여부
+    """
+    sheets, date1904 = [], False
+    with zf.open(path) as f:
+        for _, elem in iterparse(f):
+            tag = _local(elem.tag)
+            if tag == 'sheet':
+                sheets.append((elem.get('name'), elem.get('state', 'visible'), _attr(elem, 'id')))
+            elif tag == 'workbookPr':
+                date1904 = elem.get('date1904', '0') in _TRUE
+    return sheets, date1904
+
+def _read_shared_strings(zf, path):
+    if not path or path not in zf.namelist():
+        return []
+    strings = []
+    with zf.open(path) as f:
+        for _, elem in iterparse(f):
+            if _local(elem.tag) != 'si':
+                continue
+            # 윗주(rPh) 안의 글자는 제외
+            parts = []
+            for child in elem:
+                tag = _local(child.tag)
+                if tag == 't':
+                    parts.append(child.text or '')
+                elif tag == 'r':
+                    parts.extend(t.text or '' for t in child if _local(t.tag) == 't')
+            strings.append(''.join(parts))
+            elem.clear()
+    return strings
+
+def _read_date_styles(zf, path):
+    """
+    날짜 서식이 적용된 셀 스타일 번호 집합
+    """
+    if not path or path not in zf.namelist():
+        return set()
+    custom, xf_formats, in_cell_xfs = {}, [], False
+    with zf.open(path) as f:
+        for event, elem in iterparse(f, events=('start', 'end')):
+            tag = _local(elem.tag)
+            if tag == 'cellXfs':
+                in_cell_xfs = event == 'start'
+            elif event == 'end' and tag == 'numFmt':
+                custom[int(elem.get('numFmtId'))] = elem.get('formatCode', '')
+            elif event == 'end' and tag == 'xf' and in_cell_xfs:
+                xf_formats.append(int(elem.get('numFmtId', 0)))
+    return {
+        i for i, fmt_id in enumerate(xf_formats)
+        if is_date_format(custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id, 'General')))
+    }
+
+def _column_index(ref, cache):
+    # "AB12" -> 28 (열 문자별로 캐시)
+    letters = ref.rstrip('0123456789')
+    index = cache.get(letters)
+    if index is None:
+        index = cache[letters] = column_index_from_string(letters)
+    return index
+
+def _convert(kind, text, style, shared, date_styles, epoch):
+    if kind == 's':
+        return shared[int(text)]
+    if kind in ('str', 'inlineStr', 'e', 'd'):
+        return text
+    if kind == 'b':
+        return text in _TRUE
+    try:
+        number = int(text)
+    except ValueError:
+        number = float(text)
+    if style is not None and int(style) in date_styles:
+        try:
+            return from_excel(number, epoch)
+        except (ValueError, OverflowError):
+            return number
+    return number
+
+def _read_sheet(zf, path, shared, date_styles, epoch):
+    """
+    시트 하나를 한 번 훑어서 (보이는 행 [(행 번호, {열 번호: 값})], 숨김 열 집합, 병합 범위 목록) 반환
+    ElementTree 대신 expat 콜백으로 읽어 셀마다 요소 객체를 만들지 않음
+    """
+    rows, hidden_cols, merges = [], set(), []
+    names, columns = {}, {}
+    # 현재 행/셀 상태 (values가 None이면 숨김 행이거나 행 밖)
+    row_idx, values, col, kind, style, text, phonetic = 0, None, 0, 'n', None, None, False
+    # <v> 또는 <t> 안인지 (서식 있는 문자열의 <r>/<rPr> 사이 공백은 값이 아님)
+    reading = False
+
+    def local(name):
+        tag = names[name] = name.rsplit('}', 1)[-1]
+        return tag
+
+    def start(name, attrs):
+        nonlocal row_idx, values, col, kind, style, text, phonetic, reading
+        tag = names.get(name) or local(name)
+        if tag in ('v', 't'):
+            reading = True
+        if tag == 'c':
+            if values is not None:
+                ref = attrs.get('r')
+                col = _column_index(ref, columns) if ref else col + 1
+                kind = attrs.get('t', 'n')
+                style = attrs.get('s')
+        elif tag == 'v':
+            if values is not None:
+                text = []
+        elif tag == 'is':
+            # 인라인 문자열 <is><t>...</t></is> 또는 서식 있는 <is><r><t>..</t></r><r>..</r></is> - 모든 t를 이어 붙임
+            if values is not None and kind == 'inlineStr':
+                text = []
+        elif tag == 'row':
+            row_idx = int(attrs.get('r', 0)) or row_idx + 1
+            values = None if attrs.get('hidden', '0') in _TRUE else {}
+            col = 0
+        elif tag == 'rPh':
+            phonetic = True
+        elif tag == 'col':
+            if attrs.get('hidden', '0') in _TRUE:
+                hidden_cols.update(range(int(attrs['min']), int(attrs['max']) + 1))
+        elif tag == 'mergeCell':
+            merges.append(range_boundaries(attrs['ref']))
+
+    def end(name):
+        nonlocal values, text, phonetic, reading
+        tag = names.get(name) or local(name)
+        if tag in ('v', 't'):
+            reading = False
+        if tag == 'v' or tag == 'is':
+            if text is not None:
+                value = ''.join(text)
+                text = None
+                if value != '':
+                    values[col] = _convert(kind, value, style, shared, date_styles, epoch)
+        elif tag == 'row':
+            if values:
+                rows.append((row_idx, values))
+            values = None
+        elif tag == 'rPh':
+            phonetic = False
+
+    def chars(data):
+        # 윗주(rPh) 안의 글자는 제외
+        if text is not None and reading and not phonetic:
+            text.append(data)
+
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = chars
+    with zf.open(path) as f:
+        parser.ParseFile(f)
+    return rows, hidden_cols, merges
+
+def _fill_merged(rows, merges):
+    """
+    병합된 머리글(문자열)은 병합 범위 전체에 같은 값을 채움 (숫자 병합은 그대로 둠)
+    표 너비 전체를 덮는 병합(표 제목, 단위 안내 등)은 왼쪽 위 칸에만 둠
+    """
+    if not merges:
+        return
+    by_row = {row_idx: values for row_idx, values in rows}
+    used = {c for _, values in rows for c in values}
+    first, last = (min(used), max(used)) if used else (0, 0)
+    for min_col, min_row, max_col, max_row in merges:
+        anchor = by_row.get(min_row, {}).get(min_col)
+        if not isinstance(anchor, str) or (min_col <= first and max_col >= last):
+            continue
+        for row_idx in range(min_row, max_row + 1):
+            values = by_row.get(row_idx)
+            if values is None:
+                continue
+            for col_idx in range(min_col, max_col + 1):
+                values.setdefault(col_idx, anchor)
+
+def iter_visible_sheets(source):
+    """
+    보이는 시트마다 (시트명, [행 튜플, ...]) 반환
+    숨김 시트/행/열은 건너뛰고, 빈 행은 빼고, 병합된 머리글은 채움
+    source: 파일 경로, bytes 또는 파일 객체
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as zf:
+        workbook = _workbook_path(zf)
+        sheets, date1904 = _read_workbook(zf, workbook)
+        rels = _read_rels(zf, workbook)
+        parts = {posixpath.basename(target).lower(): target for target in rels.values()}
+        shared = _read_shared_strings(zf, parts.get('sharedstrings.xml'))
+        date_styles = _read_date_styles(zf, parts.get('styles.xml'))
+        epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        for name, state, rel_id in sheets:
+            path = rels.get(rel_id)
+            # 차트 시트는 셀이 없으므로 제외 (openpyxl worksheets와 동일)
+            if state in HIDDEN_SHEET_STATES or not path or path not in zf.namelist() or '/chartsheets/' in path:
+                continue
+            rows, hidden_cols, merges = _read_sheet(zf, path, shared, date_styles, epoch)
+            _fill_merged(rows, merges)
+            columns = sorted({c for _, values in rows for c in values} - hidden_cols)
+            if columns:
+                columns = [c for c in range(1, columns[-1] + 1) if c not in hidden_cols]
+            yield name, [
+                tuple(values.get(c) for c in columns)
+                for _, values in rows
+                if any(c not in hidden_cols for c in values)
+            ]